@@ -0,0 +1,187 @@
+"""
+Structured benefits table: lookup latency, direct answers and prompt size.
+
+Ingests the four Summary of Benefits PDFs into the in-process benchmark app
+(local stand-ins, see benchmarks.stack) through the real ingestion job, which
+writes the benefits table. Then, for "what's the X for plan Y" questions:
+
+• lookup latency of the table itself (µs);
+• how many questions are answered from the table, and whether the rows are the
+  ones asked about (right plan and benefit);
+• prompt tokens of the injected rows against the retrieved chunks the reply is
+  otherwise grounded on, and how often those chunks hold the exact figures;
+• `POST /messages/process` latency of table answers against graph answers, with
+  the usual plan questions (`--graph-share` of the turns) mixed in.
+
+    python -m benchmarks.bench_benefits --sessions 12 --turns 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_process import _login, percentile, session_script
+from benchmarks.stack import BenchConfig
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+# how a user names a benefit -> the canonical key (services.benefits) it should resolve to
+ASKED = [
+    ("deductible", "overall_deductible"),
+    ("out-of-pocket limit", "out_of_pocket_limit"),
+    ("specialist visit", "specialist_visit"),
+    ("primary care visit", "primary_care_visit"),
+    ("urgent care", "urgent_care"),
+    ("emergency room", "emergency_room"),
+    ("ambulance", "emergency_transportation"),
+    ("generic drugs", "generic_drugs"),
+    ("imaging", "imaging"),
+    ("diagnostic test", "diagnostic_test"),
+    ("skilled nursing", "skilled_nursing_care"),
+    ("hospice", "hospice_services"),
+]
+TEMPLATES = [
+    "What's the {benefit} on {plan}?",
+    "How much is {benefit} for the {plan} plan?",
+    "{plan} {benefit} cost?",
+]
+
+
+def questions() -> list[tuple[str, str, str]]:
+    """(question, plan id, benefit key) for every plan, benefit and phrasing."""
+    from services.plans import PLANS
+    return [(template.format(benefit=asked, plan=name), plan, key)
+            for plan, (name, _) in PLANS.items() for asked, key in ASKED for template in TEMPLATES]
+
+
+async def drive(client: httpx.AsyncClient, args, asked: list[str], answers: set) -> dict:
+    rng = random.Random(args.seed)
+    scripts = [[text if rng.random() < args.graph_share else rng.choice(asked)
+                for text in session_script(rng, args.turns)] for _ in range(args.sessions)]
+    tokens = [await _login(client, i) for i in range(args.sessions)]
+    gate = asyncio.Semaphore(args.concurrency)
+    samples: dict = {"table": [], "graph": []}
+
+    async def session(token: str, script: list) -> None:
+        for text in script:
+            async with gate:
+                started = time.perf_counter()
+                response = await client.post("/messages/process", json={"text": text},
+                                             headers={"Authorization": f"Bearer {token}"}, timeout=120)
+                elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            samples["table" if response.json()["response"] in answers else "graph"].append(elapsed)
+
+    await asyncio.gather(*(session(t, s) for t, s in zip(tokens, scripts)))
+    return samples
+
+
+async def run(args, config: BenchConfig) -> None:
+    from benchmarks.stack import create_app
+
+    app = create_app(config)
+    from container import ServicesContainer  # noqa: E402  (modules read env at import)
+    from services.benefits import format_rows
+    from services.llm_scheduler import estimate_tokens
+
+    async with app.router.lifespan_context(app):
+        folder = Path(args.workdir) / "docs"
+        folder.mkdir()
+        for pdf in sorted(DATA.glob("*_SOB*.pdf")):
+            shutil.copy(pdf, folder / pdf.name)
+        vectordb_service = ServicesContainer.vectordb_service()
+        started = time.perf_counter()
+        await vectordb_service.ingest_to_vector_db(str(folder))
+        print(f"ingested {len(list(folder.iterdir()))} documents in {time.perf_counter() - started:.1f}s")
+
+        service = ServicesContainer.benefit_service()
+        table = service.table
+        table.refresh()
+        print(f"benefits table: {len(table)} rows, plans {', '.join(table.plans())}")
+
+        # 1. raw lookups
+        asked = questions()
+        repeats = max(1, args.lookups // len(asked))
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for _, plan, key in asked:
+                table.lookup(plan, key)
+        lookup_us = 1e6 * (time.perf_counter() - started) / (repeats * len(asked))
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for text, _, _ in asked:
+                table.match(text)
+        match_us = 1e6 * (time.perf_counter() - started) / (repeats * len(asked))
+        print(f"lookup(plan, benefit) {lookup_us:.1f} µs · match(question) {match_us:.1f} µs")
+
+        # 2. direct answers and 3. prompt size
+        answered = correct = 0
+        rows_tokens, retrieved_tokens, grounded = [], [], 0
+        answers = set()
+        for text, plan, key in asked:
+            analysis = await service.answer([{"sender": "user", "text": text}])
+            expected = table.lookup(plan, key)
+            if analysis is not None:
+                answered += 1
+                correct += bool(expected) and analysis.suggested_message_reply == format_rows(expected)
+                answers.add(analysis.suggested_message_reply)
+            injected = service.context(text, plan)
+            docs = await vectordb_service.retrieve(text, plan)
+            retrieved = "\n\n".join(d.page_content for d, score in docs if score >= 0.4)
+            grounded += bool(expected) and all(row["value"] in retrieved for row in expected)
+            if injected:
+                rows_tokens.append(estimate_tokens(injected))
+                retrieved_tokens.append(estimate_tokens(retrieved))
+        print(f"{len(asked)} questions: {answered} answered from the table ({answered / len(asked):.0%}), "
+              f"{correct} with exactly the rows asked about")
+        if rows_tokens:
+            print(f"prompt tokens per question: injected rows {sum(rows_tokens) / len(rows_tokens):.0f} "
+                  f"vs retrieved chunks {sum(retrieved_tokens) / len(retrieved_tokens):.0f}; "
+                  f"retrieval alone holds the exact figures for {grounded / len(asked):.0%} of the questions")
+
+        # 4. end to end
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            llm_before = ServicesContainer.llm_scheduler().stats()["completed"]
+            samples = await drive(client, args, [text for text, _, _ in asked], answers)
+            llm_calls = ServicesContainer.llm_scheduler().stats()["completed"] - llm_before
+
+    print(f"{'answered by':<12}{'turns':>7}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for kind, values in samples.items():
+        mean = 1000 * sum(values) / len(values) if values else 0.0
+        print(f"{kind:<12}{len(values):>7}{1000 * percentile(values, 0.5):>10.1f}"
+              f"{1000 * percentile(values, 0.95):>10.1f}{mean:>10.1f}")
+    print(f"{llm_calls} LLM calls, {llm_calls / max(1, len(samples['graph'])):.1f} per graph turn, "
+          f"0 per table turn")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--graph-share", type=float, default=0.5)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        # the ingestion job checkpoints and writes the table into throwaway files
+        os.environ["INGEST_CHECKPOINT_PATH"] = str(Path(workdir) / "checkpoints.sqlite3")
+        os.environ["BENEFITS_PATH"] = str(Path(workdir) / "benefits.json")
+        asyncio.run(run(args, BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Cache hit rates across several worker processes, per cache backend.
+
+Starts `--workers` processes, as uvicorn does, each handling its share of
+`--requests` chat turns: a load balancer spreads one user's turns over every
+worker. A turn resolves the user (UserService, "users"), embeds the question
+(PineconeDB.embed_query, "embeddings") and asks the model
+(LLMResponseCache.get_or_call, "llm"); users and questions are drawn from Zipf
+distributions, the embedding and model calls sleep like the real ones. The
+memory backend gives each worker its own cache (and user records are not
+cached on it, as a delete would not reach the other workers); shm and resp (against
+benchmarks.redis_stub) share one, so an entry one worker loads serves them all.
+
+    python -m benchmarks.bench_cache --workers 4 --requests 4000 --backends memory,shm,resp
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+import mongomock  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from benchmarks.bench_process import percentile  # noqa: E402
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from benchmarks.redis_stub import RedisStub  # noqa: E402
+from dao.user_dao import UserDAO  # noqa: E402
+from models.ai_processing_models import CacheConfig, LLMCacheConfig  # noqa: E402
+from models.vectordb_models import PineconeConfig  # noqa: E402
+from services.llm_cache import LLMResponseCache  # noqa: E402
+from services.rag_service.pinecone import PineconeDB  # noqa: E402
+from services.user_service import UserService  # noqa: E402
+
+
+def make_backend(config: CacheConfig):
+    from container import _shm_cache
+    from services.cache.base import MemoryCacheBackend
+    from services.cache.resp import RespCacheBackend
+
+    return {"memory": MemoryCacheBackend, "shm": _shm_cache, "resp": RespCacheBackend}[config.backend](config=config)
+
+
+def zipf(rng: random.Random, n: int, s: float) -> int:
+    weights = [1 / (k + 1) ** s for k in range(n)]
+    return rng.choices(range(n), weights=weights)[0]
+
+
+def worker(index: int, config: CacheConfig, args, results: multiprocessing.Queue) -> None:
+    backend = make_backend(config)
+    client = mongomock.MongoClient()
+    user_dao = UserDAO(client.db.users, client.db.counters)
+    for i in range(args.users):
+        user_dao.insert_user({"user_name": f"u{i}", "user_email": f"u{i}@example.com", "password": "x" * 60})
+    users = UserService(user_dao, secret_key="bench", cache=backend)
+    vector_db = PineconeDB(config=PineconeConfig(api_key="bench", base_url="http://127.0.0.1:9"),
+                           embeddings=FakeEmbeddings(latency_ms=args.embed_latency_ms), cache=backend)
+    llm = LLMResponseCache(LLMCacheConfig(max_entries=args.questions), "bench-gpt", "2024-02-01", backend=backend)
+
+    async def model_call(question: str) -> AIMessage:
+        await asyncio.sleep(args.llm_latency_ms / 1000)
+        return AIMessage(content=f"Answer to {question}: " + "covered after the deductible. " * 12)
+
+    async def run() -> list:
+        rng = random.Random(args.seed + index)
+        latencies = []
+        for _ in range(args.requests // args.workers):
+            user = zipf(rng, args.users, 1.1)
+            question = f"what does my plan cover for {zipf(rng, args.questions, 1.0)} visits"
+            started = time.perf_counter()
+            users.get_user_by_email(f"u{user}@example.com")
+            await vector_db.embed_query(question)
+            await llm.get_or_call("generate_reply", [HumanMessage(content=question)],
+                                  lambda: model_call(question))
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    latencies = asyncio.run(run())
+    results.put((latencies, backend.stats()["namespaces"], llm.stats()["nodes"].get("generate_reply", {})))
+    backend.close()
+
+
+def measure(backend: str, args, url: str, shm_path: str) -> dict:
+    config = CacheConfig(backend=backend, resp_url=url, shm_path=shm_path,
+                         key_prefix=f"bench{random.randrange(1 << 30)}")
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, config, args, results)) for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies, namespaces = [], {}
+    for worker_latencies, stats, llm_stats in collected:
+        latencies += worker_latencies
+        for ns, s in stats.items():
+            agg = namespaces.setdefault(ns, {"hits": 0, "misses": 0, "sets": 0, "bytes": 0, "errors": 0})
+            for k in agg:
+                agg[k] += s[k]
+        # the llm namespace only sees memory-tier misses: count hits at the response cache
+        agg = namespaces.setdefault("llm (all tiers)", {"hits": 0, "misses": 0, "sets": 0, "bytes": 0, "errors": 0})
+        agg["hits"] += llm_stats.get("hits", 0)
+        agg["misses"] += llm_stats.get("misses", 0)
+    return {"latencies": latencies, "namespaces": namespaces}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--backends", default="memory,shm,resp")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stub = RedisStub()
+    url = stub.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.workers} workers, {args.requests} turns, {args.users} users, {args.questions} questions")
+        for backend in args.backends.split(","):
+            result = measure(backend, args, url, f"{tmp}/cache")
+            lat = result["latencies"]
+            print(f"\n[{backend}] turn latency mean {1000 * statistics.mean(lat):.1f} ms  "
+                  f"p50 {1000 * percentile(lat, 0.5):.1f} ms  p95 {1000 * percentile(lat, 0.95):.1f} ms")
+            for ns, s in result["namespaces"].items():
+                lookups = s["hits"] + s["misses"]
+                avg = f"{s['bytes'] / s['sets']:.0f} B/value" if s["sets"] else ""
+                print(f"  {ns:<16} hit rate {s['hits'] / max(1, lookups):6.1%}  "
+                      f"({s['hits']}/{lookups})  errors {s['errors']}  {avg}")
+    stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
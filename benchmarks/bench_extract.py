@@ -0,0 +1,108 @@
+"""
+Per-file PDF extraction time: the former three-parser path against the
+single-pass extractor, cold and from the parsed-page cache.
+
+• before: pdfplumber for the paragraphs, camelot over all pages for the
+  tables, pdfplumber again when camelot fails; table text is also paragraph text;
+• cold: DocumentExtractor.parse_pdf with an empty page cache (camelot for the
+  table regions, one pdfplumber pass for text outside them), including the cache write;
+• cached: the same file again, a re-run over unchanged documents.
+
+Chunk and benefit-row counts and the size of the paragraph text (which no
+longer repeats the tables) are printed next to the timings.
+
+    python -m benchmarks.bench_extract data/
+"""
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import camelot
+import pandas as pd
+import pdfplumber
+
+from services.ingestion.extractors import DocumentExtractor
+from services.ingestion.page_cache import ParsedPageCache
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+
+
+# ------------------------ former extraction path ------------------------ #
+def legacy_tables(path: Path) -> List[Tuple[Optional[int], pd.DataFrame]]:
+    try:
+        tables = camelot.read_pdf(str(path), pages="all", strip_text="\n")
+        return [(int(t.page), t.df) for t in tables] if tables else []
+    except Exception:
+        pass
+    dfs = []
+    with pdfplumber.open(str(path)) as pdf:
+        for page in pdf.pages:
+            tbl = page.extract_table()
+            if tbl and len(tbl) > 1:
+                dfs.append((page.page_number, pd.DataFrame(tbl[1:], columns=tbl[0])))
+    return dfs
+
+
+def legacy_paragraphs(path: Path) -> List[Tuple[Optional[int], str]]:
+    paras = []
+    with pdfplumber.open(str(path)) as pdf:
+        for page in pdf.pages:
+            paras.extend((page.page_number, p) for p in DocumentExtractor._split_paragraphs(page.extract_text() or ""))
+    return paras
+
+
+def legacy(path: Path) -> dict:
+    started = time.perf_counter()
+    paras = legacy_paragraphs(path)
+    text_s = time.perf_counter() - started
+    tables = legacy_tables(path)
+    total_s = time.perf_counter() - started
+    return {"total_s": total_s, "text_s": text_s, "tables_s": total_s - text_s,
+            "paragraphs": len(paras), "paragraph_chars": sum(len(p) for _, p in paras),
+            "table_rows": sum(len(df) for _, df in tables)}
+
+
+def single_pass(extractor: DocumentExtractor, path: Path) -> dict:
+    chunks, benefits = extractor.extract_document(path)
+    return {**extractor.timings[path.name],
+            "paragraphs": sum(c.kind == "paragraph" for c in chunks),
+            "paragraph_chars": sum(len(c.text) for c in chunks if c.kind == "paragraph"),
+            "table_rows": sum(c.kind == "table_row" for c in chunks), "benefits": len(benefits)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", nargs="?", default=str(DATA))
+    args = parser.parse_args()
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+
+    files = sorted(f for f in Path(args.folder).iterdir() if f.suffix.lower() == ".pdf")
+    totals = {"before": 0.0, "cold": 0.0, "cached": 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        extractor = DocumentExtractor(page_cache=ParsedPageCache(tmp))
+        print(f"{'file':<36} {'before':>22} {'cold (camelot + pages)':>28} {'cached':>9}   paragraph chars, chunks before -> after")
+        for file in files:
+            before = legacy(file)
+            cold = single_pass(extractor, file)
+            cached = single_pass(extractor, file)
+            totals["before"] += before["total_s"]
+            totals["cold"] += cold["total_s"]
+            totals["cached"] += cached["total_s"]
+            print(f"{file.name[:36]:<36} {before['total_s']:6.2f}s "
+                  f"({before['text_s']:.2f} + {before['tables_s']:.2f})  "
+                  f"{cold['total_s']:6.2f}s ({cold['camelot_s']:.2f} + {cold['pages_s']:.2f})    "
+                  f"{1000 * cached['total_s']:5.1f}ms   "
+                  f"{before['paragraph_chars']} -> {cold['paragraph_chars']} chars, "
+                  f"{before['paragraphs']}p+{before['table_rows']}r -> {cold['paragraphs']}p+{cold['table_rows']}r, "
+                  f"{cold['benefits']} benefit rows")
+    print(f"\n{len(files)} files: before {totals['before']:.2f}s, single pass {totals['cold']:.2f}s, "
+          f"cached {1000 * totals['cached']:.0f}ms ({totals['before'] / max(totals['cached'], 1e-9):.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
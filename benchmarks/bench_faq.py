@@ -0,0 +1,122 @@
+"""
+Latency of FAQ fast-path answers against full-pipeline answers on
+`POST /messages/process`.
+
+Ingests the medical-questions document into the in-process benchmark app
+(local stand-ins, see benchmarks.stack) through the real ingestion job, which
+builds the FAQ index. Sessions then mix questions phrased after the detected
+FAQ entries (`--faq-share` of the turns) with the usual plan questions. Reports
+latency and LLM calls for turns answered from the FAQ and for those answered by
+the graph, plus the FAQ hit rate from /ops/metrics.
+
+    python -m benchmarks.bench_faq --sessions 20 --turns 4 --faq-share 0.5
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_process import _login, percentile, session_script
+from benchmarks.stack import BenchConfig
+
+DATA = Path(__file__).resolve().parent.parent / "data"
+FAQ_DOCUMENT = DATA / "America's_Choice_Medical_Questions_-_Modified_(3) (1).docx"
+
+
+def faq_phrasings(question: str) -> list[str]:
+    """How a user might ask a detected question ("What if <condition>?")."""
+    condition = question.removeprefix("What if ").rstrip("?")
+    return [question, f"Can I still get a plan if {condition}?", f"What happens if {condition}?"]
+
+
+async def drive(client: httpx.AsyncClient, args, faq_questions: list[str], answers: set) -> dict:
+    rng = random.Random(args.seed)
+    scripts = [[rng.choice(faq_questions) if rng.random() < args.faq_share else text
+                for text in session_script(rng, args.turns)] for _ in range(args.sessions)]
+    tokens = [await _login(client, i) for i in range(args.sessions)]
+    gate = asyncio.Semaphore(args.concurrency)
+    samples: dict = {"faq": [], "graph": []}
+
+    async def session(token: str, script: list) -> None:
+        for text in script:
+            async with gate:
+                started = time.perf_counter()
+                response = await client.post("/messages/process", json={"text": text},
+                                             headers={"Authorization": f"Bearer {token}"}, timeout=120)
+                elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            samples["faq" if response.json()["response"] in answers else "graph"].append(elapsed)
+
+    await asyncio.gather(*(session(t, s) for t, s in zip(tokens, scripts)))
+    return samples
+
+
+async def run(args, config: BenchConfig) -> None:
+    from benchmarks.stack import create_app
+
+    app = create_app(config)
+    from container import ServicesContainer  # noqa: E402  (modules read env at import)
+    from services.stage_metrics import stage_metrics
+
+    async with app.router.lifespan_context(app):
+        folder = Path(args.workdir) / "docs"
+        folder.mkdir()
+        shutil.copy(FAQ_DOCUMENT, folder / FAQ_DOCUMENT.name)
+        vectordb_service = ServicesContainer.vectordb_service()
+        await vectordb_service.ingest_to_vector_db(str(folder))
+
+        from services.ingestion.extractors import DocumentExtractor
+        from services.ingestion.faq import detect_faq
+        entries = detect_faq(DocumentExtractor().extract_chunks(folder / FAQ_DOCUMENT.name))
+        questions = [q for e in entries for q in faq_phrasings(e.question)]
+        print(f"{len(entries)} FAQ entries indexed; min score {ServicesContainer.faq_service().config.min_score}")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            stage_metrics.reset()
+            llm_before = ServicesContainer.llm_scheduler().stats()["completed"]
+            samples = await drive(client, args, questions, {e.answer for e in entries})
+            llm_calls = ServicesContainer.llm_scheduler().stats()["completed"] - llm_before
+            faq = (await client.get("/ops/metrics")).json()["faq"]
+
+    print(f"{'answered by':<12}{'turns':>7}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for kind, values in samples.items():
+        mean = 1000 * sum(values) / len(values) if values else 0.0
+        print(f"{kind:<12}{len(values):>7}{1000 * percentile(values, 0.5):>10.1f}"
+              f"{1000 * percentile(values, 0.95):>10.1f}{mean:>10.1f}")
+    graph_turns = len(samples["graph"])
+    print(f"FAQ lookups {faq['lookups']}, hits {faq['hits']} (hit rate {faq['hit_rate']:.0%}); "
+          f"{llm_calls} LLM calls, {llm_calls / max(1, graph_turns):.1f} per graph turn, 0 per FAQ turn")
+    lookup = stage_metrics.stats().get("faq.lookup")
+    if lookup:
+        print(f"FAQ lookup (every turn): p50 {lookup['p50_ms']} ms, p95 {lookup['p95_ms']} ms")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--faq-share", type=float, default=0.5)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        # the ingestion job checkpoints into its own throwaway store
+        os.environ["INGEST_CHECKPOINT_PATH"] = str(Path(workdir) / "checkpoints.sqlite3")
+        asyncio.run(run(args, BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
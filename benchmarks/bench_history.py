@@ -0,0 +1,141 @@
+"""
+`GET /messages/history` read path on a large history: the legacy path
+(full documents -> MessageInDB -> jsonable_encoder -> json) and offset paging
+via skip(), against keyset pages of projected dicts serialised by orjson.
+
+Runs on mongomock by default (no indexes, so it only shows the serialisation
+win); point `--mongo-uri` at a real server to see index-backed deep paging and
+the documents examined per page.
+
+    python -m benchmarks.bench_history --messages 100000 --limit 50
+    python -m benchmarks.bench_history --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+from dao.message_dao import MessageDAO  # noqa: E402  (modules read env at import)
+from models.message_model import MessageInDB  # noqa: E402
+from services.messaging_service import MessageService  # noqa: E402
+
+USER_ID = 1
+
+
+def seed_history(dao: MessageDAO, count: int) -> None:
+    """`count` messages for one user, alternating senders, a few sharing a timestamp."""
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(1, count + 1):
+        batch.append({
+            "id": i,
+            "text": f"message {i} about deductibles, copays and the out-of-pocket maximum",
+            "sender": "user" if i % 2 else "bot",
+            "user_id": USER_ID,
+            "timestamp": start + timedelta(seconds=i // 3),  # ties exercise the id tie-breaker
+        })
+        if len(batch) == 5000:
+            dao._messages.insert_many(batch)
+            batch = []
+    if batch:
+        dao._messages.insert_many(batch)
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def legacy_page(dao: MessageDAO, limit: int, offset: int = 0) -> bytes:
+    cursor = dao._messages.find({"user_id": USER_ID}).sort("timestamp", -1).skip(offset).limit(limit)
+    msgs = [MessageInDB(**doc) for doc in cursor]
+    return json.dumps(jsonable_encoder({"messages": msgs})).encode()
+
+
+def keyset_page(dao: MessageDAO, limit: int, before=None) -> bytes:
+    docs, _ = dao.get_messages_page(USER_ID, limit=limit, before=before)
+    return orjson.dumps({"messages": docs})
+
+
+def cursor_at(dao: MessageDAO, offset: int):
+    doc = dao._messages.find({"user_id": USER_ID}, MessageDAO.HISTORY_PROJECTION) \
+        .sort([("timestamp", -1), ("id", -1)]).skip(offset).limit(1).next()
+    return MessageService.decode_cursor(MessageService.encode_cursor(doc))
+
+
+def docs_examined(dao: MessageDAO, query: dict, sort: list, skip: int, limit: int) -> Optional[int]:
+    try:
+        plan = dao._messages.find(query).sort(sort).skip(skip).limit(limit).explain()
+        return plan["executionStats"]["totalDocsExamined"]
+    except Exception:
+        return None  # mongomock has no explain()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo-uri", default=None, help="real MongoDB (a throwaway database is used)")
+    args = parser.parse_args(argv)
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    db = client["bench_history"]
+    db.messages.drop()
+    dao = MessageDAO(db.messages, db.counters)
+
+    started = time.perf_counter()
+    seed_history(dao, args.messages)
+    print(f"seeded {args.messages} messages in {time.perf_counter() - started:.1f}s "
+          f"({'mongodb' if args.mongo_uri else 'mongomock'}), page size {args.limit}")
+
+    legacy_bytes, keyset_bytes = len(legacy_page(dao, args.limit)), len(keyset_page(dao, args.limit))
+    print(f"payload bytes/page: legacy {legacy_bytes}  keyset {keyset_bytes}")
+    full = list(dao._messages.find({"user_id": USER_ID}).limit(args.limit))
+    projected = [{k: d[k] for k in MessageDAO.HISTORY_PROJECTION if k != "_id"} for d in full]
+    encode_legacy = _time(lambda: json.dumps(jsonable_encoder({"messages": [MessageInDB(**d) for d in full]})),
+                          args.repeat * 20)
+    encode_fast = _time(lambda: orjson.dumps({"messages": projected}), args.repeat * 20)
+    print(f"serialise one page: legacy {encode_legacy:.3f} ms  orjson {encode_fast:.3f} ms "
+          f"({encode_legacy / encode_fast:.0f}x)")
+    print(f"{'depth':>8}{'legacy ms':>12}{'keyset ms':>12}{'speedup':>9}{'legacy docs':>13}{'keyset docs':>13}")
+    for depth in (0, args.messages // 10, args.messages // 2, args.messages - args.limit - 1):
+        before = cursor_at(dao, depth - 1) if depth else None
+        legacy_ms = _time(lambda: legacy_page(dao, args.limit, depth), args.repeat)
+        keyset_ms = _time(lambda: keyset_page(dao, args.limit, before), args.repeat)
+        keyset_query = {"user_id": USER_ID}
+        if before:
+            keyset_query["$or"] = [{"timestamp": {"$lt": before[0]}},
+                                   {"timestamp": before[0], "id": {"$lt": before[1]}}]
+        legacy_docs = docs_examined(dao, {"user_id": USER_ID}, [("timestamp", -1)], depth, args.limit)
+        keyset_docs = docs_examined(dao, keyset_query, [("timestamp", -1), ("id", -1)], 0, args.limit + 1)
+        print(f"{depth:>8}{legacy_ms:>12.2f}{keyset_ms:>12.2f}{legacy_ms / keyset_ms:>8.1f}x"
+              f"{str(legacy_docs if legacy_docs is not None else '-'):>13}"
+              f"{str(keyset_docs if keyset_docs is not None else '-'):>13}")
+
+    if args.mongo_uri:
+        client.drop_database("bench_history")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Overload test for admission control on `POST /messages/process`.
+
+Open-loop load: requests arrive at `--rate` per second whether or not earlier
+ones have finished, i.e. what real clients do when the LLM slows down. One
+"chatty" user sends `--chatty-share` of all requests; the rest is spread over
+`--users` ordinary users. Backend capacity is bounded by LLM_MAX_CONCURRENCY.
+
+Runs the same arrival sequence with admission control off and on (each in its
+own process) and reports latency of answered requests, best-effort replies
+(request deadline hit) and fast rejections, overall and for ordinary users.
+
+    python -m benchmarks.bench_overload --rate 8 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_process import QUESTIONS, _login, percentile
+from benchmarks.stack import BENEFITS, PLANS, BenchConfig
+
+
+def arrivals(rate: float, duration: float, users: int, chatty_share: float, seed: int) -> list:
+    """(offset seconds, user index, text); user 0 is the chatty one."""
+    rng = random.Random(seed)
+    out, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration:
+            return out
+        user = 0 if rng.random() < chatty_share else rng.randint(1, users)
+        text = rng.choice(QUESTIONS).format(plan=rng.choice(PLANS), benefit=rng.choice(BENEFITS))
+        out.append((t, user, text))
+
+
+async def drive(client: httpx.AsyncClient, args) -> dict:
+    from services.ai_processing_service import BEST_EFFORT_REPLY, BEST_EFFORT_CONTEXT_REPLY
+
+    best_effort_prefix = BEST_EFFORT_CONTEXT_REPLY.split("{")[0]
+
+    schedule = arrivals(args.rate, args.duration, args.users, args.chatty_share, args.seed)
+    tokens = [await _login(client, i) for i in range(args.users + 1)]
+    results = []  # (user, status, seconds)
+
+    async def one(offset: float, user: int, text: str, start: float):
+        await asyncio.sleep(max(0.0, start + offset - time.perf_counter()))
+        sent = time.perf_counter()
+        try:
+            response = await client.post("/messages/process", json={"text": text},
+                                         headers={"Authorization": f"Bearer {tokens[user]}"}, timeout=120)
+            status = str(response.status_code)
+            reply = response.json().get("response", "") if status == "200" else ""
+            if reply == BEST_EFFORT_REPLY or reply.startswith(best_effort_prefix):
+                status = "best_effort"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.append((user, status, time.perf_counter() - sent))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(offset, user, text, start) for offset, user, text in schedule))
+    return summarise(results)
+
+
+def summarise(results: list) -> dict:
+    def group(rows):
+        answered = [s for _, status, s in rows if status == "200"]
+        statuses = {}
+        for _, status, _ in rows:
+            statuses[status] = statuses.get(status, 0) + 1
+        rejected = [s for _, status, s in rows if status in ("429", "503")]
+        return {
+            "requests": len(rows),
+            "statuses": statuses,
+            "answered_p50_ms": round(1000 * percentile(answered, 0.50), 1),
+            "answered_p99_ms": round(1000 * percentile(answered, 0.99), 1),
+            "rejected_p50_ms": round(1000 * percentile(rejected, 0.50), 1),
+            "rejected_p99_ms": round(1000 * percentile(rejected, 0.99), 1),
+        }
+    return {"all": group(results), "ordinary": group([r for r in results if r[0] != 0])}
+
+
+async def run_mode(args) -> dict:
+    from benchmarks.stack import create_app
+
+    config = BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms)
+    app = create_app(config)
+    from container import ServicesContainer  # env is configured by create_app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            result = await drive(client, args)
+    result["admission"] = ServicesContainer.admission_controller().stats()
+    return result
+
+
+def spawn(mode: str, argv: list) -> dict:
+    env = {
+        **os.environ,
+        "ADMISSION_ENABLED": "true" if mode == "on" else "false",
+        "LLM_MAX_CONCURRENCY": os.environ.get("LLM_MAX_CONCURRENCY", "16"),
+        "LLM_CACHE_ENABLED": "false",  # identical questions must not get cheaper in one mode
+    }
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_overload", "--mode", mode, *argv],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=8.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--chatty-share", type=float, default=0.3)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=["on", "off"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:  # child process: one mode, JSON on the last line
+        print(json.dumps(asyncio.run(run_mode(args))))
+        return 0
+
+    child_argv = list(argv if argv is not None else sys.argv[1:])
+    print(f"{args.rate} req/s for {args.duration}s, {args.users} users + 1 sending "
+          f"{args.chatty_share:.0%} of requests, LLM_MAX_CONCURRENCY={os.environ.get('LLM_MAX_CONCURRENCY', '16')}")
+    print(f"{'admission':<11}{'users':<10}{'requests':>9}{'answered p50':>14}{'answered p99':>14}"
+          f"{'reject p50':>12}{'reject p99':>12}  statuses")
+    for mode in ("off", "on"):
+        result = spawn(mode, child_argv)
+        for label in ("all", "ordinary"):
+            r = result[label]
+            print(f"{mode:<11}{label:<10}{r['requests']:>9}{r['answered_p50_ms']:>14}{r['answered_p99_ms']:>14}"
+                  f"{r['rejected_p50_ms']:>12}{r['rejected_p99_ms']:>12}  {r['statuses']}")
+        if mode == "on":
+            print(f"admission metrics: {json.dumps(result['admission'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Retrieval precision with and without the plan metadata pre-filter.
+
+Asks benefit questions whose plan is known from the conversation but not named
+in the query itself ("And the specialist copay?" after "I'm on Gold 2500"),
+against the synthetic SOB corpus in the Pinecone stub. Reports, per top_k, the
+share of retrieved chunks that belong to that plan and the size of the context
+handed to the reply prompt.
+
+    python -m benchmarks.bench_plan_filter --corpus-size 2000 --queries 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import Optional
+
+from benchmarks.stack import BENEFITS, PLANS, BenchConfig, configure_environment, seed_pinecone
+
+configure_environment()
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from benchmarks.pinecone_stub import PineconeStub  # noqa: E402
+from models.vectordb_models import PineconeConfig  # noqa: E402
+from services.plans import detect_plan  # noqa: E402
+from services.rag_service.pinecone import PineconeDB  # noqa: E402
+from services.vector_db_service import VectorDbService  # noqa: E402
+
+
+async def evaluate(service: VectorDbService, questions: list, use_plan: bool) -> dict:
+    precision, context_chars, latencies = [], [], []
+    for question, plan in questions:
+        started = time.perf_counter()
+        docs = await service.retrieve(question, plan=plan if use_plan else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        relevant = [d for d, _ in docs if d.metadata.get("plan") == plan]
+        precision.append(len(relevant) / len(docs) if docs else 0.0)
+        context_chars.append(sum(len(d.page_content) for d, _ in docs))
+    return {
+        "precision": statistics.mean(precision),
+        "context_chars": statistics.mean(context_chars),
+        "p50_ms": statistics.median(latencies),
+    }
+
+
+async def run(args) -> None:
+    config = BenchConfig(corpus_size=args.corpus_size, seed=args.seed)
+    stub = PineconeStub()
+    base_url = stub.start()
+    seed_pinecone(base_url, config)
+
+    rng = random.Random(args.seed)
+    questions = []
+    for _ in range(args.queries):
+        plan = rng.choice(PLANS)
+        questions.append((f"What is the {rng.choice(BENEFITS)}?", detect_plan(plan)))
+
+    print(f"{args.corpus_size} chunks, {args.queries} plan-specific questions")
+    print(f"{'top_k':>6}{'mode':>12}{'precision':>11}{'useful chars':>14}{'p50 ms':>9}")
+    for top_k in args.top_k:
+        db = PineconeDB(PineconeConfig(api_key="bench", base_url=base_url, top_k=top_k),
+                        embeddings=FakeEmbeddings(latency_ms=0, seed=args.seed))
+        service = VectorDbService(db)
+        for label, use_plan in (("unfiltered", False), ("plan", True)):
+            r = await evaluate(service, questions, use_plan)
+            useful = r["context_chars"] * r["precision"]
+            print(f"{top_k:>6}{label:>12}{r['precision']:>11.3f}{useful:>14.0f}{r['p50_ms']:>9.2f}")
+        await db.aclose()
+    stub.stop()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args(argv)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
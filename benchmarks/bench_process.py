@@ -0,0 +1,232 @@
+"""
+Offline load test for `POST /messages/process`.
+
+Drives concurrent, multi-turn chat sessions against the real app wired to local
+stand-ins (see benchmarks.stack) and reports throughput, latency percentiles and
+a per-stage breakdown. Same seed + same config => same workload.
+
+    python -m benchmarks.bench_process --sessions 40 --turns 4 --concurrency 16
+    python -m benchmarks.bench_process --output run.json --baseline main.json
+    python -m benchmarks.bench_process --cache-backend shm   # user records served from the shared cache
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Optional
+
+import httpx
+
+from benchmarks.stack import BENCH_PASSWORD, BenchConfig, PLANS, BENEFITS
+
+QUESTIONS = [
+    "Hi there",
+    "What is the deductible for the {plan} plan?",
+    "How much is a specialist visit on {plan}?",
+    "Does {plan} cover {benefit} out of network?",
+    "What would I pay for {benefit}?",
+    "Can you compare {plan} with Gold 2500?",
+    "Is there a copay for urgent care?",
+    "Thanks, that helps",
+]
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def session_script(rng: random.Random, turns: int) -> list[str]:
+    plan = rng.choice(PLANS)
+    return [
+        rng.choice(QUESTIONS).format(plan=plan, benefit=rng.choice(BENEFITS))
+        for _ in range(turns)
+    ]
+
+
+async def _login(client: httpx.AsyncClient, index: int) -> str:
+    email = f"bench-user-{index}@example.com"
+    await client.post("/user/register", json={
+        "user_name": f"bench{index}", "user_email": email, "password": BENCH_PASSWORD,
+    })
+    response = await client.post("/user/login", data={"username": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_workload(client: httpx.AsyncClient, sessions: int, turns: int,
+                       concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    scripts = [session_script(rng, turns) for _ in range(sessions)]
+    tokens = [await _login(client, i) for i in range(sessions)]
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+
+    async def session(index: int):
+        headers = {"Authorization": f"Bearer {tokens[index]}"}
+        for text in scripts[index]:
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/messages/process", json={"text": text},
+                                                 headers=headers, timeout=120)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+            if status == "200":
+                latencies.append(elapsed)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(1000 * percentile(latencies, 0.50), 2),
+            "p95": round(1000 * percentile(latencies, 0.95), 2),
+            "p99": round(1000 * percentile(latencies, 0.99), 2),
+        },
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def bench_in_process(args, config: BenchConfig) -> dict:
+    from benchmarks.stack import create_app
+    from services.stage_metrics import stage_metrics
+
+    app = create_app(config)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            stage_metrics.reset()
+            result = await run_workload(client, args.sessions, args.turns, args.concurrency, config.seed)
+    result["stages"] = stage_metrics.stats()
+    result["stage_skips"] = stage_metrics.skips()
+    return result
+
+
+async def bench_http(args, config: BenchConfig) -> dict:
+    async with httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        result = await run_workload(client, args.sessions, args.turns, args.concurrency, config.seed)
+        metrics = (await client.get("/ops/metrics")).json()
+    result["stages"] = metrics.get("stages", {})
+    result["stage_skips"] = metrics.get("stage_skips", {})
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions beyond `tolerance` (fractional) against a previous run."""
+    problems = []
+    for q in ("p50", "p95", "p99"):
+        old, new = baseline["latency_ms"][q], result["latency_ms"][q]
+        if old and new > old * (1 + tolerance):
+            problems.append(f"latency {q} {old}ms -> {new}ms")
+    old, new = baseline["throughput_rps"], result["throughput_rps"]
+    if old and new < old * (1 - tolerance):
+        problems.append(f"throughput {old} -> {new} req/s")
+    return problems
+
+
+def print_report(result: dict) -> None:
+    lat = result["latency_ms"]
+    print(f"requests={result['requests']} ok={result['ok']} errors={result['errors']} wall={result['wall_s']}s")
+    print(f"throughput={result['throughput_rps']} req/s  "
+          f"p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms")
+    if result.get("stages"):
+        print(f"{'stage':<42}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}")
+        for stage, s in sorted(result["stages"].items()):
+            print(f"{stage:<42}{s['count']:>7}{s['mean_ms']:>10}{s['p50_ms']:>10}{s['p95_ms']:>10}")
+    if result.get("stage_skips"):
+        print("skipped to meet the request deadline: " +
+              ", ".join(f"{stage} {reasons}" for stage, reasons in sorted(result["stage_skips"].items())))
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-per-token-ms", type=float, default=2.0)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    parser.add_argument("--embed-latency-ms", type=float, default=40.0)
+    parser.add_argument("--pinecone-latency-ms", type=float, default=15.0)
+    parser.add_argument("--corpus-size", type=int, default=300)
+    parser.add_argument("--cache-backend", choices=["memory", "shm", "resp"],
+                        help="CACHE_BACKEND of the in-process app (resp runs against benchmarks.redis_stub)")
+    parser.add_argument("--url", help="benchmark an already running server instead of the in-process app")
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(
+        seed=args.seed,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_per_token_ms=args.llm_per_token_ms,
+        reply_tokens=args.reply_tokens,
+        embed_latency_ms=args.embed_latency_ms,
+        pinecone_latency_ms=args.pinecone_latency_ms,
+        corpus_size=args.corpus_size,
+    )
+    runner = bench_http if args.url else bench_in_process
+    stub = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.cache_backend:
+            # read when the container is imported, i.e. by create_app
+            os.environ.update({"CACHE_BACKEND": args.cache_backend, "CACHE_SHM_PATH": f"{tmp}/cache"})
+            if args.cache_backend == "resp":
+                from benchmarks.redis_stub import RedisStub
+
+                stub = RedisStub()
+                os.environ["CACHE_URL"] = stub.start()
+        result = asyncio.run(runner(args, config))
+    if stub is not None:
+        stub.stop()
+    result["config"] = {**asdict(config), "sessions": args.sessions, "turns": args.turns,
+                        "concurrency": args.concurrency, "cache_backend": args.cache_backend or "memory"}
+    result["environment"] = {"python": platform.python_version(), "revision": _git_revision()}
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(result, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION: {p}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
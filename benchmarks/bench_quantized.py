@@ -0,0 +1,89 @@
+"""
+Recall and memory of the quantized local index against exact float32 search.
+
+Builds the same synthetic corpus (clustered, ada-002 sized vectors) as float32,
+float16 and int8 stores and reports recall@k against brute-force float32, with
+and without float32 rescoring, plus query latency and bytes per vector.
+
+    python -m benchmarks.bench_quantized --vectors 100000 --queries 200 --k 10
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+from services.rag_service.local_index import QuantizedVectorStore, _normalise  # noqa: E402
+
+
+def synthetic_vectors(count: int, dims: int, seed: int, clusters: int = 256) -> np.ndarray:
+    """Vectors scattered around random centroids, roughly like chunk embeddings of related documents."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    out = np.empty((count, dims), dtype=np.float32)
+    for start in range(0, count, 50_000):
+        end = min(count, start + 50_000)
+        out[start:end] = centroids[labels[start:end]] + 0.8 * rng.standard_normal((end - start, dims))
+    return _normalise(out)
+
+
+def build(path: Path, vectors: np.ndarray, dtype: str, rescore: bool) -> QuantizedVectorStore:
+    store = QuantizedVectorStore(path, vectors.shape[1], dtype, keep_full=rescore)
+    for start in range(0, len(vectors), 20_000):
+        chunk = vectors[start:start + 20_000]
+        ids = [str(i) for i in range(start, start + len(chunk))]
+        store.upsert(ids, chunk, [{} for _ in ids])
+    return store
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    vectors = synthetic_vectors(args.vectors, args.dims, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, args.vectors, args.queries)
+    queries = _normalise(vectors[picks] + 0.5 * rng.standard_normal((args.queries, args.dims)).astype(np.float32) /
+                         np.sqrt(args.dims) * 10)
+    truth = [set(np.argpartition(-(vectors @ q), args.k)[:args.k].tolist()) for q in queries]
+
+    print(f"{args.vectors} vectors x {args.dims} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'index':<22}{'recall':>8}{'p50 ms':>9}{'B/vector':>10}{'GB / 1M (search)':>18}{'GB / 1M (disk)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, rescore in (("float32", False), ("float16", False), ("float16", True),
+                               ("int8", False), ("int8", True)):
+            store = build(Path(tmp) / f"{dtype}-{rescore}", vectors, dtype, rescore)
+            hits, latencies = 0, []
+            for q, expected in zip(queries, truth):
+                started = time.perf_counter()
+                rows = store.search(q, args.k, rescore=rescore, candidates=args.candidates)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(expected & {row for row, _ in rows})
+            sizes = store.nbytes()
+            per_vector = sizes["search_resident"] / args.vectors
+            disk = (sizes.get("vectors.bin", 0) + sizes.get("scales.bin", 0) + sizes.get("full.bin", 0)) / args.vectors
+            label = f"{dtype}{' + rescore' if rescore else ''}"
+            print(f"{label:<22}{hits / (args.k * args.queries):>8.3f}{statistics.median(latencies):>9.2f}"
+                  f"{per_vector:>10.0f}{per_vector * 1e6 / 1e9:>18.2f}{disk * 1e6 / 1e9:>16.2f}")
+    print("search = pages touched for every query (shared across workers via mmap); "
+          "disk adds the float32 copy read only for rescoring")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
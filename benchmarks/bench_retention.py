@@ -0,0 +1,132 @@
+"""
+Message retention: size of the hot `messages` collection and its index, and
+read latency, before and after `MessageArchiver` compacts old messages into
+`message_archive`; also checks that paging through the whole history returns
+exactly the same messages afterwards (read-through to the archive).
+
+A year of history for `--users` users, `--per-day` messages each per day.
+Index and collection sizes need a real server (`--mongo-uri`); on mongomock
+only counts and timings are reported.
+
+    python -m benchmarks.bench_retention --users 20 --per-day 2 --hot-days 30
+    python -m benchmarks.bench_retention --users 500 --per-day 6 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+from dao.message_archive_dao import MessageArchiveDAO  # noqa: E402  (modules read env at import)
+from dao.message_dao import MessageDAO  # noqa: E402
+from models.ai_processing_models import RetentionConfig  # noqa: E402
+from services.message_retention import MessageArchiver  # noqa: E402
+from services.messaging_service import MessageService  # noqa: E402
+
+NOW = datetime(2025, 1, 1)
+
+
+def seed(dao: MessageDAO, users: int, per_day: int, days: int, seed: int) -> int:
+    rng = random.Random(seed)
+    docs, next_id = [], 1
+    for user_id in range(1, users + 1):
+        for day in range(days, 0, -1):
+            for _ in range(rng.randint(0, 2 * per_day)):
+                ts = NOW - timedelta(days=day, seconds=rng.randint(0, 86_399))
+                docs.append({"id": next_id, "user_id": user_id, "sender": rng.choice(["user", "bot"]),
+                             "text": f"message {next_id} about the deductible, copay and out-of-pocket maximum",
+                             "timestamp": ts.replace(microsecond=0)})
+                next_id += 1
+    for i in range(0, len(docs), 5000):
+        dao._messages.insert_many(docs[i:i + 5000])
+    return len(docs)
+
+
+def sizes(db) -> dict:
+    try:
+        stats = db.command("collStats", "messages")
+        return {"data_mb": round(stats["size"] / 1e6, 1), "index_mb": round(stats["totalIndexSize"] / 1e6, 1)}
+    except Exception:
+        return {}  # mongomock
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def full_history(service: MessageService, user_id: int, limit: int) -> list:
+    out, before = [], None
+    while True:
+        page = service.get_history_page(user_id, limit=limit, before=before)
+        out += [m["id"] for m in page["messages"]]
+        if not page["next_before"]:
+            return out
+        before = page["next_before"]
+
+
+def measure(label: str, db, dao: MessageDAO, service: MessageService, args) -> None:
+    users = range(1, args.users + 1)
+    hot = dao._messages.count_documents({})
+    recent = _time(lambda: [dao.get_messages(u, limit=20) for u in users], args.repeat) / args.users
+    first = _time(lambda: [service.get_history_page(u, limit=50) for u in users], args.repeat) / args.users
+    print(f"{label:<8}{hot:>10}{recent:>12.3f}{first:>12.3f}  {sizes(db) or '(sizes need --mongo-uri)'}")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--per-day", type=int, default=2)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--hot-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mongo-uri", default=None, help="real MongoDB (a throwaway database is used)")
+    args = parser.parse_args(argv)
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    client.drop_database("bench_retention")
+    db = client["bench_retention"]
+    dao, archive = MessageDAO(db.messages, db.counters), MessageArchiveDAO(db.message_archive)
+    service = MessageService(dao, user_dao=None, ai_processing_service=None, archive_dao=archive)
+
+    total = seed(dao, args.users, args.per_day, args.days, args.seed)
+    print(f"{total} messages, {args.users} users over {args.days} days "
+          f"({'mongodb' if args.mongo_uri else 'mongomock'}); keep {args.hot_days} days hot")
+    sample = list(range(1, args.users + 1, max(1, args.users // 10)))
+    expected = {u: full_history(service, u, 50) for u in sample}
+
+    print(f"{'':<8}{'hot docs':>10}{'last 20 ms':>12}{'page 1 ms':>12}")
+    measure("before", db, dao, service, args)
+    archiver = MessageArchiver(RetentionConfig(hot_days=args.hot_days), dao, archive)
+    report = archiver.run(now=NOW)
+    measure("after", db, dao, service, args)
+    print(f"archived {report['messages']} messages in {report['batches']} batches, "
+          f"{report['raw_bytes'] / 1e6:.1f} MB -> {report['archived_bytes'] / 1e6:.1f} MB, {report['seconds']}s")
+
+    deep = _time(lambda: [full_history(service, u, 50) for u in sample], 1)
+    same = all(full_history(service, u, 50) == expected[u] for u in sample)
+    print(f"full history walk of {len(sample)} users through the archive: {deep:.0f} ms, identical: {same}")
+
+    if args.mongo_uri:
+        client.drop_database("bench_retention")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Cost of client retries during a latency incident, with and without
+idempotency keys on `POST /messages/process`.
+
+Each user sends `--turns` messages in sequence. The LLM is slow
+(`--llm-latency-ms`), so the client times out after `--client-timeout` and
+resubmits, up to `--attempts` times; the last attempt waits as long as it
+takes. With keys, every attempt of a turn carries the same `Idempotency-Key`;
+without, the server sees independent requests (IDEMPOTENCY_ENABLED=false).
+
+Reports LLM calls, pipeline runs and stored user messages per answered turn.
+
+    python -m benchmarks.bench_retry_storm --users 20 --turns 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_process import _login, session_script
+from benchmarks.bench_server import wait_until_up
+from benchmarks.stack import BenchConfig
+
+
+async def user_turns(client: httpx.AsyncClient, token: str, script: list, args, use_keys: bool,
+                     counts: dict) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    for text in script:
+        key = uuid.uuid4().hex
+        for attempt in range(1, args.attempts + 1):
+            timeout = args.client_timeout if attempt < args.attempts else 120
+            counts["requests"] += 1
+            try:
+                response = await client.post("/messages/process", json={"text": text}, timeout=timeout,
+                                             headers={**headers, "Idempotency-Key": key} if use_keys else headers)
+            except httpx.TimeoutException:
+                continue
+            if response.status_code == 200:
+                counts["answered"] += 1
+                break
+
+
+async def drive(url: str, args, use_keys: bool) -> dict:
+    rng = random.Random(args.seed)
+    scripts = [session_script(rng, args.turns) for _ in range(args.users)]
+    counts = {"requests": 0, "answered": 0}
+    async with httpx.AsyncClient(base_url=url, limits=httpx.Limits(max_connections=None)) as client:
+        tokens = [await _login(client, i) for i in range(args.users)]
+        started = time.perf_counter()
+        await asyncio.gather(*(user_turns(client, t, s, args, use_keys, counts) for t, s in zip(tokens, scripts)))
+        wall = time.perf_counter() - started
+        await asyncio.sleep(args.llm_latency_ms * 6 / 1000)  # let abandoned runs finish before counting
+        metrics = (await client.get("/ops/metrics")).json()
+        stored = 0
+        for token in tokens:
+            page = (await client.get("/messages/history", params={"limit": 500},
+                                     headers={"Authorization": f"Bearer {token}"})).json()
+            stored += sum(1 for m in page["messages"] if m["sender"] == "user")
+    return {
+        **counts,
+        "wall_s": round(wall, 1),
+        "llm_calls": metrics["llm_scheduler"]["completed"],
+        "pipeline_runs": metrics["stages"].get("graph.total", {}).get("count", 0),
+        "stored_user_messages": stored,
+        "idempotency": metrics["idempotency"],
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--attempts", type=int, default=4)
+    parser.add_argument("--client-timeout", type=float, default=1.5)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms)
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{args.users} users x {args.turns} turns, client timeout {args.client_timeout}s, "
+          f"up to {args.attempts} attempts, LLM latency {args.llm_latency_ms} ms")
+    print(f"{'mode':<9}{'requests':>9}{'answered':>9}{'pipelines':>10}{'llm calls':>10}"
+          f"{'stored msgs':>12}{'llm/turn':>9}")
+    for mode in ("no keys", "keys"):
+        use_keys = mode == "keys"
+        env = {**os.environ, **config.to_env(), "LLM_CACHE_ENABLED": "false", "WARMUP_ENABLED": "false",
+               "ADMISSION_ENABLED": "false", "IDEMPOTENCY_ENABLED": "true" if use_keys else "false"}
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "benchmarks.stack:create_app", "--factory",
+                                   "--port", str(args.port), "--log-level", "warning"], env=env)
+        try:
+            wait_until_up(url)
+            r = asyncio.run(drive(url, args, use_keys))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=90)
+        per_turn = r["llm_calls"] / max(1, r["answered"])
+        print(f"{mode:<9}{r['requests']:>9}{r['answered']:>9}{r['pipeline_runs']:>10}{r['llm_calls']:>10}"
+              f"{r['stored_user_messages']:>12}{per_turn:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Throughput comparison of launch modes on the offline benchmark workload.
+
+• dev:  what `python main.py` / `uvicorn main:app` gives you – one process,
+        asyncio loop, h11 parser.
+• prod: `server.py` – N workers, uvloop, httptools.
+
+Both serve the benchmark app (benchmarks.stack) and share one Pinecone stand-in.
+
+    python -m benchmarks.bench_server --workers 4 --sessions 64 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_process import run_workload
+from benchmarks.pinecone_stub import PineconeStub
+from benchmarks.stack import BenchConfig, seed_pinecone
+
+MODES = {
+    "dev": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "benchmarks.stack:create_app", "--factory",
+        "--port", str(port), "--loop", "asyncio", "--http", "h11", "--log-level", "warning",
+    ],
+    "prod": lambda port, workers: [
+        sys.executable, "server.py", "--app", "benchmarks.stack:create_app", "--factory",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ],
+}
+
+
+def wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/openapi.json", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not come up within {timeout}s")
+
+
+def run_mode(mode: str, args, config: BenchConfig) -> dict:
+    env = {**os.environ, **config.to_env()}
+    server = subprocess.Popen(MODES[mode](args.port, args.workers), env=env)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(url)
+
+        async def drive():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+                return await run_workload(client, args.sessions, args.turns, args.concurrency, config.seed)
+
+        return asyncio.run(drive())
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=90)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["dev", "prod"], choices=sorted(MODES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0,
+                        help="kept low so the server's own CPU cost dominates")
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms, llm_per_token_ms=0.0,
+                         embed_latency_ms=5.0, pinecone_latency_ms=0.0, users=args.sessions)
+    stub = PineconeStub()
+    config.pinecone_url = stub.start()
+    seed_pinecone(config.pinecone_url, config)
+
+    results = {mode: run_mode(mode, args, config) for mode in args.modes}
+
+    print(f"{'mode':<8}{'ok':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for mode, r in results.items():
+        lat = r["latency_ms"]
+        print(f"{mode:<8}{r['ok']:>6}{r['throughput_rps']:>10}{lat['p50']:>10}{lat['p95']:>10}{lat['p99']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Per-turn cost of the chat channels: `POST /messages/process` against the
+`/messages/ws` socket, on the same multi-turn sessions.
+
+Runs the benchmark app under uvicorn (real HTTP and WebSocket framing) and
+reports, per turn, time to the first reply text (the whole reply over HTTP,
+the first streamed token over the socket) and time to the complete reply,
+plus the server-side time per turn spent storing messages and loading
+history, from /ops/metrics.
+
+    python -m benchmarks.bench_socket --sessions 32 --turns 6 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+import websockets
+
+from benchmarks.bench_process import _login, percentile, session_script
+from benchmarks.bench_server import wait_until_up
+from benchmarks.stack import BenchConfig
+
+OVERHEAD_STAGES = ("messages.store_user", "messages.load_history", "messages.store_bot")
+
+
+async def http_session(client: httpx.AsyncClient, token: str, script: list, samples: list) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    for text in script:
+        sent = time.perf_counter()
+        response = await client.post("/messages/process", json={"text": text}, headers=headers, timeout=120)
+        response.raise_for_status()
+        elapsed = time.perf_counter() - sent
+        samples.append((elapsed, elapsed))
+
+
+async def socket_session(url: str, token: str, script: list, samples: list) -> None:
+    async with websockets.connect(f"{url}/messages/ws?token={token}") as ws:
+        assert json.loads(await ws.recv())["type"] == "ready"
+        for i, text in enumerate(script):
+            sent = time.perf_counter()
+            first = None
+            await ws.send(json.dumps({"type": "message", "id": i, "text": text}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] == "token" and first is None:
+                    first = time.perf_counter() - sent
+                elif frame["type"] == "final":
+                    total = time.perf_counter() - sent
+                    samples.append((first if first is not None else total, total))
+                    break
+                elif frame["type"] == "error":
+                    raise RuntimeError(frame)
+
+
+async def drive(url: str, channel: str, args) -> dict:
+    rng = random.Random(args.seed)
+    scripts = [session_script(rng, args.turns) for _ in range(args.sessions)]
+    gate = asyncio.Semaphore(args.concurrency)
+    samples: list = []
+    async with httpx.AsyncClient(base_url=url) as client:
+        tokens = [await _login(client, i) for i in range(args.sessions)]
+        before = (await client.get("/ops/metrics")).json()["stages"]
+
+        async def one(token: str, script: list):
+            async with gate:
+                if channel == "http":
+                    await http_session(client, token, script, samples)
+                else:
+                    await socket_session(url.replace("http", "ws", 1), token, script, samples)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(t, s) for t, s in zip(tokens, scripts)))
+        wall = time.perf_counter() - started
+        after = (await client.get("/ops/metrics")).json()["stages"]
+
+    def spent(stages: dict, name: str) -> float:
+        s = stages.get(name) or {}
+        return s.get("count", 0) * s.get("mean_ms", 0.0)
+
+    overhead_ms = sum(spent(after, n) - spent(before, n) for n in OVERHEAD_STAGES)
+    first, total = [f for f, _ in samples], [t for _, t in samples]
+    return {
+        "turns": len(samples),
+        "turns_per_s": round(len(samples) / wall, 1),
+        "first_p50_ms": round(1000 * percentile(first, 0.50), 1),
+        "first_p95_ms": round(1000 * percentile(first, 0.95), 1),
+        "total_p50_ms": round(1000 * percentile(total, 0.50), 1),
+        "total_p95_ms": round(1000 * percentile(total, 0.95), 1),
+        "overhead_ms_per_turn": round(overhead_ms / max(1, len(samples)), 2),
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(seed=args.seed, llm_latency_ms=args.llm_latency_ms)
+    env = {**os.environ, **config.to_env(), "LLM_CACHE_ENABLED": "false", "WARMUP_ENABLED": "false"}
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{args.sessions} sessions x {args.turns} turns, {args.concurrency} at a time, "
+          f"LLM latency {args.llm_latency_ms} ms")
+    print(f"{'channel':<9}{'turns/s':>9}{'first p50':>11}{'first p95':>11}{'total p50':>11}{'total p95':>11}"
+          f"{'store+history':>15}")
+    for channel in ("http", "ws"):
+        # a fresh server per channel so history and caches start equal
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "benchmarks.stack:create_app", "--factory",
+                                   "--port", str(args.port), "--log-level", "warning"], env=env)
+        try:
+            wait_until_up(url)
+            r = asyncio.run(drive(url, channel, args))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=90)
+        print(f"{channel:<9}{r['turns_per_s']:>9}{r['first_p50_ms']:>11}{r['first_p95_ms']:>11}"
+              f"{r['total_p50_ms']:>11}{r['total_p95_ms']:>11}{r['overhead_ms_per_turn']:>13} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
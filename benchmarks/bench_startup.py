@@ -0,0 +1,89 @@
+"""
+Cold-start cost of the API process: module import time plus the lifespan
+(service construction), each measured in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Optional
+
+from benchmarks.stack import configure_environment
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import main
+print(time.perf_counter() - t)
+"""
+
+LIFESPAN_SNIPPET = """
+import asyncio, time
+t = time.perf_counter()
+from benchmarks.stack import create_app, BenchConfig
+app = create_app(BenchConfig(corpus_size=1))
+imported = time.perf_counter()
+
+async def start():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(start())
+print(imported - t, time.perf_counter() - imported)
+"""
+
+
+def _python(snippet: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", snippet], capture_output=True, text=True,
+                          env=os.environ.copy(), check=True)
+
+
+def top_imports(count: int) -> list[tuple[int, str]]:
+    """Heaviest top-level packages by cumulative import time (µs)."""
+    stderr = _python("import main", "-X", "importtime").stderr
+    totals = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            micros = int(cumulative)
+        except ValueError:
+            continue  # header line
+        if name.startswith("   ") and not name.startswith("    "):  # direct imports of `main`'s tree
+            totals.append((micros, name.strip()))
+    heavy = {}
+    for micros, name in totals:
+        heavy[name] = max(micros, heavy.get(name, 0))
+    return sorted(((v, k) for k, v in heavy.items()), reverse=True)[:count]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    configure_environment()
+
+    imports = [float(_python(IMPORT_SNIPPET).stdout.split()[-1]) for _ in range(args.runs)]
+    lifespans = []
+    for _ in range(args.runs):
+        _, construct = _python(LIFESPAN_SNIPPET).stdout.split()[-2:]
+        lifespans.append(float(construct))
+
+    print(f"import main      median {statistics.median(imports) * 1000:8.1f} ms  (runs={args.runs})")
+    print(f"lifespan startup median {statistics.median(lifespans) * 1000:8.1f} ms  (mongomock, fakes)")
+    heavy_ingestion = _python("import main, sys; print([m for m in ('pandas', 'camelot', 'pdfplumber', 'docx') "
+                              "if m in sys.modules])").stdout.strip()
+    print(f"ingestion modules loaded by the API: {heavy_ingestion}")
+    print("heaviest imports:")
+    for micros, name in top_imports(args.top):
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
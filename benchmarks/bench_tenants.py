@@ -0,0 +1,120 @@
+"""
+Memory and retrieval latency of the local index as the tenant count grows.
+
+Builds `--vectors` synthetic chunks per tenant into one local index (a
+namespace per tenant, as ingestion with --tenant does), then sends retrievals
+through VectorDbService with tenants picked from a Zipf distribution: a few
+large brands get most of the traffic. For each tenant count, an unbounded
+index is compared with one capped at `--max-resident-mb` (LRU eviction):
+process RSS, resident estimate, shards loaded / evicted and query latency.
+
+    python -m benchmarks.bench_tenants --tenants 1,10,50,100 --vectors 500 --max-resident-mb 16
+"""
+import argparse
+import asyncio
+import gc
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+from benchmarks.bench_process import percentile  # noqa: E402
+from benchmarks.bench_quantized import synthetic_vectors  # noqa: E402
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from models.vectordb_models import LocalIndexConfig, TenantConfig  # noqa: E402
+from services.plans import PLANS  # noqa: E402
+from services.rag_service.local_index import LocalVectorDB, QuantizedVectorStore  # noqa: E402
+from services.tenants import TenantRouter  # noqa: E402
+from services.vector_db_service import VectorDbService  # noqa: E402
+
+WORDS = "deductible copay coinsurance specialist urgent care pharmacy network referral hospital".split()
+
+
+def rss_mb() -> float:
+    """Resident set size of this process (Linux); mapped index pages count once touched."""
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build(root: Path, tenants: int, args) -> None:
+    service = VectorDbService(vector_db=None)  # only its namespace naming
+    plans = list(PLANS)
+    for t in range(tenants):
+        tenant = f"brand-{t}"
+        vectors = synthetic_vectors(args.vectors, args.dims, seed=args.seed + t, clusters=32)
+        store = QuantizedVectorStore(root / service.namespace_for(tenant), args.dims, "int8", keep_full=args.rescore)
+        store.upsert([f"{tenant}-{i}" for i in range(args.vectors)], vectors,
+                     [{"text": f"{tenant} chunk {i} " + " ".join(WORDS[(i + k) % len(WORDS)] for k in range(30)),
+                       "plan": plans[i % len(plans)]} for i in range(args.vectors)])
+
+
+async def measure(root: Path, tenants: int, cap: Optional[float], args) -> dict:
+    gc.collect()
+    before = rss_mb()
+    config = LocalIndexConfig(path=str(root), dims=args.dims, rescore=args.rescore, max_resident_mb=cap)
+    vector_db = LocalVectorDB(config, embeddings=FakeEmbeddings(dims=args.dims, latency_ms=0))
+    service = VectorDbService(vector_db=vector_db, tenants=TenantRouter(TenantConfig()))
+
+    rng = np.random.default_rng(args.seed)
+    weights = 1 / np.arange(1, tenants + 1) ** args.zipf
+    picks = rng.choice(tenants, size=args.queries, p=weights / weights.sum())
+    latencies = []
+    for n, t in enumerate(picks):
+        query = " ".join(WORDS[(n + k) % len(WORDS)] for k in range(6))
+        started = time.perf_counter()
+        await service.retrieve(query, plan=list(PLANS)[n % len(PLANS)], tenant=f"brand-{t}")
+        latencies.append(time.perf_counter() - started)
+    stats = vector_db.stats()
+    return {
+        "rss_mb": rss_mb() - before,
+        "resident_mb": stats["resident_mb"],
+        "loaded": stats["namespaces_loaded"],
+        "evictions": stats["evictions"],
+        "p50_ms": 1000 * percentile(latencies, 0.5),
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+        "mean_ms": 1000 * statistics.fmean(latencies),
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", default="1,10,50,100", help="comma-separated tenant counts")
+    parser.add_argument("--vectors", type=int, default=500, help="chunks per tenant")
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of traffic across tenants")
+    parser.add_argument("--max-resident-mb", type=float, default=16.0)
+    parser.add_argument("--rescore", action="store_true", help="keep float32 originals (4x the disk)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    counts = [int(c) for c in args.tenants.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        started = time.perf_counter()
+        build(root, max(counts), args)
+        print(f"built {max(counts)} tenants x {args.vectors} vectors in {time.perf_counter() - started:.1f}s; "
+              f"{args.queries} Zipf({args.zipf}) queries per run")
+        print(f"{'tenants':>8}  {'index':<14}{'RSS +MB':>9}{'resident MB':>13}{'loaded':>8}{'evicted':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}")
+        for tenants in counts:
+            for label, cap in (("unbounded", None), (f"cap {args.max_resident_mb:g} MB", args.max_resident_mb)):
+                r = asyncio.run(measure(root, tenants, cap, args))
+                print(f"{tenants:>8}  {label:<14}{r['rss_mb']:>9.1f}{r['resident_mb']:>13.1f}{r['loaded']:>8}"
+                      f"{r['evictions']:>9}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['mean_ms']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Pinecone upsert throughput and loss: the old fixed-batch serial loop against
+`PineconeDB.upsert_all` (size-packed, concurrent, retried) on the local stub.
+
+The stub enforces Pinecone's 2 MB request limit, adds latency per request and
+per MB, and answers a share of upserts with 503. Vectors are ada-002 sized with
+chunk texts of varying length in their metadata.
+
+    python -m benchmarks.bench_upsert --vectors 5000 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.stack import configure_environment
+
+configure_environment()
+
+from benchmarks.fakes import FakeEmbeddings  # noqa: E402
+from benchmarks.pinecone_stub import PineconeStub  # noqa: E402
+from models.vectordb_models import PineconeConfig  # noqa: E402
+from services.rag_service.pinecone import PineconeDB  # noqa: E402
+
+WORDS = "deductible copay coinsurance network provider specialist emergency pharmacy plan member".split()
+
+
+def synthetic_vectors(count: int, dims: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    values = (rng.standard_normal((count, dims)) / np.sqrt(dims)).astype(np.float32)
+    lengths = rng.lognormal(mean=6.0, sigma=1.0, size=count).astype(int).clip(20, 20_000)  # chars of text
+    vectors = []
+    for i in range(count):
+        text = " ".join(rng.choice(WORDS, size=max(1, lengths[i] // 9)))
+        vectors.append({"id": f"vec-{i}", "values": values[i].tolist(),
+                        "metadata": {"text": text, "source": f"doc-{i % 50}.pdf", "plan": "general"}})
+    return vectors
+
+
+async def legacy(db: PineconeDB, vectors: list, namespace: str) -> dict:
+    """What ingest_data did before: fixed 100-vector batches, one at a time, failures logged and dropped."""
+    upserted, requests = 0, 0
+    for i in range(0, len(vectors), 100):
+        batch = vectors[i:i + 100]
+        requests += 1
+        try:
+            await db.upsert_vectors(batch, namespace=namespace)
+            upserted += len(batch)
+        except Exception:
+            pass
+    return {"requests": requests, "retries": 0, "upserted": upserted}
+
+
+async def run(args) -> None:
+    vectors = synthetic_vectors(args.vectors, args.dims, args.seed)
+    print(f"{args.vectors} vectors x {args.dims} dims, stub latency {args.latency_ms} ms + "
+          f"{args.ms_per_mb} ms/MB, {args.failure_rate:.0%} transient 503s")
+    print(f"{'mode':<22}{'seconds':>9}{'vectors/s':>11}{'requests':>10}{'retries':>9}{'lost':>7}{'stored':>8}")
+
+    modes = [("legacy (100, serial)", None)] + [(f"packed x{c}", c) for c in args.concurrency]
+    for label, concurrency in modes:
+        stub = PineconeStub(latency_ms=args.latency_ms, upsert_failure_rate=args.failure_rate,
+                            upsert_ms_per_mb=args.ms_per_mb, seed=args.seed)
+        base_url = stub.start()
+        config = PineconeConfig(api_key="bench", base_url=base_url, upsert_concurrency=concurrency or 1,
+                                upsert_backoff_seconds=args.backoff)
+        db = PineconeDB(config, embeddings=FakeEmbeddings(latency_ms=0))
+        started = time.perf_counter()
+        if concurrency is None:
+            report = await legacy(db, vectors, "bench")
+        else:
+            report = await db.upsert_all(vectors, namespace="bench")
+        elapsed = time.perf_counter() - started
+        stored = len(stub.namespace("bench").records)
+        lost = args.vectors - report["upserted"]
+        print(f"{label:<22}{elapsed:>9.2f}{report['upserted'] / elapsed:>11.0f}{report['requests']:>10}"
+              f"{report['retries']:>9}{lost:>7}{stored:>8}")
+        await db.aclose()
+        stub.stop()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--ms-per-mb", type=float, default=40.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--backoff", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args(argv)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
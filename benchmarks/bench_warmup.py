@@ -0,0 +1,81 @@
+"""
+Time-to-first-good-request after a deploy, with and without lifespan warm-up.
+
+For each mode a fresh server process is started; the load balancer is simulated
+by polling /ready, then the first chat is sent as soon as the worker reports ready.
+The fakes charge `--cold-start-ms` on the first LLM / embedding call of a process
+to stand in for connection and TLS setup.
+
+    python -m benchmarks.bench_warmup --cold-start-ms 800
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_server import wait_until_up
+from benchmarks.pinecone_stub import PineconeStub
+from benchmarks.stack import BENCH_PASSWORD, BenchConfig, seed_pinecone
+
+
+def measure(warmup: bool, args, config: BenchConfig) -> dict:
+    env = {**os.environ, **config.to_env(), "WARMUP_ENABLED": str(warmup).lower(), "WARMUP_CALLS": "true"}
+    url = f"http://127.0.0.1:{args.port}"
+    spawned = time.perf_counter()
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.stack:create_app", "--factory",
+        "--port", str(args.port), "--log-level", "warning",
+    ], env=env)
+    try:
+        wait_until_up(url)
+        while httpx.get(f"{url}/ready").status_code != 200:
+            time.sleep(0.02)
+        ready = time.perf_counter()
+
+        with httpx.Client(base_url=url, timeout=60) as client:
+            login = client.post("/user/login", data={"username": "bench-user-0@example.com",
+                                                     "password": BENCH_PASSWORD})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            latencies = []
+            for text in ("What is the deductible for Gold 2500?", "And the out-of-pocket maximum?"):
+                started = time.perf_counter()
+                client.post("/messages/process", json={"text": text}, headers=headers).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                if len(latencies) == 1:
+                    first_good = time.perf_counter()
+        return {
+            "ready_after_s": round(ready - spawned, 3),
+            "first_request_ms": round(latencies[0] * 1000, 1),
+            "second_request_ms": round(latencies[1] * 1000, 1),
+            "time_to_first_good_s": round(first_good - spawned, 3),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--cold-start-ms", type=float, default=800.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    config = BenchConfig(llm_latency_ms=args.llm_latency_ms, cold_start_ms=args.cold_start_ms, users=1)
+    config.pinecone_url = PineconeStub(latency_ms=config.pinecone_latency_ms).start()
+    seed_pinecone(config.pinecone_url, config)
+
+    print(f"{'mode':<10}{'ready s':>10}{'1st req ms':>12}{'2nd req ms':>12}{'TTFGR s':>10}")
+    for label, warmup in (("cold", False), ("warm", True)):
+        r = measure(warmup, args, config)
+        print(f"{label:<10}{r['ready_after_s']:>10}{r['first_request_ms']:>12}"
+              f"{r['second_request_ms']:>12}{r['time_to_first_good_s']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Deterministic stand-ins for Azure OpenAI used by the offline benchmarks.
+
+Latencies and outputs derive from a seed and the prompt text only, so two runs
+of the same workload see the same model behaviour.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from services.plans import detect_plan, plan_name
+
+WORDS = (
+    "your plan covers in network office visits after the deductible is met and the "
+    "copay applies for primary care specialist urgent care and emergency room services "
+    "please check the summary of benefits for exact amounts and limits"
+).split()
+
+
+def _rng(seed: int, text: str) -> random.Random:
+    digest = hashlib.sha256(f"{seed}|{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering each DMAIService prompt with a well-formed response.
+
+    Latency = base + per-token cost * output tokens, plus seeded jitter. The first
+    call additionally pays `cold_start_ms` (connection + TLS setup on a cold pool).
+    """
+
+    seed: int = 7
+    base_latency_ms: float = 300.0
+    per_token_ms: float = 2.0
+    jitter: float = 0.2
+    reply_tokens: int = 120
+    cold_start_ms: float = 0.0
+    _warm: bool = PrivateAttr(default=False)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-azure-chat"
+
+    # ------------------------ response synthesis ----------------------- #
+    def _answer(self, prompt: str) -> str:
+        rng = _rng(self.seed, prompt)
+        if "classify customer support DM" in prompt:
+            latest = prompt.split("Latest Message:", 1)[-1].split("Conversation History:", 1)[0]
+            return json.dumps({
+                "category": "POLICY_INQUIRY",
+                "conversation_history_query": f"User asks: {latest.strip()[:200]}",
+                "plan": plan_name(detect_plan(latest)) or "none",
+            })
+        if "is_context_miss" in prompt:
+            return "```json\n" + json.dumps({"is_context_miss": "no", "reason": ""}) + "\n```"
+        if "factual_consistency" in prompt:
+            return json.dumps({"factual_consistency": "yes", "reason": ""})
+        if "format the following direct message" in prompt:
+            reply = prompt.split("DM to format:", 1)[-1].split("Formatted DM:", 1)[0]
+            return reply.strip()
+        return " ".join(rng.choice(WORDS) for _ in range(self.reply_tokens))
+
+    def _latency(self, prompt: str, output: str) -> float:
+        rng = _rng(self.seed + 1, prompt)
+        tokens = max(1, len(output) // 4)
+        base = self.base_latency_ms + self.per_token_ms * tokens
+        cold = 0.0 if self._warm else self.cold_start_ms
+        self._warm = True
+        return (base * (1 + rng.uniform(-self.jitter, self.jitter)) + cold) / 1000
+
+    def _result(self, messages: List[BaseMessage]) -> tuple[str, float, dict]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        output = self._answer(prompt)
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(output) // 4,
+            "total_tokens": (len(prompt) + len(output)) // 4,
+        }
+        return output, self._latency(prompt, output), usage
+
+    # ------------------------ BaseChatModel hooks ---------------------- #
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        output, latency, usage = self._result(messages)
+        time.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=output, usage_metadata=usage))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        output, latency, usage = self._result(messages)
+        await asyncio.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=output, usage_metadata=usage))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        output, latency, _ = self._result(messages)
+        pieces = re.findall(r"\S+\s*", output) or [output]
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        output, latency, _ = self._result(messages)
+        pieces = re.findall(r"\S+\s*", output) or [output]
+        for piece in pieces:
+            await asyncio.sleep(latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashing-trick embeddings: texts sharing words get similar vectors, so
+    retrieval against the stand-in index returns sensible neighbours.
+    """
+
+    def __init__(self, dims: int = 1536, latency_ms: float = 40.0, seed: int = 7, cold_start_ms: float = 0.0):
+        self.dims = dims
+        self.latency_ms = latency_ms
+        self.seed = seed
+        self.cold_start_ms = cold_start_ms
+        self._warm = False
+
+    def _delay(self) -> float:
+        cold = 0.0 if self._warm else self.cold_start_ms
+        self._warm = True
+        return (self.latency_ms + cold) / 1000
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dims
+        for word in re.findall(r"\w+", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(f"{self.seed}|{word}".encode(), digest_size=8).digest(), "big")
+            vec[h % self.dims] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._delay())
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._delay())
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._delay())
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self._delay())
+        return self._vector(text)
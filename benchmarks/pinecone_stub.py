@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Pinecone data-plane HTTP API (`/query`, `/vectors/upsert`,
+`/vectors/delete`, `/describe_index_stats`), good enough for PineconeDB to run against unchanged.
+
+    python -m benchmarks.pinecone_stub --port 8900
+"""
+import argparse
+import asyncio
+import random
+import threading
+from typing import Optional
+
+import numpy as np
+from aiohttp import web
+
+from services.rag_service.metadata_filter import matches as _matches
+
+
+class _Namespace:
+    def __init__(self):
+        self.records: dict[str, tuple[list, dict]] = {}
+        self._ids: list[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def upsert(self, vectors: list[dict]) -> None:
+        for v in vectors:
+            self.records[v["id"]] = (v["values"], v.get("metadata") or {})
+        self._matrix = None
+
+    def query(self, vector: list, top_k: int, flt: Optional[dict]) -> list[dict]:
+        if not self.records:
+            return []
+        if self._matrix is None:
+            self._ids = list(self.records)
+            matrix = np.asarray([self.records[i][0] for i in self._ids], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms == 0, 1, norms)
+        q = np.asarray(vector, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = self._matrix @ q
+        out = []
+        for idx in np.argsort(-scores):
+            vid = self._ids[idx]
+            metadata = self.records[vid][1]
+            if not _matches(metadata, flt):
+                continue
+            out.append({"id": vid, "score": float(scores[idx]), "metadata": dict(metadata)})
+            if len(out) >= top_k:
+                break
+        return out
+
+
+class PineconeStub:
+    """In-memory Pinecone index served over HTTP from a background thread."""
+
+    MAX_REQUEST_BYTES = 2 * 1024 ** 2  # Pinecone's upsert request size limit
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, api_key: Optional[str] = None,
+                 upsert_failure_rate: float = 0.0, upsert_ms_per_mb: float = 0.0, seed: int = 7):
+        self.port = port
+        self.latency_ms = latency_ms
+        self.api_key = api_key
+        self.upsert_failure_rate = upsert_failure_rate  # share of upserts answered 503 (transient)
+        self.upsert_ms_per_mb = upsert_ms_per_mb        # extra latency proportional to the payload
+        self.namespaces: dict[str, _Namespace] = {}
+        self.request_count = 0
+        self.upsert_rejected = {"too_large": 0, "transient": 0}
+        self._rng = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def namespace(self, name: Optional[str]) -> _Namespace:
+        return self.namespaces.setdefault(name or "", _Namespace())
+
+    # ------------------------ HTTP handlers ---------------------------- #
+    async def _guard(self, request: web.Request) -> None:
+        self.request_count += 1
+        if self.api_key and request.headers.get("Api-Key") != self.api_key:
+            raise web.HTTPUnauthorized()
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    async def _upsert(self, request: web.Request) -> web.Response:
+        await self._guard(request)
+        raw = await request.read()
+        if len(raw) > self.MAX_REQUEST_BYTES:
+            self.upsert_rejected["too_large"] += 1
+            return web.json_response({"code": 3, "message": f"Request size {len(raw)} exceeds the maximum "
+                                                            f"supported size of {self.MAX_REQUEST_BYTES}"}, status=400)
+        if self.upsert_ms_per_mb:
+            await asyncio.sleep(self.upsert_ms_per_mb * len(raw) / 1024 ** 2 / 1000)
+        if self._rng.random() < self.upsert_failure_rate:
+            self.upsert_rejected["transient"] += 1
+            return web.json_response({"code": 14, "message": "Service unavailable"}, status=503)
+        body = await request.json()
+        vectors = body.get("vectors", [])
+        self.namespace(body.get("namespace")).upsert(vectors)
+        return web.json_response({"upsertedCount": len(vectors)})
+
+    async def _query(self, request: web.Request) -> web.Response:
+        await self._guard(request)
+        body = await request.json()
+        top_k = body.get("top_k") or body.get("topK") or 10
+        matches = self.namespace(body.get("namespace")).query(body["vector"], top_k, body.get("filter"))
+        if not body.get("includeMetadata"):
+            for m in matches:
+                m.pop("metadata")
+        return web.json_response({"matches": matches, "namespace": body.get("namespace") or ""})
+
+    async def _delete(self, request: web.Request) -> web.Response:
+        await self._guard(request)
+        body = await request.json()
+        ns = body.get("namespace") or ""
+        if body.get("deleteAll"):
+            self.namespaces.pop(ns, None)
+        else:
+            for vid in body.get("ids", []):
+                self.namespace(ns).records.pop(vid, None)
+            self.namespace(ns)._matrix = None
+        return web.json_response({})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        await self._guard(request)
+        return web.json_response({
+            "namespaces": {name: {"vectorCount": len(ns.records)} for name, ns in self.namespaces.items()},
+            "totalVectorCount": sum(len(ns.records) for ns in self.namespaces.values()),
+        })
+
+    def _app(self) -> web.Application:
+        app = web.Application(client_max_size=8 * 1024 ** 2)
+        app.router.add_post("/vectors/upsert", self._upsert)
+        app.router.add_post("/query", self._query)
+        app.router.add_post("/vectors/delete", self._delete)
+        app.router.add_post("/describe_index_stats", self._stats)
+        return app
+
+    # ------------------------ lifecycle -------------------------------- #
+    async def serve(self) -> None:
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> str:
+        """Run the stub on its own event loop in a daemon thread; returns the base URL."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="pinecone-stub", daemon=True).start()
+        ready.wait()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = PineconeStub(port=args.port, latency_ms=args.latency_ms)
+    print(f"Pinecone stub listening on {stub.start()}")
+    threading.Event().wait()
@@ -0,0 +1,129 @@
+"""
+Local stand-in for a Redis-protocol server: the commands the cache backend
+(services.cache.resp) sends – PING, GET, SET [EX|PX], DEL, SELECT, DBSIZE,
+FLUSHDB – over RESP2, good enough for RespCacheBackend to run against unchanged.
+
+    python -m benchmarks.redis_stub --port 6390
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class RedisStub:
+    def __init__(self, port: int = 0, latency_ms: float = 0.0):
+        self.port = port
+        self.latency_ms = latency_ms
+        self.data: dict[bytes, tuple[bytes, float]] = {}  # key -> (value, expires_at or inf)
+        self.commands = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    # ------------------------ commands --------------------------------- #
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def execute(self, args: list) -> object:
+        self.commands += 1
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG"
+        if name in (b"SELECT", b"AUTH"):
+            return b"+OK"
+        if name == b"GET":
+            return self._get(args[1])
+        if name == b"SET":
+            expires_at = float("inf")
+            options = [a.upper() for a in args[3:]]
+            if b"PX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.time() + int(args[3 + options.index(b"EX") + 1])
+            self.data[args[1]] = (args[2], expires_at)
+            return b"+OK"
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args[1:])
+        if name == b"DBSIZE":
+            return len(self.data)
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK"
+        return ValueError(f"ERR unknown command '{name.decode()}'")
+
+    @staticmethod
+    def _encode(reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return b"-%s\r\n" % str(reply).encode()
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if reply.startswith(b"+"):
+            return reply + b"\r\n"
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                if self.latency_ms:
+                    await asyncio.sleep(self.latency_ms / 1000)
+                writer.write(self._encode(self.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ------------------------ lifecycle -------------------------------- #
+    async def serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start(self) -> str:
+        """Run the stub on its own event loop in a daemon thread; returns its redis:// URL."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="redis-stub", daemon=True).start()
+        ready.wait()
+        return self.url
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = RedisStub(port=args.port, latency_ms=args.latency_ms)
+    print(f"Redis-protocol stub listening on {stub.start()}")
+    threading.Event().wait()
@@ -0,0 +1,102 @@
+"""
+Replays conversations captured with CASSETTE_MODE=record through the AI pipeline,
+serving LLM / embedding / Pinecone traffic from the cassette. Use it to profile the
+CPU side of the pipeline (Pydantic, JSON, LangGraph) or to compare pipeline variants
+on identical inputs.
+
+    CASSETTE_MODE=record CASSETTE_PATH=prod.jsonl.gz uvicorn main:app   # capture
+    python -m benchmarks.replay_cassette prod.jsonl.gz --latency-scale 0 --profile replay.pstats
+"""
+import argparse
+import asyncio
+import cProfile
+import sys
+import time
+from typing import Optional
+
+from benchmarks.stack import configure_environment
+
+
+def build_service(cassette):
+    from models.ai_processing_models import LLMCacheConfig, LLMSchedulerConfig
+    from models.vectordb_models import PineconeConfig
+    from services.ai_processing_service import DMAIService
+    from services.llm_cache import LLMResponseCache
+    from services.llm_scheduler import LLMScheduler
+    from services.rag_service.pinecone import PineconeDB
+    from services.vector_db_service import VectorDbService
+
+    pinecone_db = PineconeDB(config=PineconeConfig(api_key="replay", base_url="http://127.0.0.1:9"),
+                             cassette=cassette)
+    return DMAIService(
+        vector_db_service=VectorDbService(vector_db=pinecone_db),
+        scheduler=LLMScheduler(LLMSchedulerConfig(max_concurrency=1024, tokens_per_minute=10 ** 9,
+                                                  requests_per_minute=10 ** 9)),
+        response_cache=LLMResponseCache(LLMCacheConfig(enabled=False), "replay", "replay"),
+        cassette=cassette,
+    )
+
+
+async def replay(path: str, latency_scale: float, concurrency: int) -> dict:
+    from models.ai_processing_models import MessageRecommendationContext
+    from models.user_model import User
+    from services.cassettes import Cassette
+
+    cassette = Cassette(mode="replay", path=path, latency_scale=latency_scale)
+    service = build_service(cassette)
+    runs = cassette.entries("analysis")
+    gate = asyncio.Semaphore(concurrency)
+    matches = 0
+
+    async def run_one(entry: dict):
+        nonlocal matches
+        context = MessageRecommendationContext(
+            enriched_messages=entry["request"]["conversation_history"],
+            user=User(user_name=entry["request"]["user_name"] or "user",
+                      user_email="replay@example.com", password="replay"),
+        )
+        async with gate:
+            analysis = await service.analyse_dm_with_ai(message_context=context)
+        if analysis.suggested_message_reply == entry["response"]["suggested_message_reply"]:
+            matches += 1
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(run_one(e) for e in runs))
+    return {
+        "runs": len(runs),
+        "identical_replies": matches,
+        "wall_s": round(time.perf_counter() - wall, 3),
+        "cpu_s": round(time.process_time() - cpu, 3),
+        "cassette": cassette.stats,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="gzip JSONL file produced in record mode")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier on recorded latencies, 0 replays as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--profile", help="write cProfile stats (pstats format) here")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    from services.stage_metrics import stage_metrics
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    result = asyncio.run(replay(args.cassette, args.latency_scale, args.concurrency))
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    print(f"runs={result['runs']} identical_replies={result['identical_replies']} "
+          f"wall={result['wall_s']}s cpu={result['cpu_s']}s cassette={result['cassette']}")
+    for stage, s in sorted(stage_metrics.stats().items()):
+        print(f"  {stage:<40}{s['count']:>6}{s['mean_ms']:>10}ms")
+    return 0 if result["cassette"]["misses"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
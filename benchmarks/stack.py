@@ -0,0 +1,164 @@
+"""
+Boots the real FastAPI app with every external dependency replaced locally:
+
+• Azure chat / embedding models  -> benchmarks.fakes
+• Pinecone                       -> benchmarks.pinecone_stub
+• MongoDB                        -> mongomock (in-memory)
+
+`create_app` is also usable as a uvicorn factory:
+
+    uvicorn benchmarks.stack:create_app --factory
+"""
+import json
+import os
+import random
+import urllib.request
+from dataclasses import dataclass, fields, asdict
+from typing import Optional
+
+BENCH_NAMESPACE = "insurance_namespace"
+BENCH_PASSWORD = "bench-password"
+
+PLANS = ["Gold 2500", "Bronze 5000", "HSA 5000", "Copper 7350"]
+BENEFITS = [
+    "annual deductible", "out-of-pocket maximum", "primary care visit copay",
+    "specialist visit copay", "urgent care copay", "emergency room copay",
+    "generic drug copay", "preferred brand drug copay", "inpatient hospital stay",
+    "outpatient surgery", "diagnostic lab tests", "imaging such as MRI and CT",
+    "mental health office visit", "preventive care screening", "ambulance services",
+]
+TIERS = ["In-Network", "Out-of-Network"]
+
+
+@dataclass
+class BenchConfig:
+    seed: int = 7
+    llm_latency_ms: float = 300.0
+    llm_per_token_ms: float = 2.0
+    llm_jitter: float = 0.2
+    reply_tokens: int = 120
+    embed_latency_ms: float = 40.0
+    pinecone_latency_ms: float = 15.0
+    corpus_size: int = 300
+    cold_start_ms: float = 0.0  # extra latency of the first LLM / embedding call in a process
+    users: int = 0  # pre-registered bench users, needed when several workers each hold their own mongomock
+    pinecone_url: str = ""  # reuse an already running stub (multi-process runs)
+
+    @classmethod
+    def from_env(cls) -> "BenchConfig":
+        values = {}
+        for f in fields(cls):
+            raw = os.getenv(f"BENCH_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = type(f.default)(raw)
+        return cls(**values)
+
+    def to_env(self) -> dict:
+        return {f"BENCH_{k.upper()}": str(v) for k, v in asdict(self).items()}
+
+
+def configure_environment() -> None:
+    """Placeholder credentials so module-level env lookups succeed offline."""
+    defaults = {
+        "MONGO_URI": "mongodb://bench",
+        "MONGO_DB_NAME": "ragbot_bench",
+        "SECRET_KEY": "bench-secret",
+        "PINECONE_API_KEY": "bench",
+        "PINECONE_URL": "http://127.0.0.1:9",
+        "AZURE_OPENAI_API_KEY": "bench",
+        "AZURE_OPENAI_ENDPOINT": "https://bench.invalid",
+        "OPENAI_API_VERSION": "2024-02-01",
+        "AZURE_MODEL_NAME": "bench-gpt",
+        "LLM_TOKENS_PER_MINUTE": "100000000",
+        "LLM_REQUESTS_PER_MINUTE": "1000000",
+        "LLM_MAX_CONCURRENCY": "256",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+def synthetic_corpus(size: int, seed: int) -> list[str]:
+    """Benefit-table style chunks resembling the SOB documents."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(size):
+        plan, benefit, tier = rng.choice(PLANS), rng.choice(BENEFITS), rng.choice(TIERS)
+        amount = rng.choice(["$0", "$25", "$50", "$250", "$2,500", "$5,000", "30% after deductible"])
+        chunks.append(
+            f"America's Choice {plan} plan. Benefit is {benefit}\n"
+            f"Network is {tier}\nYou pay is {amount}\nChunk {i}"
+        )
+    return chunks
+
+
+def seed_pinecone(base_url: str, config: BenchConfig) -> None:
+    from benchmarks.fakes import FakeEmbeddings
+    from services.plans import detect_plan
+
+    embeddings = FakeEmbeddings(latency_ms=0, seed=config.seed)
+    vectors = [
+        {"id": f"bench-{i}", "values": embeddings.embed_query(text),
+         "metadata": {"text": text, "source": "synthetic", "plan": detect_plan(text.split(".")[0]) or "general"}}
+        for i, text in enumerate(synthetic_corpus(config.corpus_size, config.seed))
+    ]
+    for i in range(0, len(vectors), 100):
+        body = json.dumps({"vectors": vectors[i:i + 100], "namespace": BENCH_NAMESPACE}).encode()
+        request = urllib.request.Request(
+            f"{base_url}/vectors/upsert", data=body,
+            headers={"Content-Type": "application/json", "Api-Key": "bench"},
+        )
+        urllib.request.urlopen(request).read()
+
+
+def seed_users(count: int) -> None:
+    from container import ServicesContainer
+
+    user_service = ServicesContainer.user_service()
+    password_hash = user_service.get_password_hash(BENCH_PASSWORD)  # bcrypt is slow, hash once
+    for i in range(count):
+        email = f"bench-user-{i}@example.com"
+        if not user_service.user_dao.find_by_email(email):
+            user_service.user_dao.insert_user({
+                "user_name": f"bench{i}", "user_email": email, "password": password_hash,
+            })
+
+
+def create_app(config: Optional[BenchConfig] = None):
+    """Build the production app wired to local stand-ins."""
+    config = config or BenchConfig.from_env()
+    configure_environment()
+
+    import mongomock
+    from dependency_injector import providers
+
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+    from benchmarks.pinecone_stub import PineconeStub
+    from container import ServicesContainer
+    from models.vectordb_models import PineconeConfig
+    from services.rag_service.pinecone import PineconeDB
+
+    base_url = config.pinecone_url
+    if not base_url:
+        base_url = PineconeStub(latency_ms=config.pinecone_latency_ms).start()
+        seed_pinecone(base_url, config)
+
+    ServicesContainer.mongo_client.override(providers.Singleton(mongomock.MongoClient))
+    ServicesContainer.pinecone_db.override(providers.Singleton(
+        PineconeDB,
+        config=PineconeConfig(api_key="bench", base_url=base_url),
+        embeddings=FakeEmbeddings(latency_ms=config.embed_latency_ms, seed=config.seed,
+                                  cold_start_ms=config.cold_start_ms),
+        cache=ServicesContainer.cache_backend,
+    ))
+    ServicesContainer.ai_processing_service.add_kwargs(chat_model=FakeChatModel(
+        seed=config.seed,
+        base_latency_ms=config.llm_latency_ms,
+        per_token_ms=config.llm_per_token_ms,
+        jitter=config.llm_jitter,
+        reply_tokens=config.reply_tokens,
+        cold_start_ms=config.cold_start_ms,
+    ))
+
+    from main import app
+    seed_users(config.users)
+    return app
@@ -0,0 +1,45 @@
+"""
+Standalone worker for asynchronous chat jobs (`POST /messages/process?async=true`).
+
+    python chat_worker.py                  # CHAT_JOB_WORKERS jobs at a time (default 4)
+    python chat_worker.py --workers 16
+
+Claims jobs from the same Mongo collection as the API's in-process workers;
+run the API with CHAT_JOB_WORKERS=0 to leave all jobs to these processes.
+On SIGTERM / SIGINT the jobs still running are handed back to the queue.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from container import ServicesContainer
+
+
+async def run(workers: int = None) -> None:
+    queue = ServicesContainer.chat_job_queue()
+    task = asyncio.create_task(queue.run_forever(workers))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await ServicesContainer.vector_db().aclose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="jobs run at once (default: CHAT_JOB_WORKERS)")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run(args.workers))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,21 +1,55 @@
 # backend/container.py
+import os
 from dependency_injector import containers, providers
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
 from dao.user_dao import UserDAO
 from dao.message_dao import MessageDAO
+from dao.message_archive_dao import MessageArchiveDAO
+from dao.chat_job_dao import ChatJobDAO
+from dao.idempotency_dao import IdempotencyDAO
 from helpers import get_env_value
-from models.vectordb_models import PineconeConfig
+from models.vectordb_models import PineconeConfig, IngestionConfig, LocalIndexConfig, TenantConfig
+from models.ai_processing_models import LLMSchedulerConfig, LLMCacheConfig, DeadlineConfig, AdmissionConfig, \
+    ChatSocketConfig, ChatJobConfig, IdempotencyConfig, ProfilerConfig, RetentionConfig, FaqConfig, \
+    BenefitsConfig, CacheConfig
+from services.admission_control import AdmissionController
 from services.ai_processing_service import DMAIService
+from services.benefits import BenefitService, BenefitTable
+from services.cache.base import MemoryCacheBackend
+from services.cache.resp import RespCacheBackend
+from services.chat_jobs import ChatJobQueue
+from services.chat_socket import ChatSocketServer
+from services.faq_service import FaqService
+from services.idempotency import IdempotencyService
+from services.profiler import SamplingProfiler
+from services.llm_scheduler import LLMScheduler
+from services.llm_cache import LLMResponseCache
+from services.cassettes import Cassette
 from services.rag_service.pinecone import PineconeDB
+from services.tenants import TenantRouter
 from services.user_service import UserService
 from services.messaging_service import MessageService
+from services.message_retention import MessageArchiver
 from services.vector_db_service import VectorDbService
+from services.warmup_service import WarmupService
 
 load_dotenv()  # .env -> env vars
 
 
+def _local_vector_db(**kwargs):
+    # numpy and the mmap index are only imported when the local backend is selected
+    from services.rag_service.local_index import LocalVectorDB
+    return LocalVectorDB(**kwargs)
+
+
+def _shm_cache(**kwargs):
+    # fcntl / mmap: POSIX only, imported when the shm backend is selected
+    from services.cache.shared_memory import SharedMemoryCacheBackend
+    return SharedMemoryCacheBackend(**kwargs)
+
+
 class ServicesContainer(containers.DeclarativeContainer):
     """Central DI container"""
 
@@ -38,6 +72,9 @@ class ServicesContainer(containers.DeclarativeContainer):
     users_collection = providers.Singleton(lambda db: db["users"], db=mongo_database)
     messages_collection = providers.Singleton(lambda db: db["messages"], db=mongo_database)
     counters_collection = providers.Singleton(lambda db: db["counters"], db=mongo_database)
+    message_archive_collection = providers.Singleton(lambda db: db["message_archive"], db=mongo_database)
+    chat_jobs_collection = providers.Singleton(lambda db: db["chat_jobs"], db=mongo_database)
+    idempotency_collection = providers.Singleton(lambda db: db["idempotency_keys"], db=mongo_database)
 
     # ── DAOs ────────────────────────────────────────────────────────────
     user_dao = providers.Singleton(UserDAO,
@@ -48,29 +85,238 @@ class ServicesContainer(containers.DeclarativeContainer):
                                       messages_collection=messages_collection,
                                       counters_collection=counters_collection)
 
+    message_archive_dao = providers.Singleton(MessageArchiveDAO, archive_collection=message_archive_collection)
+
+    chat_job_dao = providers.Singleton(ChatJobDAO, jobs_collection=chat_jobs_collection)
+
+    idempotency_dao = providers.Singleton(IdempotencyDAO, keys_collection=idempotency_collection)
+
     # ── Services ────────────────────────────────────────────────────────
+    cassette = providers.Singleton(
+        Cassette,
+        mode=get_env_value('CASSETTE_MODE', default='off'),
+        path=os.getenv('CASSETTE_PATH'),
+        latency_scale=float(get_env_value('CASSETTE_LATENCY_SCALE', default='1.0')),
+    )
+
+    cache_config = providers.Singleton(
+        CacheConfig,
+        backend=get_env_value('CACHE_BACKEND', default='memory'),
+        max_entries=int(get_env_value('CACHE_MAX_ENTRIES', default='10000')),
+        shm_path=get_env_value('CACHE_SHM_PATH', default='/dev/shm/ragbot-cache'),
+        shm_slots=int(get_env_value('CACHE_SHM_SLOTS', default='8192')),
+        resp_url=get_env_value('CACHE_URL', default='redis://127.0.0.1:6379/0'),
+        key_prefix=get_env_value('CACHE_KEY_PREFIX', default='ragbot'),
+    )
+
+    # CACHE_BACKEND=memory (default, per worker) | shm (workers on one host) | resp (Redis protocol)
+    cache_backend = providers.Selector(
+        lambda: get_env_value('CACHE_BACKEND', default='memory'),
+        memory=providers.Singleton(MemoryCacheBackend, config=cache_config),
+        shm=providers.Singleton(_shm_cache, config=cache_config),
+        resp=providers.Singleton(RespCacheBackend, config=cache_config),
+    )
+
     pinecone_db = providers.Singleton(
         PineconeDB,
         config=PineconeConfig(
             api_key=get_env_value('PINECONE_API_KEY'),
-            base_url=get_env_value('PINECONE_URL')
-        )
+            base_url=get_env_value('PINECONE_URL'),
+            upsert_concurrency=int(get_env_value('PINECONE_UPSERT_CONCURRENCY', default='4')),
+        ),
+        cassette=cassette,
+        cache=cache_backend,
+    )
+
+    local_vector_db = providers.Singleton(
+        _local_vector_db,
+        config=providers.Factory(
+            LocalIndexConfig,
+            path=get_env_value('LOCAL_INDEX_PATH', default='.index'),
+            dtype=get_env_value('LOCAL_INDEX_DTYPE', default='int8'),
+            rescore=get_env_value('LOCAL_INDEX_RESCORE', default='true').lower() == 'true',
+            # 0 = keep every loaded namespace
+            max_resident_mb=float(get_env_value('LOCAL_INDEX_MAX_RESIDENT_MB', default='0')) or None,
+        ),
+        cassette=cassette,
+        cache=cache_backend,
+    )
+
+    # VECTOR_BACKEND=pinecone (default) | local
+    vector_db = providers.Selector(
+        lambda: get_env_value('VECTOR_BACKEND', default='pinecone'),
+        pinecone=pinecone_db,
+        local=local_vector_db,
+    )
+
+    # TENANTS=acme,globex (empty: any well-formed id); users without a tenant get TENANT_DEFAULT
+    tenant_router = providers.Singleton(
+        TenantRouter,
+        config=TenantConfig(
+            default_tenant=get_env_value('TENANT_DEFAULT', default='default'),
+            tenants=[t.strip() for t in os.getenv('TENANTS', '').split(',') if t.strip()],
+        ),
     )
 
     vectordb_service = providers.Singleton(
         VectorDbService,
-        vector_db=pinecone_db
+        vector_db=vector_db,
+        ingestion_config=IngestionConfig(
+            batch_size=int(get_env_value('INGEST_BATCH_SIZE', default='100')),
+            max_attempts=int(get_env_value('INGEST_MAX_ATTEMPTS', default='3')),
+            checkpoint_path=get_env_value('INGEST_CHECKPOINT_PATH', default='.ingest/checkpoints.sqlite3'),
+            dedup=get_env_value('INGEST_DEDUP', default='true').lower() == 'true',
+            faq=get_env_value('INGEST_FAQ', default='true').lower() == 'true',
+            benefits_path=get_env_value('BENEFITS_PATH', default='.index/benefits.json'),
+            # empty: parse every PDF on every run
+            page_cache_path=os.getenv('INGEST_PAGE_CACHE_PATH', '.ingest/pages') or None,
+        ),
+        filter_by_plan=get_env_value('RETRIEVAL_PLAN_FILTER', default='true').lower() == 'true',
+        tenants=tenant_router,
+    )
+
+    llm_scheduler = providers.Singleton(
+        LLMScheduler,
+        config=LLMSchedulerConfig(
+            max_concurrency=int(get_env_value('LLM_MAX_CONCURRENCY', default='8')),
+            tokens_per_minute=int(get_env_value('LLM_TOKENS_PER_MINUTE', default='60000')),
+            requests_per_minute=int(get_env_value('LLM_REQUESTS_PER_MINUTE', default='360')),
+        )
+    )
+
+    llm_response_cache = providers.Singleton(
+        LLMResponseCache,
+        config=LLMCacheConfig(
+            enabled=get_env_value('LLM_CACHE_ENABLED', default='true').lower() == 'true',
+            max_entries=int(get_env_value('LLM_CACHE_MAX_ENTRIES', default='2048')),
+            disk_path=os.getenv('LLM_CACHE_DISK_PATH') or None,
+        ),
+        deployment=get_env_value('AZURE_MODEL_NAME'),
+        api_version=get_env_value('OPENAI_API_VERSION'),
+        backend=cache_backend,
+    )
+
+    deadline_config = providers.Singleton(
+        DeadlineConfig,
+        request_timeout_seconds=float(get_env_value('REQUEST_DEADLINE_SECONDS', default='25')),
+    )
+
+    # written by ingestion, reloaded here when the file changes
+    benefit_table = providers.Singleton(
+        BenefitTable,
+        path=get_env_value('BENEFITS_PATH', default='.index/benefits.json'),
+    )
+    benefit_service = providers.Singleton(
+        BenefitService,
+        config=BenefitsConfig(
+            enabled=get_env_value('BENEFITS_ENABLED', default='true').lower() == 'true',
+            direct_answers=get_env_value('BENEFITS_DIRECT_ANSWERS', default='true').lower() == 'true',
+        ),
+        table=benefit_table,
+        tenants=tenant_router,
     )
 
     ai_processing_service = providers.Singleton(
         DMAIService,
-        vector_db_service=vectordb_service
+        vector_db_service=vectordb_service,
+        scheduler=llm_scheduler,
+        response_cache=llm_response_cache,
+        cassette=cassette,
+        deadline_config=deadline_config,
+        benefits=benefit_service,
+    )
+    faq_service = providers.Singleton(
+        FaqService,
+        config=FaqConfig(
+            enabled=get_env_value('FAQ_ENABLED', default='true').lower() == 'true',
+            min_score=float(get_env_value('FAQ_MIN_SCORE', default='0.92')),
+        ),
+        vectordb_service=vectordb_service,
     )
+
     user_service = providers.Singleton(UserService,
                                        user_dao=user_dao,
-                                       secret_key=config.secret_key)
+                                       secret_key=config.secret_key,
+                                       tenants=tenant_router,
+                                       cache=cache_backend)
 
     message_service = providers.Singleton(MessageService,
                                           message_dao=message_dao,
                                           user_dao=user_dao,
-                                          ai_processing_service=ai_processing_service)
+                                          ai_processing_service=ai_processing_service,
+                                          deadline_config=deadline_config,
+                                          archive_dao=message_archive_dao,
+                                          faq_service=faq_service,
+                                          benefit_service=benefit_service,
+                                          cache=cache_backend)
+
+    message_archiver = providers.Singleton(
+        MessageArchiver,
+        config=RetentionConfig(
+            hot_days=int(get_env_value('MESSAGES_HOT_DAYS', default='90')),
+            min_hot_messages=int(get_env_value('MESSAGES_MIN_HOT', default='100')),
+            mode=get_env_value('MESSAGES_RETENTION_MODE', default='archive'),
+            archive_ttl_days=int(get_env_value('MESSAGES_ARCHIVE_TTL_DAYS', default='0')),
+        ),
+        message_dao=message_dao,
+        archive_dao=message_archive_dao,
+    )
+
+    admission_controller = providers.Singleton(
+        AdmissionController,
+        config=AdmissionConfig(
+            enabled=get_env_value('ADMISSION_ENABLED', default='true').lower() == 'true',
+            max_in_flight=int(get_env_value('ADMISSION_MAX_IN_FLIGHT', default='32')),
+            max_pending_per_user=int(get_env_value('ADMISSION_MAX_PENDING_PER_USER', default='2')),
+            queue_slo_seconds=float(get_env_value('ADMISSION_QUEUE_SLO_SECONDS', default='5')),
+        )
+    )
+
+    idempotency_service = providers.Singleton(
+        IdempotencyService,
+        config=IdempotencyConfig(
+            enabled=get_env_value('IDEMPOTENCY_ENABLED', default='true').lower() == 'true',
+            ttl_seconds=int(get_env_value('IDEMPOTENCY_TTL_SECONDS', default='86400')),
+        ),
+        dao=idempotency_dao,
+    )
+
+    chat_job_queue = providers.Singleton(
+        ChatJobQueue,
+        config=ChatJobConfig(
+            workers=int(get_env_value('CHAT_JOB_WORKERS', default='4')),
+            lease_seconds=float(get_env_value('CHAT_JOB_LEASE_SECONDS', default='60')),
+            result_ttl_seconds=int(get_env_value('CHAT_JOB_RESULT_TTL_SECONDS', default='86400')),
+        ),
+        job_dao=chat_job_dao,
+        message_service=message_service,
+    )
+
+    chat_socket_server = providers.Singleton(
+        ChatSocketServer,
+        config=ChatSocketConfig(
+            max_connections=int(get_env_value('WS_MAX_CONNECTIONS', default='200')),
+            idle_timeout_seconds=float(get_env_value('WS_IDLE_TIMEOUT_SECONDS', default='300')),
+        ),
+        user_service=user_service,
+        message_service=message_service,
+        admission=admission_controller,
+    )
+
+    profiler = providers.Singleton(
+        SamplingProfiler,
+        config=ProfilerConfig(
+            enabled=get_env_value('PROFILER_ENABLED', default='false').lower() == 'true',
+            admin_token=os.getenv('PROFILER_ADMIN_TOKEN', ''),
+            sample_rate=float(get_env_value('PROFILER_SAMPLE_RATE', default='0')),
+            interval_ms=float(get_env_value('PROFILER_INTERVAL_MS', default='5')),
+            directory=get_env_value('PROFILER_DIR', default='.profiles'),
+        ),
+    )
+
+    warmup_service = providers.Singleton(WarmupService,
+                                         mongo_client=mongo_client,
+                                         vector_db=vector_db,
+                                         ai_processing_service=ai_processing_service,
+                                         enabled=get_env_value('WARMUP_ENABLED', default='true').lower() == 'true',
+                                         warmup_calls=get_env_value('WARMUP_CALLS', default='true').lower() == 'true')
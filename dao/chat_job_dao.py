@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+class ChatJobDAO:
+    """
+    Data-access object for asynchronous chat jobs.
+
+    • Jobs live in the `chat_jobs` collection, keyed by a random hex `job_id`.
+    • status: queued → running → done | failed.
+    • A running job holds a lease (`worker`, `lease_expires_at`); when the lease
+      lapses (worker crashed or was killed) the job can be claimed again.
+    • Finished jobs get `expires_at`; a TTL index deletes them after that.
+    """
+
+    FINAL = ("done", "failed")
+    # fields returned to clients (drops Mongo's _id and the lease bookkeeping)
+    VIEW_PROJECTION = {"_id": 0, "job_id": 1, "user_id": 1, "status": 1, "attempts": 1, "result": 1,
+                       "error": 1, "created_at": 1, "started_at": 1, "finished_at": 1}
+
+    def __init__(self, jobs_collection: Collection) -> None:
+        self._jobs = jobs_collection
+
+        self._jobs.create_index("job_id", unique=True)
+        # claim order: oldest claimable job first
+        self._jobs.create_index([("status", 1), ("created_at", 1)])
+        self._jobs.create_index([("user_id", 1), ("status", 1)])
+        self._jobs.create_index("expires_at", expireAfterSeconds=0)
+
+    # ------------------------ enqueue / read --------------------------- #
+    def create(self, user_id: int, message_id: int, text: str) -> Dict:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "message_id": message_id,  # the stored user message this job answers
+            "text": text,
+            "status": "queued",
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+        }
+        self._jobs.insert_one(dict(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.find_one({"job_id": job_id}, self.VIEW_PROJECTION)
+
+    def count_queued(self) -> int:
+        return self._jobs.count_documents({"status": "queued"})
+
+    def count_pending(self, user_id: int) -> int:
+        return self._jobs.count_documents({"user_id": user_id, "status": {"$in": ["queued", "running"]}})
+
+    # ------------------------ worker side ------------------------------ #
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Dict]:
+        """Atomically take the oldest queued job, or a running one whose lease has lapsed."""
+        now = datetime.utcnow()
+        return self._jobs.find_one_and_update(
+            {"$or": [{"status": "queued"},
+                     {"status": "running", "lease_expires_at": {"$lt": now}}]},
+            {"$set": {"status": "running", "worker": worker, "started_at": now,
+                      "lease_expires_at": now + timedelta(seconds=lease_seconds)},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def renew(self, job_id: str, worker: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if this worker no longer holds the job."""
+        result = self._jobs.update_one(
+            {"job_id": job_id, "status": "running", "worker": worker},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}},
+        )
+        return result.modified_count == 1
+
+    def release(self, job_id: str, worker: str) -> None:
+        """Hand an unfinished job back to the queue (worker shutting down); the attempt is not counted."""
+        self._jobs.update_one(
+            {"job_id": job_id, "status": "running", "worker": worker},
+            {"$set": {"status": "queued"}, "$unset": {"worker": "", "lease_expires_at": ""},
+             "$inc": {"attempts": -1}},
+        )
+
+    def finish(self, job_id: str, worker: str, ttl_seconds: int,
+               result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """Record the outcome (done with `result`, or failed with `error`) if the lease is still ours."""
+        now = datetime.utcnow()
+        outcome = self._jobs.update_one(
+            {"job_id": job_id, "status": "running", "worker": worker},
+            {"$set": {"status": "failed" if error else "done", "result": result, "error": error,
+                      "finished_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)},
+             "$unset": {"lease_expires_at": ""}},
+        )
+        return outcome.modified_count == 1
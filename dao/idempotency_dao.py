@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+
+class IdempotencyDAO:
+    """
+    Data-access object for `Idempotency-Key` records.
+
+    • One record per (user, key) in the `idempotency_keys` collection, `_id` = "<user_id>:<key>".
+    • status: in_progress (reserved by the request running it) → done (response stored).
+    • `locked_until` bounds a reservation, so a record left behind by a crashed
+      worker can be taken over; `expires_at` drives the TTL index.
+    """
+
+    def __init__(self, keys_collection: Collection) -> None:
+        self._keys = keys_collection
+        self._keys.create_index("expires_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def _id(user_id: int, key: str) -> str:
+        return f"{user_id}:{key}"
+
+    def begin(self, user_id: int, key: str, fingerprint: str, lock_seconds: float) -> Optional[Dict]:
+        """Reserve the key. Returns None if the caller now owns it, else the existing record."""
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=lock_seconds)
+        for _ in range(2):  # the existing record may expire between the insert and the read
+            try:
+                self._keys.insert_one({
+                    "_id": self._id(user_id, key), "user_id": user_id, "fingerprint": fingerprint,
+                    "status": "in_progress", "created_at": now, "locked_until": locked_until,
+                    "expires_at": locked_until,
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            # take over a reservation whose owner died before finishing
+            stale = self._keys.find_one_and_update(
+                {"_id": self._id(user_id, key), "status": "in_progress", "fingerprint": fingerprint,
+                 "locked_until": {"$lt": now}},
+                {"$set": {"locked_until": locked_until, "expires_at": locked_until}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if stale:
+                return None
+            existing = self._keys.find_one({"_id": self._id(user_id, key)})
+            if existing:
+                return existing
+        return None
+
+    def get(self, user_id: int, key: str) -> Optional[Dict]:
+        return self._keys.find_one({"_id": self._id(user_id, key)})
+
+    def complete(self, user_id: int, key: str, status_code: int, body: Dict, ttl_seconds: int) -> None:
+        self._keys.update_one(
+            {"_id": self._id(user_id, key)},
+            {"$set": {"status": "done", "status_code": status_code, "body": body,
+                      "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)},
+             "$unset": {"locked_until": ""}},
+        )
+
+    def abandon(self, user_id: int, key: str) -> None:
+        """The request failed: drop the reservation so a retry runs it again."""
+        self._keys.delete_one({"_id": self._id(user_id, key), "status": "in_progress"})
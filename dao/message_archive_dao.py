@@ -0,0 +1,103 @@
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from bson import Binary
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+
+class MessageArchiveDAO:
+    """
+    Data-access object for archived chat messages.
+
+    • Old messages are moved out of `messages` in per-user batches: one
+      `message_archive` document holds up to a few hundred messages as a
+      zlib-compressed JSON array, plus the (timestamp, id) range it covers.
+    • `_id` = "<user_id>:<first id>:<last id>", so re-archiving the same batch
+      after a crash is a no-op.
+    • Batches of one user never overlap, so ordering by the first key orders
+      the messages too.
+    • Optional `expires_at` drives a TTL index (archive retention).
+    """
+
+    def __init__(self, archive_collection: Collection) -> None:
+        self._archive = archive_collection
+
+        self._archive.create_index([("user_id", 1), ("first_ts", 1), ("first_id", 1)])
+        self._archive.create_index("expires_at", expireAfterSeconds=0)
+
+    # ------------------------ encoding --------------------------------- #
+    @staticmethod
+    def _pack(messages: List[Dict]) -> bytes:
+        rows = [[m["id"], m["timestamp"], m["sender"], m["text"]] for m in messages]
+        return zlib.compress(orjson.dumps(rows), 6)
+
+    @staticmethod
+    def _unpack(doc: Dict) -> List[Dict]:
+        return [
+            {"id": msg_id, "text": text, "sender": sender, "user_id": doc["user_id"],
+             "timestamp": datetime.fromisoformat(ts)}
+            for msg_id, ts, sender, text in orjson.loads(zlib.decompress(doc["data"]))
+        ]
+
+    # ------------------------ writes ----------------------------------- #
+    def store_batch(self, user_id: int, messages: List[Dict], ttl_days: int = 0) -> int:
+        """Archive `messages` (oldest first); returns the compressed size in bytes."""
+        first, last = messages[0], messages[-1]
+        data = self._pack(messages)
+        doc = {
+            "_id": f"{user_id}:{first['id']}:{last['id']}",
+            "user_id": user_id,
+            "first_ts": first["timestamp"], "first_id": first["id"],
+            "last_ts": last["timestamp"], "last_id": last["id"],
+            "count": len(messages),
+            "data": Binary(data),
+        }
+        if ttl_days:
+            doc["expires_at"] = last["timestamp"] + timedelta(days=ttl_days)
+        try:
+            self._archive.insert_one(doc)
+        except DuplicateKeyError:
+            pass  # archived by an earlier run that stopped before deleting the hot copies
+        return len(data)
+
+    # ------------------------ reads ------------------------------------ #
+    def get_messages_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[Dict], bool]:
+        """Same contract as MessageDAO.get_messages_page, over the archived messages."""
+        query: Dict = {"user_id": user_id}
+        if before is not None:
+            ts, msg_id = before  # batches that start before the key
+            query["$or"] = [{"first_ts": {"$lt": ts}}, {"first_ts": ts, "first_id": {"$lt": msg_id}}]
+            direction = -1
+        elif after is not None:
+            ts, msg_id = after   # batches that end after the key
+            query["$or"] = [{"last_ts": {"$gt": ts}}, {"last_ts": ts, "last_id": {"$gt": msg_id}}]
+            direction = 1
+        else:
+            direction = -1
+
+        out: List[Dict] = []
+        for doc in self._archive.find(query).sort([("first_ts", direction), ("first_id", direction)]):
+            messages = self._unpack(doc)
+            if direction == -1:
+                messages.reverse()
+            for m in messages:
+                key = (m["timestamp"], m["id"])
+                if (before is not None and key >= before) or (after is not None and key <= after):
+                    continue
+                out.append(m)
+            if len(out) > limit:
+                break
+        has_more = len(out) > limit
+        out = out[:limit]
+        if direction == 1:
+            out.reverse()
+        return out, has_more
@@ -1,6 +1,7 @@
 from pymongo.collection import Collection
 from pymongo import ReturnDocument
-from typing import List, Dict
+from pymongo.errors import OperationFailure
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from models.message_model import Message, MessageInDB
 
@@ -15,6 +16,10 @@ class MessageDAO:
     """
 
     COUNTER_KEY = "id"
+    # fields returned by the history endpoint (drops Mongo's _id)
+    HISTORY_PROJECTION = {"_id": 0, "id": 1, "text": 1, "sender": 1, "user_id": 1, "timestamp": 1}
+    MAX_BATCH_SIZE = 1000
+    LEGACY_INDEX = "user_id_1_timestamp_-1"
 
     def __init__(
         self,
@@ -24,8 +29,21 @@ class MessageDAO:
         self._messages = messages_collection
         self._counters = counters_collection
 
-        # Index for fast querying by user and time (newest first)
-        self._messages.create_index([("user_id", 1), ("timestamp", -1)])
+        # Index for fast querying by user and time (newest first); `id` breaks
+        # timestamp ties so keyset pagination can walk the index without gaps.
+        self._messages.create_index([("user_id", 1), ("timestamp", -1), ("id", -1)])
+
+    def drop_legacy_index(self) -> bool:
+        """
+        Drop the earlier (user_id, timestamp) index, a prefix of the one above.
+        One-off (see migrate_indexes.py), not run at startup: workers booting
+        together would race on the drop. True if this call dropped it.
+        """
+        try:
+            self._messages.drop_index(self.LEGACY_INDEX)
+        except OperationFailure:  # already gone (IndexNotFound)
+            return False
+        return True
 
     # ------------------------ private helper --------------------------- #
     def _next_id(self) -> int:
@@ -65,3 +83,79 @@ class MessageDAO:
             .limit(limit)
         )
         return [MessageInDB(**doc) for doc in cursor]
+
+    def get_messages_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Keyset page of raw message dicts, newest → oldest, plus a `has_more` flag.
+
+        • `before=(timestamp, id)` → messages strictly older than that key.
+        • `after=(timestamp, id)`  → messages strictly newer than that key
+          (the `limit` closest to it, still returned newest first).
+        Walks the (user_id, timestamp, id) index, so deep pages cost the same as
+        the first one; fetches one extra row to detect whether more exist.
+        """
+        query: Dict = {"user_id": user_id}
+        direction = -1
+        if before is not None:
+            ts, msg_id = before
+            query["$or"] = [{"timestamp": {"$lt": ts}}, {"timestamp": ts, "id": {"$lt": msg_id}}]
+        elif after is not None:
+            ts, msg_id = after
+            query["$or"] = [{"timestamp": {"$gt": ts}}, {"timestamp": ts, "id": {"$gt": msg_id}}]
+            direction = 1
+
+        cursor = (
+            self._messages.find(query, self.HISTORY_PROJECTION)
+            .sort([("timestamp", direction), ("id", direction)])
+            .limit(limit + 1)
+            .batch_size(min(limit + 1, self.MAX_BATCH_SIZE))
+        )
+        docs = list(cursor)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if direction == 1:
+            docs.reverse()
+        return docs, has_more
+
+    def get_message(self, user_id: int, message_id: int) -> Optional[Dict]:
+        return self._messages.find_one({"user_id": user_id, "id": message_id}, self.HISTORY_PROJECTION)
+
+    # ------------------------ retention -------------------------------- #
+    def users_with_messages_before(self, cutoff: datetime) -> List[int]:
+        return self._messages.distinct("user_id", {"timestamp": {"$lt": cutoff}})
+
+    def get_archivable(self, user_id: int, cutoff: datetime, keep: int, limit: int,
+                       after: Optional[Tuple[datetime, int]] = None) -> List[Dict]:
+        """
+        Oldest first: up to `limit` of the user's messages older than `cutoff`
+        (and newer than the `after` key, if given), never touching their `keep`
+        newest messages.
+        """
+        newest_kept = list(
+            self._messages.find({"user_id": user_id}, {"_id": 0, "timestamp": 1, "id": 1})
+            .sort([("timestamp", -1), ("id", -1)]).skip(max(0, keep - 1)).limit(1)
+        ) if keep else []
+        if keep and not newest_kept:
+            return []  # fewer than `keep` messages in total
+        query: Dict = {"user_id": user_id, "timestamp": {"$lt": cutoff}}
+        if newest_kept:
+            ts, msg_id = newest_kept[0]["timestamp"], newest_kept[0]["id"]
+            query = {"$and": [query, {"$or": [{"timestamp": {"$lt": ts}}, {"timestamp": ts, "id": {"$lt": msg_id}}]}]}
+        if after is not None:
+            ts, msg_id = after
+            query = {"$and": [query, {"$or": [{"timestamp": {"$gt": ts}}, {"timestamp": ts, "id": {"$gt": msg_id}}]}]}
+        cursor = (
+            self._messages.find(query, self.HISTORY_PROJECTION)
+            .sort([("timestamp", 1), ("id", 1)])
+            .limit(limit)
+        )
+        return list(cursor)
+
+    def delete_messages(self, user_id: int, ids: List[int]) -> int:
+        return self._messages.delete_many({"user_id": user_id, "id": {"$in": ids}}).deleted_count
@@ -0,0 +1,77 @@
+"""
+Ingestion entry point – loads documents into the vector DB.
+
+    python ingest.py data/
+    python ingest.py data/ --reset      # drop the namespace first
+    python ingest.py data/ --status     # show the job's checkpoints
+    python ingest.py data/ --dedup-report   # extract + dedup only, print the duplicate ratio
+    python ingest.py brands/acme/ --tenant acme   # into tenant acme's namespaces
+
+Runs as a checkpointed job: re-running the same command after a crash or
+failed batches resumes it, redoing only the work that did not finish.
+
+Kept separate from the API so the API process never imports the PDF/DOCX toolchain.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from container import ServicesContainer
+
+
+async def run(folder: str, reset: bool, job_id: str = None, restart: bool = False, tenant: str = None) -> dict:
+    vectordb_service = ServicesContainer.vectordb_service()
+    if reset:
+        await vectordb_service.vector_db.delete_namespace(namespace=vectordb_service.namespace_for(tenant))
+    try:
+        return await vectordb_service.ingest_to_vector_db(folder, job_id=job_id, restart=restart or reset,
+                                                          tenant=tenant)
+    finally:
+        await vectordb_service.vector_db.aclose()
+
+
+def status(folder: str, job_id: str = None, tenant: str = None) -> dict:
+    from services.ingestion.checkpoints import CheckpointStore
+    from services.ingestion.jobs import default_job_id
+
+    vectordb_service = ServicesContainer.vectordb_service()
+    job_id = job_id or default_job_id(Path(folder).expanduser().resolve(), vectordb_service.namespace_for(tenant))
+    return CheckpointStore(vectordb_service.ingestion_config.checkpoint_path).summary(job_id)
+
+
+def dedup_report(folder: str) -> dict:
+    from services.ingestion.jobs import IngestionJob
+
+    vectordb_service = ServicesContainer.vectordb_service()
+    job = IngestionJob(vectordb_service.vector_db, vectordb_service.namespace, vectordb_service.ingestion_config)
+    return asyncio.run(job.dedup_report(Path(folder).expanduser().resolve()))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="directory containing .pdf / .docx files")
+    parser.add_argument("--reset", action="store_true", help="delete the namespace (and checkpoints) before ingesting")
+    parser.add_argument("--job-id", default=None, help="defaults to one derived from folder + namespace")
+    parser.add_argument("--restart", action="store_true", help="ignore existing checkpoints for this job")
+    parser.add_argument("--status", action="store_true", help="print the job's checkpoint summary and exit")
+    parser.add_argument("--dedup-report", action="store_true",
+                        help="extract and deduplicate without embedding, print the report and exit")
+    parser.add_argument("--tenant", default=None, help="tenant (brand) to ingest for; defaults to the default tenant")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.status:
+        print(json.dumps(status(args.folder, args.job_id, args.tenant), indent=2, default=str))
+        return 0
+    if args.dedup_report:
+        print(json.dumps(dedup_report(args.folder), indent=2))
+        return 0
+    summary = asyncio.run(run(args.folder, args.reset, args.job_id, args.restart, args.tenant))
+    return 0 if summary["job"]["status"] == "completed" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
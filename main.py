@@ -1,14 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import os
+from container import ServicesContainer
 from routes.user_route import user_router
 from routes.messaging_routes import messaging_router
+from routes.ops_routes import ops_router, health_router
 from helpers import get_env_value
 from fastapi.middleware.cors import CORSMiddleware
+from services.profiler import ProfilingMiddleware
 
-app = FastAPI()
+# the sampling profiler is opt-in: when off, neither the middleware nor its task factory is installed
+PROFILER_ENABLED = get_env_value("PROFILER_ENABLED", default="false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the service graph (Mongo client, DAOs, LLM clients, compiled LangGraph)
+    # once per worker here rather than at import time.
+    ServicesContainer.user_service()
+    ServicesContainer.message_service()
+
+    # Network warm-up runs in the background: the worker is live immediately,
+    # but /ready only reports 200 once pools are open.
+    warmup = asyncio.create_task(ServicesContainer.warmup_service().run_until_ready())
+    # workers for `?async=true` chat jobs (CHAT_JOB_WORKERS=0 leaves them to chat_worker.py)
+    chat_jobs = ServicesContainer.chat_job_queue()
+    chat_jobs.start()
+    if PROFILER_ENABLED:
+        ServicesContainer.profiler().attach(asyncio.get_running_loop())
+    yield
+    await chat_jobs.stop()
+    warmup.cancel()
+    await ServicesContainer.vector_db().aclose()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 app.include_router(user_router)
 app.include_router(messaging_router)
+app.include_router(ops_router)
+app.include_router(health_router)
+if PROFILER_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=ServicesContainer.profiler)
 frontend_origins = os.getenv("FRONTEND_BASE_URL", "")
 if frontend_origins:
     origins = [o.strip() for o in frontend_origins.split(",")]
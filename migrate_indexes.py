@@ -0,0 +1,29 @@
+"""
+One-off index migration for the `messages` collection.
+
+    python migrate_indexes.py
+
+Drops the (user_id, timestamp) index superseded by (user_id, timestamp, id),
+which the API creates at startup. Run once after deploying; re-running is a no-op.
+"""
+import argparse
+import json
+import logging
+
+from container import ServicesContainer
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    message_dao = ServicesContainer.message_dao()
+    report = {"dropped": [message_dao.LEGACY_INDEX] if message_dao.drop_legacy_index() else []}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
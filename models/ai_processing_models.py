@@ -1,4 +1,4 @@
-from typing import List, Optional, Union
+from typing import List, Literal, Optional, Union
 from pydantic import BaseModel
 from models.user_model import User
 
@@ -13,3 +13,142 @@ class MessageAnalysis(BaseModel):
     suggested_message_reply: str
     conversation_summary: str
     factual_consistency: str
+    plan: Optional[str] = None
+    skipped_stages: List[str] = []
+
+
+class LLMSchedulerConfig(BaseModel):
+    """Limits applied by the shared LLM scheduler in front of Azure OpenAI."""
+    max_concurrency: int = 8
+    tokens_per_minute: int = 60_000
+    requests_per_minute: int = 360
+    expected_completion_tokens: int = 400
+
+
+class LLMCacheConfig(BaseModel):
+    """Exact-match response cache for deterministic (temperature=0) LLM calls."""
+    enabled: bool = True
+    max_entries: int = 2048
+    default_ttl_seconds: int = 3600
+    # per graph node override, 0 disables caching for that node
+    node_ttl_seconds: dict[str, int] = {
+        "classify_conversation": 3600,
+        "validate_context": 3600,
+        "generate_reply": 600,
+        "generate_user_friendly_dm": 86400,
+        "grade_factual_consistency": 3600,
+    }
+    disk_path: Optional[str] = None  # sqlite file for the optional on-disk tier
+
+
+class CacheConfig(BaseModel):
+    """Cache backend shared by the services (see services.cache)."""
+    backend: str = "memory"              # memory (per process) | shm (workers on one host) | resp (Redis protocol)
+    max_entries: int = 10000             # memory backend: LRU bound
+    shm_path: str = "/dev/shm/ragbot-cache"
+    shm_slots: int = 8192                # shm backend: fixed-size slots (4-way set associative)
+    shm_slot_bytes: int = 8192           # larger values are not cached
+    resp_url: str = "redis://127.0.0.1:6379/0"
+    resp_timeout_seconds: float = 0.05   # per command; a slow or unreachable server is a miss
+    resp_retry_seconds: float = 2.0      # after an error, skip the server for this long
+    key_prefix: str = "ragbot"
+    compress_min_bytes: int = 512        # zlib-compress encoded values at least this large
+    default_ttl_seconds: int = 300
+    namespace_ttl_seconds: dict[str, int] = {
+        # user records (auth, existence checks), shared backends only; dropped by UserService.delete_user,
+        # but a user removed straight from Mongo stays valid for up to this long
+        "users": 60,
+        "embeddings": 86400,             # query embeddings
+    }
+
+
+class DeadlineConfig(BaseModel):
+    """Time budget of one /messages/process request and what its optional stages need."""
+    request_timeout_seconds: float = 25.0
+    # budget an optional graph node needs before it is attempted; once a node has
+    # `min_samples` timings its observed p95 is used instead
+    stage_budget_seconds: dict[str, float] = {
+        "validate_context": 4.0,
+        "generate_user_friendly_dm": 4.0,
+        "grade_factual_consistency": 4.0,
+    }
+    min_samples: int = 20
+    reply_reserve_seconds: float = 8.0   # kept back for generate_reply by the nodes before it
+    margin_seconds: float = 0.5          # left for storing the reply and responding
+
+
+class AdmissionConfig(BaseModel):
+    """Admission control in front of /messages/process."""
+    enabled: bool = True
+    max_in_flight: int = 32           # requests running the pipeline at once
+    max_pending_per_user: int = 2     # in flight + queued for one user; beyond this => 429
+    max_queue: int = 512              # queued requests across all users; beyond this => 503
+    queue_slo_seconds: float = 5.0    # longest acceptable queue wait; projected beyond this => 503
+    initial_service_seconds: float = 3.0  # service-time guess until requests have been measured
+
+
+class ChatSocketConfig(BaseModel):
+    """Limits for the /messages/ws chat channel, per worker."""
+    max_connections: int = 200            # open sockets per worker; beyond this => close 1013
+    history_size: int = 20                # messages kept in connection state (same window as /process)
+    auth_timeout_seconds: float = 10.0    # time allowed for the first (auth) frame
+    idle_timeout_seconds: float = 300.0   # close sockets that send nothing for this long
+    max_queued_turns: int = 1             # messages accepted while a turn is running; beyond this => busy
+    max_pending_frames: int = 64          # unsent frames to a client that does not read; beyond this => close 1008
+
+
+class ChatJobConfig(BaseModel):
+    """Asynchronous chat jobs (`POST /messages/process?async=true`), persisted in Mongo."""
+    workers: int = 4                      # jobs run at once by this process; 0 = enqueue only
+    poll_interval_seconds: float = 0.5    # idle workers look for jobs enqueued by other processes this often
+    lease_seconds: float = 60.0           # a running job whose worker stops renewing this is picked up again
+    max_attempts: int = 3                 # claims per job before it is marked failed
+    max_queued: int = 1000                # queued jobs across all users; beyond this => 503
+    max_pending_per_user: int = 5         # queued + running jobs for one user; beyond this => 429
+    result_ttl_seconds: int = 86_400      # finished jobs are deleted by Mongo this long after finishing
+    max_wait_seconds: float = 30.0        # longest long-poll on GET /messages/jobs/{id}
+
+
+class IdempotencyConfig(BaseModel):
+    """`Idempotency-Key` handling (and coalescing of in-flight retries) on /messages/process."""
+    enabled: bool = True
+    ttl_seconds: int = 86_400          # how long a finished request's response is replayed
+    lock_seconds: float = 60.0         # a reservation older than this (owner crashed) can be taken over
+    wait_seconds: float = 30.0         # how long a retry waits for the original run in another worker
+    poll_interval_seconds: float = 0.25
+    max_key_length: int = 255
+
+
+class ProfilerConfig(BaseModel):
+    """Opt-in sampling profiler for live requests; nothing is installed unless `enabled`."""
+    enabled: bool = False
+    admin_token: str = ""                 # X-Admin-Token for the header trigger and /ops/profiles
+    sample_rate: float = 0.0              # share of requests profiled without asking (0 = only on request)
+    interval_ms: float = 5.0              # time between stack samples
+    directory: str = ".profiles"          # where folded-stack captures are written
+    max_files: int = 200                  # oldest captures are deleted beyond this
+    max_window_seconds: float = 120.0     # longest time-window capture
+
+
+class RetentionConfig(BaseModel):
+    """What stays in the hot `messages` collection; run by `python retention.py`."""
+    hot_days: int = 90                    # messages older than this leave `messages`
+    min_hot_messages: int = 100           # ...except each user's newest N (the chat pipeline reads the last 20)
+    mode: Literal["archive", "delete"] = "archive"
+    batch_size: int = 500                 # messages per compressed archive document
+    archive_ttl_days: int = 0             # archived batches expire this long after their last message (0 = keep)
+
+
+class FaqConfig(BaseModel):
+    """FAQ fast path: answer straight from the FAQ index, without the graph, on a confident match."""
+    enabled: bool = True
+    min_score: float = 0.92               # cosine similarity to a known question needed to answer from the FAQ
+    max_message_chars: int = 400          # longer messages are not looked up
+    lookup_timeout_seconds: float = 1.0   # a slow lookup falls through to the graph
+
+
+class BenefitsConfig(BaseModel):
+    """Structured benefits table (services.benefits): exact rows for the prompt and direct answers."""
+    enabled: bool = True
+    direct_answers: bool = True           # answer "what's the X for plan Y" from the table, without the graph
+    max_question_chars: int = 160         # longer messages are left to the graph
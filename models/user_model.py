@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -5,6 +7,7 @@ class User(BaseModel):
     user_name: str
     user_email: EmailStr
     password: str
+    tenant: Optional[str] = None  # brand whose knowledge base the user chats with; None = the default tenant
 
 
 class UserInDB(User):
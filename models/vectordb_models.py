@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 DEFAULT_EMBEDDINGS_MODEL = "text-embedding-ada-002"
@@ -13,3 +13,94 @@ class PineconeConfig(VectorDBConfig):
     api_key: Optional[str]
     top_k: int = 3
     base_url: str
+    # upserts: requests are packed up to Pinecone's size / count limits and sent concurrently
+    upsert_max_bytes: int = 2 * 1024 ** 2 - 16 * 1024  # 2 MB request limit, minus headroom for the envelope
+    upsert_max_vectors: int = 1000
+    upsert_concurrency: int = 4
+    upsert_max_attempts: int = 4       # per request, on 429 / 5xx / connection errors
+    upsert_backoff_seconds: float = 0.5
+
+
+class IngestionConfig(BaseModel):
+    """Batching, retry and checkpoint settings for ingestion jobs."""
+    batch_size: int = 100              # chunks embedded + upserted (and checkpointed) together
+    embed_concurrency: int = 8         # embedding requests in flight within a batch
+    max_attempts: int = 3              # per batch, per run
+    retry_backoff_seconds: float = 1.0
+    checkpoint_path: str = ".ingest/checkpoints.sqlite3"
+    dedup: bool = True                 # fold exact / near-duplicate chunks before embedding
+    dedup_threshold: float = 0.85      # estimated Jaccard similarity of word shingles
+    faq: bool = True                   # index detected question / answer pairs for the FAQ fast path
+    benefits_path: Optional[str] = ".index/benefits.json"  # structured benefits table (None = not built)
+    page_cache_path: Optional[str] = ".ingest/pages"  # parsed PDF pages by file hash (None = parse every run)
+
+
+class LocalIndexConfig(BaseModel):
+    """Self-hosted, memory-mapped index (see services.rag_service.local_index)."""
+    path: str = ".index"
+    dims: int = 1536
+    dtype: str = "int8"                # float32 | float16 | int8 (per-vector scale)
+    rescore: bool = True               # keep float32 originals and re-rank the top candidates with them
+    rescore_candidates: int = 50
+    top_k: int = 3
+    max_resident_mb: Optional[float] = None  # LRU-evict loaded namespaces (tenant shards) above this; None = keep all
+
+
+class TenantConfig(BaseModel):
+    """Tenants (brands) served by one deployment, each with its own namespaces (see services.tenants)."""
+    default_tenant: str = "default"    # users without a tenant; keeps the un-prefixed namespaces
+    tenants: List[str] = []            # allowed tenant ids; empty = any well-formed id
+
+
+class DocumentChunk(BaseModel):
+    """One embeddable unit of a source document, with where it came from."""
+    text: str
+    source: str                        # file name
+    page: Optional[int] = None         # 1-based, PDFs only
+    plan: Union[str, List[str]] = "general"  # plan id (services.plans) or "general"; a list once merged
+    kind: str = "paragraph"            # paragraph | table_row
+    sources: Optional[List[str]] = None  # every file carrying this text, when duplicates were merged
+
+    def plans(self) -> List[str]:
+        return self.plan if isinstance(self.plan, list) else [self.plan]
+
+    def metadata(self) -> dict:
+        """Vector metadata; None values are dropped since Pinecone rejects nulls."""
+        return self.model_dump(exclude={"text"}, exclude_none=True)
+
+
+class ParsedTable(BaseModel):
+    """Cell text of one table; `columns` holds the header when the parser split it off."""
+    rows: List[List[str]]
+    columns: Optional[List[str]] = None
+
+
+class ParsedPage(BaseModel):
+    """A PDF page as extraction sees it: text outside the tables, and the tables."""
+    page: int                          # 1-based
+    text: str = ""
+    tables: List[ParsedTable] = []
+
+
+class FaqEntry(BaseModel):
+    """A question / answer pair detected in a document, indexed for the FAQ fast path."""
+    question: str                      # what is embedded and matched against user messages
+    answer: str                        # returned verbatim
+    source: str
+    page: Optional[int] = None
+    plan: str = "general"
+
+    def metadata(self) -> dict:
+        return self.model_dump(exclude={"question"}, exclude_none=True)
+
+
+class BenefitRow(BaseModel):
+    """One cost-sharing entry of a plan's benefits table (services.benefits)."""
+    plan: str
+    benefit: str                       # canonical key (services.benefits.BENEFITS) or a slug of the label
+    tier: str = "all"                  # in_network | out_of_network | all (documents with one cost column)
+    label: str                         # as printed: "Specialist visit", "What is the overall deductible?"
+    value: str                         # "$40 copay/visit"
+    limitations: str = ""
+    source: str
+    page: Optional[int] = None
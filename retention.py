@@ -0,0 +1,33 @@
+"""
+Message retention – moves old messages out of the hot `messages` collection.
+
+    python retention.py                 # archive (or delete) per MESSAGES_* settings
+    python retention.py --dry-run       # report what would move, change nothing
+
+Messages older than MESSAGES_HOT_DAYS (default 90), except each user's newest
+MESSAGES_MIN_HOT (default 100), are compacted into compressed per-user batches
+in `message_archive` (MESSAGES_RETENTION_MODE=archive) or deleted
+(MESSAGES_RETENTION_MODE=delete). Safe to re-run after an interruption; meant
+to be scheduled (e.g. daily cron).
+"""
+import argparse
+import json
+import logging
+
+from container import ServicesContainer
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count what would move without changing anything")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = ServicesContainer.message_archiver().run(dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+# backend/routes/dependencies.py
+from typing import Optional
+
+from fastapi import Header, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+
+from container import ServicesContainer
+from services.admission_control import AdmissionController
+from services.chat_jobs import ChatJobQueue
+from services.chat_socket import ChatSocketServer
+from services.idempotency import IdempotencyService
+from services.profiler import SamplingProfiler
+from services.messaging_service import MessageService
+from services.user_service import UserService
+
+# Services are built once in the app lifespan (main.py); these just hand out the singletons.
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+
+def get_user_service() -> UserService:
+    return ServicesContainer.user_service()
+
+
+def get_message_service() -> MessageService:
+    return ServicesContainer.message_service()
+
+
+def get_admission_controller() -> AdmissionController:
+    return ServicesContainer.admission_controller()
+
+
+def get_chat_job_queue() -> ChatJobQueue:
+    return ServicesContainer.chat_job_queue()
+
+
+def get_idempotency_service() -> IdempotencyService:
+    return ServicesContainer.idempotency_service()
+
+
+def get_profiler_admin(x_admin_token: Optional[str] = Header(None)) -> SamplingProfiler:
+    """The profiler, for callers holding PROFILER_ADMIN_TOKEN; 404 when profiling is off."""
+    profiler = ServicesContainer.profiler()
+    if not profiler.config.enabled or not profiler.config.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return profiler
+
+
+def get_chat_socket_server() -> ChatSocketServer:
+    return ServicesContainer.chat_socket_server()
@@ -1,47 +1,112 @@
 # backend/routes/message_route.py
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
-from container import ServicesContainer
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Header, Query, WebSocket
+from fastapi.responses import ORJSONResponse
+from routes.dependencies import oauth2_scheme, get_message_service, get_user_service, get_admission_controller, \
+    get_chat_socket_server, get_chat_job_queue, get_idempotency_service
+from services.admission_control import AdmissionController
+from services.chat_jobs import ChatJobQueue
+from services.chat_socket import ChatSocketServer
+from services.idempotency import IdempotencyService, request_fingerprint
 from services.messaging_service import MessageService
 from services.user_service import UserService
 
 messaging_router = APIRouter(prefix="/messages")
 
-messaging_service: MessageService = ServicesContainer.message_service()
-user_service: UserService = ServicesContainer.user_service()
 
 @messaging_router.post(
     "/process",
-    summary="Process a user message and return bot reply",
+    summary="Process a user message and return bot reply (or a job id with ?async=true)",
     status_code=status.HTTP_200_OK,
 )
 async def process_message(
     text: str = Body(..., embed=True, max_length=500),
-    token: str = Depends(user_service.oauth2_scheme),
+    async_mode: bool = Query(False, alias="async", description="Queue the message and return a job id"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    token: str = Depends(oauth2_scheme),
+    user_service: UserService = Depends(get_user_service),
+    messaging_service: MessageService = Depends(get_message_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+    chat_jobs: ChatJobQueue = Depends(get_chat_job_queue),
+    idempotency: IdempotencyService = Depends(get_idempotency_service),
+):
+    user = _current_user(user_service, token)
+
+    async def handle():
+        if async_mode:
+            job = chat_jobs.enqueue(user_id=user.user_id, text=text)
+            status_url = f"{messaging_router.prefix}/jobs/{job['job_id']}"
+            return status.HTTP_202_ACCEPTED, {"job_id": job["job_id"], "status": job["status"],
+                                              "status_url": status_url}
+        # 429 / 503 with Retry-After when this user or the whole worker is over capacity
+        async with admission.admit(user.user_id):
+            reply = await messaging_service.process_user_message(user_id=user.user_id, text=text)
+        return status.HTTP_200_OK, {"response": reply}
+
+    # retries with the same Idempotency-Key share one run
+    status_code, body, replayed = await idempotency.run(
+        user.user_id, idempotency_key, request_fingerprint(text, async_mode), handle
+    )
+    headers = {"Idempotent-Replayed": "true"} if replayed else {}
+    if "status_url" in body:
+        headers["Location"] = body["status_url"]
+    return ORJSONResponse(body, status_code=status_code, headers=headers)
+
+
+@messaging_router.get(
+    "/jobs/{job_id}",
+    summary="Status and result of an asynchronous message job",
+    status_code=status.HTTP_200_OK,
+)
+async def get_message_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Long-poll: seconds to wait for the job to finish"),
+    token: str = Depends(oauth2_scheme),
+    user_service: UserService = Depends(get_user_service),
+    chat_jobs: ChatJobQueue = Depends(get_chat_job_queue),
 ):
-    payload = user_service.decode_token(token)
-    email = payload.get("sub") or _unauth()
-    user = user_service.get_user_by_email(email) or _unauth()
+    user = _current_user(user_service, token)
 
-    reply = await messaging_service.process_user_message(user_id=user.user_id, text=text)
-    return {"response": reply}
+    return ORJSONResponse(await chat_jobs.get(job_id, user_id=user.user_id, wait=wait))
+
+
+@messaging_router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    server: ChatSocketServer = Depends(get_chat_socket_server),
+):
+    # authenticates once, then streams each reply's tokens and a final frame with the graph metadata
+    await server.serve(websocket)
 
 
 @messaging_router.get(
     "/history",
-    summary="Get last N messages for the logged-in user",
+    summary="Get a page of messages for the logged-in user (keyset paginated)",
     status_code=status.HTTP_200_OK,
 )
 def get_message_history(
     limit: int = Query(20, ge=1, le=100),
-    token: str = Depends(user_service.oauth2_scheme),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    token: str = Depends(oauth2_scheme),
+    user_service: UserService = Depends(get_user_service),
+    messaging_service: MessageService = Depends(get_message_service),
 ):
-    payload = user_service.decode_token(token)
-    email = payload.get("sub") or _unauth()
-    user = user_service.get_user_by_email(email) or _unauth()
+    user = _current_user(user_service, token)
 
-    msgs = messaging_service.get_messages(user_id=user.user_id, limit=limit)
-    return {"messages": msgs}
+    # raw projected dicts straight to orjson: no MessageInDB / jsonable_encoder pass
+    page = messaging_service.get_history_page(user_id=user.user_id, limit=limit, before=before, after=after)
+    return ORJSONResponse(page)
 
 
 def _unauth():
     raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+def _current_user(user_service: UserService, token: str):
+    # get_user_by_token also rejects a token minted for another tenant than the user's
+    try:
+        return user_service.get_user_by_token(token)
+    except ValueError:
+        _unauth()
@@ -0,0 +1,69 @@
+# backend/routes/ops_routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, ORJSONResponse
+from container import ServicesContainer
+from routes.dependencies import get_profiler_admin
+from services.profiler import SamplingProfiler
+from services.stage_metrics import stage_metrics
+
+ops_router = APIRouter(prefix="/ops")
+health_router = APIRouter()
+
+
+@ops_router.get(
+    "/metrics",
+    summary="Runtime metrics for capacity planning",
+    status_code=status.HTTP_200_OK,
+)
+def get_metrics():
+    return {
+        "admission": ServicesContainer.admission_controller().stats(),
+        "chat_socket": ServicesContainer.chat_socket_server().stats(),
+        "chat_jobs": ServicesContainer.chat_job_queue().stats(),
+        "faq": ServicesContainer.faq_service().stats(),
+        "benefits": ServicesContainer.benefit_service().stats(),
+        "vector_index": ServicesContainer.vectordb_service().vector_db.stats(),
+        "cache": ServicesContainer.cache_backend().stats(),
+        "idempotency": ServicesContainer.idempotency_service().stats(),
+        "llm_scheduler": ServicesContainer.llm_scheduler().stats(),
+        "llm_response_cache": ServicesContainer.llm_response_cache().stats(),
+        "stages": stage_metrics.stats(),
+        "stage_skips": stage_metrics.skips(),
+    }
+
+
+@ops_router.get("/profiles", summary="List sampling-profiler captures (admin)")
+def list_profiles(profiler: SamplingProfiler = Depends(get_profiler_admin)):
+    return {"profiles": profiler.list()}
+
+
+@ops_router.get("/profiles/{name}", summary="Download a capture in folded-stack (flamegraph) format (admin)")
+def download_profile(name: str, profiler: SamplingProfiler = Depends(get_profiler_admin)):
+    path = profiler.path(name) or _not_found()
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+
+@ops_router.post("/profiles/window", summary="Profile every thread of this worker for a while (admin)")
+async def profile_window(
+    seconds: float = Query(10, gt=0, le=120),
+    profiler: SamplingProfiler = Depends(get_profiler_admin),
+):
+    capture = await profiler.profile_window(seconds)
+    return {"name": capture.name, "samples": capture.samples}
+
+
+def _not_found():
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+
+@health_router.get("/health", summary="Liveness probe", status_code=status.HTTP_200_OK)
+def health():
+    return {"status": "ok"}
+
+
+@health_router.get("/ready", summary="Readiness probe: 200 only once the worker is warm")
+def ready():
+    warmup = ServicesContainer.warmup_service()
+    if not warmup.ready:
+        return ORJSONResponse({"status": "warming_up"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ready", "warmup": warmup.report}
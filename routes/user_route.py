@@ -1,14 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from fastapi.security import OAuth2PasswordRequestForm
 from models.user_model import User, UserInDB, Token
-from container import ServicesContainer
+from routes.dependencies import oauth2_scheme, get_user_service
+from services.user_service import UserService
 
 user_router = APIRouter(prefix="/user")
-user_service = ServicesContainer.user_service()
 
 
 @user_router.post("/register", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
-def register(user: User):
+def register(user: User, user_service: UserService = Depends(get_user_service)):
     try:
         return user_service.create_user(user)
     except ValueError as e:
@@ -16,18 +16,20 @@ def register(user: User):
 
 
 @user_router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+def login(form_data: OAuth2PasswordRequestForm = Depends(),
+          user_service: UserService = Depends(get_user_service)):
     user = user_service.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    token = user_service.create_access_token({"sub": user.user_email})
+    token = user_service.create_access_token(user_service.token_claims(user))
     return {
         "access_token": token,
         "token_type": "bearer",
     }
 
 @user_router.get("/fetch", response_model=UserInDB)
-def get_user(user_token: str = Query(..., alias="token")):
+def get_user(user_token: str = Query(..., alias="token"),
+             user_service: UserService = Depends(get_user_service)):
     try:
         # Decode token (use UserService helper if you added one)
         return user_service.get_user_by_token(token=user_token)
@@ -36,7 +38,8 @@ def get_user(user_token: str = Query(..., alias="token")):
 
 
 @user_router.delete("/users/me", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(token: str = Depends(user_service.oauth2_scheme)):
+def delete_user(token: str = Depends(oauth2_scheme),
+                user_service: UserService = Depends(get_user_service)):
     try:
         payload = user_service.decode_token(token)
         email = payload.get("sub")
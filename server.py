@@ -0,0 +1,62 @@
+"""
+Production launcher.
+
+    python server.py                       # workers from WEB_CONCURRENCY (default: CPU count)
+    python server.py --workers 4 --port 8000
+
+Runs uvicorn with multiple worker processes, the uvloop event loop and the
+httptools HTTP parser (falling back to uvicorn's defaults when they are not
+installed). On SIGTERM each worker stops accepting connections and lets
+in-flight chats finish for up to GRACEFUL_SHUTDOWN_SECONDS before exiting.
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from helpers import get_env_value
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app", help="import string of the ASGI app")
+    parser.add_argument("--factory", action="store_true", help="treat --app as an app factory")
+    parser.add_argument("--host", default=get_env_value("HOST", default="0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(get_env_value("PORT", default="8000")))
+    parser.add_argument("--workers", type=int,
+                        default=int(get_env_value("WEB_CONCURRENCY", default=str(os.cpu_count() or 1))))
+    parser.add_argument("--graceful-shutdown", type=int,
+                        default=int(get_env_value("GRACEFUL_SHUTDOWN_SECONDS", default="60")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--keep-alive", type=int, default=int(get_env_value("KEEP_ALIVE_SECONDS", default="75")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default=get_env_value("LOG_LEVEL", default="info"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    uvicorn.run(
+        args.app,
+        factory=args.factory,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _available("uvloop") else "auto",
+        http="httptools" if _available("httptools") else "auto",
+        timeout_graceful_shutdown=args.graceful_shutdown,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        log_level=args.log_level,
+        access_log=False,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
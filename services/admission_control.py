@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from models.ai_processing_models import AdmissionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    Gate in front of the chat pipeline, so overload turns into fast rejections
+    instead of a growing pile of requests that all time out together.
+
+    • At most `max_in_flight` requests run at once; the rest wait in per-user queues.
+    • Queued users are served round-robin, so a chatty user only delays their own requests.
+    • A user with `max_pending_per_user` requests already pending gets 429.
+    • A request whose projected queue wait exceeds the SLO (or that outwaits it) gets 503.
+    Both carry Retry-After.
+    """
+
+    WAIT_SAMPLES = 1000
+    EWMA_ALPHA = 0.2
+    RATE_SAMPLES = 64  # recent completions used to measure how fast slots free up
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self._queues: "OrderedDict[int, deque]" = OrderedDict()  # user -> waiting futures, in serving order
+        self._pending: dict[int, int] = defaultdict(int)         # user -> in flight + queued
+        self._queued = 0
+        self._in_flight = 0
+        self._service_time = config.initial_service_seconds     # EWMA of time spent in a slot
+        self._completions: deque = deque(maxlen=self.RATE_SAMPLES)
+
+        # metrics
+        self._admitted = 0
+        self._rejected: dict[str, int] = defaultdict(int)
+        self._waits: deque = deque(maxlen=self.WAIT_SAMPLES)
+
+    # ------------------------ public API ------------------------------- #
+    @asynccontextmanager
+    async def admit(self, user_id: int):
+        """Hold a pipeline slot for the duration of the block, or raise 429 / 503."""
+        if not self.config.enabled:
+            yield
+            return
+        await self._acquire(user_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time += self.EWMA_ALPHA * (elapsed - self._service_time)
+            self._completions.append(time.monotonic())
+            self._release(user_id)
+
+    def estimated_wait(self, user_id: Optional[int] = None) -> float:
+        """
+        Projected queue wait for a new request. With round-robin serving, each other
+        user is ahead by at most one request more than this user already has queued.
+        """
+        if self._in_flight < self.config.max_in_flight and not self._queued:
+            return 0.0
+        own = len(self._queues.get(user_id, ()))
+        ahead = sum(min(len(queue), own + 1) for queue in self._queues.values())
+        return (ahead + 1) / self._drain_rate()
+
+    def _drain_rate(self) -> float:
+        """Slots freed per second: measured while saturated, else derived from the service time."""
+        nominal = self.config.max_in_flight / self._service_time
+        if len(self._completions) < self.RATE_SAMPLES // 4:
+            return nominal
+        span = time.monotonic() - self._completions[0]
+        # a slow backend frees slots slower than max_in_flight / service_time suggests
+        return min(nominal, len(self._completions) / span) if span > 0 else nominal
+
+    def stats(self) -> dict:
+        ordered = sorted(self._waits)
+        return {
+            "enabled": self.config.enabled,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.config.max_in_flight,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "queue_wait": {
+                "samples": len(ordered),
+                "avg_ms": round(1000 * sum(ordered) / len(ordered), 2) if ordered else 0.0,
+                "p95_ms": round(1000 * ordered[int(0.95 * (len(ordered) - 1))], 2) if ordered else 0.0,
+                "max_ms": round(1000 * ordered[-1], 2) if ordered else 0.0,
+            },
+            "service_time_ms": round(1000 * self._service_time, 2),
+            "drain_rate_per_s": round(self._drain_rate(), 2),
+            "estimated_wait_ms": round(1000 * self.estimated_wait(), 2),
+        }
+
+    # ------------------------ internals -------------------------------- #
+    async def _acquire(self, user_id: int) -> None:
+        if self._pending.get(user_id, 0) >= self.config.max_pending_per_user:
+            self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_limit", self._service_time,
+                         "Too many messages in progress, please wait for the previous reply")
+
+        if self._in_flight < self.config.max_in_flight and not self._queued:
+            self._grant(user_id, waited=0.0)
+            return
+
+        wait = self.estimated_wait(user_id)
+        if self._queued >= self.config.max_queue or wait > self.config.queue_slo_seconds:
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "overloaded", wait - self.config.queue_slo_seconds,
+                         "Server is busy, please retry shortly")
+
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        self._pending[user_id] += 1
+        try:
+            await asyncio.wait_for(future, self.config.queue_slo_seconds)
+        except asyncio.TimeoutError:
+            self._abandon(user_id)
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "queue_timeout", self._service_time,
+                         "Server is busy, please retry shortly")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(user_id)  # slot was granted just before the client went away
+            else:
+                self._abandon(user_id)
+            raise
+        self._waits.append(time.monotonic() - enqueued)
+
+    def _grant(self, user_id: int, waited: float) -> None:
+        self._in_flight += 1
+        self._pending[user_id] += 1
+        self._admitted += 1
+        self._waits.append(waited)
+
+    def _abandon(self, user_id: int) -> None:
+        """A queued waiter gave up; its cancelled future is dropped by _dispatch."""
+        self._queued -= 1
+        self._drop_pending(user_id)
+
+    def _release(self, user_id: int) -> None:
+        self._in_flight -= 1
+        self._drop_pending(user_id)
+        self._dispatch()
+
+    def _drop_pending(self, user_id: int) -> None:
+        self._pending[user_id] -= 1
+        if self._pending[user_id] <= 0:
+            del self._pending[user_id]
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued users round-robin: one request per user per turn."""
+        while self._queues and self._in_flight < self.config.max_in_flight:
+            user_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if future.done():  # waiter timed out or was cancelled
+                continue
+            self._queued -= 1
+            self._in_flight += 1
+            self._admitted += 1
+            future.set_result(None)
+
+    def _reject(self, status_code: int, reason: str, retry_after: float, detail: str) -> None:
+        self._rejected[reason] += 1
+        seconds = max(1, math.ceil(retry_after))
+        logger.debug(f"Admission rejected ({reason}), retry after {seconds}s")
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(seconds)})
@@ -1,8 +1,12 @@
 import os
+import asyncio
 import logging
-from typing import TypedDict, Optional
+import time
+from contextlib import nullcontext
+from typing import Awaitable, Callable, TypedDict, Optional
 from models.user_model import User
-from langchain_core.messages import SystemMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage
 from langchain_openai import AzureChatOpenAI
 from langgraph.graph import StateGraph, END
 
@@ -10,9 +14,17 @@ from models.vectordb_models import PineconeConfig
 from services.prompts.dm_workflow_prompts import *
 import json
 from helpers import get_env_value
-from models.ai_processing_models import MessageRecommendationContext, MessageAnalysis
+from models.ai_processing_models import MessageRecommendationContext, MessageAnalysis, LLMSchedulerConfig, \
+    LLMCacheConfig, DeadlineConfig
 from services.rag_service.pinecone import PineconeDB
 from services.vector_db_service import VectorDbService
+from services.llm_scheduler import LLMScheduler, Priority, estimate_tokens
+from services.llm_cache import LLMResponseCache
+from services.stage_metrics import stage_metrics
+from services.cassettes import Cassette
+from services.plans import detect_plan, normalize_plan
+from services.deadline import Deadline, DeadlineExceeded
+from services.benefits import BenefitService
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +37,14 @@ class DMModeratorAgentState(TypedDict):
     retrieved_context: Optional[str]
     message_type: Optional[str]  # TEXT, SELF_IG_REEL, etc.
     category: Optional[str]  # Product Inquiry, General Inquiry, etc.
+    plan: Optional[str]  # plan id the query is about (services.plans), used to pre-filter retrieval
+    tenant: Optional[str]  # whose knowledge base is searched (services.tenants); None = the default tenant
     suggested_message_reply: Optional[str]
     formatted_suggested_dm: Optional[str]
+    bypass_cache: bool
+    deadline: Optional[Deadline]
+    skipped_stages: list[str]  # nodes skipped or cut short to stay inside the deadline
+    on_token: Optional[Callable[[str], Awaitable[None]]]  # receives generate_reply's text as it streams
 
 
 os.environ["AZURE_OPENAI_API_KEY"] = get_env_value('AZURE_OPENAI_API_KEY')
@@ -34,10 +52,29 @@ os.environ["AZURE_OPENAI_ENDPOINT"] = get_env_value('AZURE_OPENAI_ENDPOINT')
 OPENAI_API_VERSION = get_env_value('OPENAI_API_VERSION')
 AZURE_MODEL_NAME = get_env_value('AZURE_MODEL_NAME')
 
+# replies used when the deadline is hit before generate_reply finishes
+BEST_EFFORT_REPLY = ("Sorry, this is taking longer than expected and I couldn't put together a full answer. "
+                     "Please try again in a moment.")
+BEST_EFFORT_CONTEXT_REPLY = ("Sorry, I couldn't put together a full answer in time. Here is the most relevant "
+                             "part of the plan documents:\n\n{context}")
+NO_CONTEXT = "No context available"
+
+# which scheduling lane each graph node's LLM call runs in
+NODE_PRIORITIES = {
+    "classify_conversation": Priority.INTERACTIVE,
+    "validate_context": Priority.INTERACTIVE,
+    "generate_reply": Priority.INTERACTIVE,
+    "generate_user_friendly_dm": Priority.DEFAULT,
+    "grade_factual_consistency": Priority.BACKGROUND,
+}
+
 
 class DMAIService:
-    def __init__(self, vector_db_service: VectorDbService):
-        self.model = AzureChatOpenAI(
+    def __init__(self, vector_db_service: VectorDbService, scheduler: LLMScheduler,
+                 response_cache: LLMResponseCache, chat_model: Optional[BaseChatModel] = None,
+                 cassette: Optional[Cassette] = None, deadline_config: Optional[DeadlineConfig] = None,
+                 benefits: Optional[BenefitService] = None):
+        self.model = chat_model or AzureChatOpenAI(
             azure_deployment=AZURE_MODEL_NAME,
             api_version=OPENAI_API_VERSION,
             temperature=0,
@@ -46,6 +83,103 @@ class DMAIService:
         )
         self.graph = self._create_graph()
         self.vectordb_service = vector_db_service
+        self.scheduler = scheduler
+        self.response_cache = response_cache
+        self.cassette = cassette or Cassette()
+        self.deadline_config = deadline_config or DeadlineConfig()
+        self.benefits = benefits
+
+    async def _invoke(self, messages: list, node: str, bypass_cache: bool = False,
+                      deadline: Optional[Deadline] = None, reserve: float = 0.0,
+                      on_token: Optional[Callable[[str], Awaitable[None]]] = None):
+        """
+        Run a chat completion through the response cache and the shared scheduler,
+        bounded by `deadline` (queueing included) minus `reserve` seconds. With
+        `on_token`, the completion is streamed into it as it is generated.
+        """
+        streamed = []
+
+        async def emit(delta: str) -> None:
+            streamed.append(delta)
+            await on_token(delta)
+
+        call = self.response_cache.get_or_call(
+            node,
+            messages,
+            lambda: self.scheduler.run(
+                (lambda: self._timed(node, self._stream_model(messages, node, emit))) if on_token
+                else (lambda: self._timed(node, self._call_model(messages, node))),
+                estimated_tokens=estimate_tokens(messages),
+                priority=NODE_PRIORITIES.get(node, Priority.DEFAULT),
+            ),
+            bypass=bypass_cache,
+        )
+        response = await (call if deadline is None else deadline.run(call, reserve=reserve))
+        if on_token and not streamed:  # cache hit, coalesced call or cassette: hand it over whole
+            await on_token(response.content)
+        return response
+
+    @staticmethod
+    async def _timed(node: str, model_call: Awaitable):
+        """
+        Record how long a model call took, under `llm.{node}` (what _stage_budget learns from).
+        Only calls that complete: cache hits and calls cut off by the deadline would bias it low.
+        """
+        started = time.perf_counter()
+        response = await model_call
+        stage_metrics.record(f"llm.{node}", time.perf_counter() - started)
+        return response
+
+    # ------------------------ deadline budget ------------------------- #
+    def _stage_budget(self, node: str) -> float:
+        observed = stage_metrics.percentile(f"llm.{node}", 0.95, min_samples=self.deadline_config.min_samples)
+        return observed if observed is not None else self.deadline_config.stage_budget_seconds.get(node, 0.0)
+
+    def _skip_optional(self, state: DMModeratorAgentState, node: str, reserve: float = 0.0) -> bool:
+        """True (and counted) when an optional node no longer fits in the request's budget."""
+        deadline = state.get("deadline")
+        if deadline is None or deadline.allows(self._stage_budget(node) + reserve):
+            return False
+        logger.info(f"Skipping {node}: {deadline.remaining():.2f}s left")
+        stage_metrics.skip(f"graph.{node}", "budget")
+        return True
+
+    def _reply_reserve(self, state: DMModeratorAgentState) -> float:
+        """Time the nodes before generate_reply leave for it: never more than half the request budget."""
+        deadline = state.get("deadline")
+        return min(self.deadline_config.reply_reserve_seconds, deadline.budget / 2) if deadline else 0.0
+
+    @staticmethod
+    def _skipped(state: DMModeratorAgentState, node: str, reason: str) -> list[str]:
+        stage_metrics.skip(f"graph.{node}", reason)
+        return state.get("skipped_stages", []) + [node]
+
+    async def _call_model(self, messages: list, node: str):
+        if not self.cassette.enabled:
+            return await self.model.ainvoke(messages)
+        return await self.cassette.exchange(
+            "llm",
+            {"node": node, "messages": [[m.type, m.content] for m in messages]},
+            lambda: self.model.ainvoke(messages),
+            encode=lambda r: {"content": r.content, "usage": r.usage_metadata},
+            decode=lambda r: AIMessage(content=r["content"], usage_metadata=r.get("usage")),
+            tag=node,
+        )
+
+    async def _stream_model(self, messages: list, node: str, emit: Callable[[str], Awaitable[None]]):
+        if self.cassette.enabled:  # cassettes store whole completions
+            return await self._call_model(messages, node)
+        response = None
+        async for chunk in self.model.astream(messages):
+            response = chunk if response is None else response + chunk  # merges content and usage
+            if chunk.content:
+                await emit(chunk.content)
+        return AIMessage(content=response.content if response else "",
+                         usage_metadata=response.usage_metadata if response else None)
+
+    async def warm_up(self) -> None:
+        """One-token completion to open the connection pool to the Azure deployment."""
+        await self.model.ainvoke([SystemMessage(content="ping")], max_tokens=1)
 
     def _create_graph(self):
         builder = StateGraph(DMModeratorAgentState)
@@ -67,6 +201,7 @@ class DMAIService:
         return builder.compile()
 
 
+    @stage_metrics.timed("graph.validate_context")
     async def context_validation_node(self, state: DMModeratorAgentState):
         """
         Validate if the conversation query is clear and sufficient to respond appropriately.
@@ -74,7 +209,16 @@ class DMAIService:
         """
 
         logger.debug("Running context validation")
-        context = await self.vectordb_service.retrieve(query=state.get('conversation_history_query'))
+        deadline = state.get("deadline")
+        reserve = self._reply_reserve(state)
+        try:
+            retrieval = self.vectordb_service.retrieve(query=state.get('conversation_history_query'),
+                                                       plan=state.get('plan'), tenant=state.get('tenant'))
+            context = await (deadline.run(retrieval, reserve=reserve) if deadline else retrieval)
+        except asyncio.TimeoutError:
+            logger.warning("Retrieval cut off by the request deadline, replying without context")
+            return {"retrieved_context": self._with_benefits(state, NO_CONTEXT), "clarity_status": "unchecked",
+                    "skipped_stages": self._skipped(state, "validate_context", "timeout")}
         filtered_docs = [
             doc for doc, score in context if score >= 0.4
         ]
@@ -84,7 +228,13 @@ class DMAIService:
             # join or otherwise serialize the docs for downstream use
             context_text = "\n\n".join(d.page_content for d in filtered_docs)
         else:
-            context_text = "No context available"
+            context_text = NO_CONTEXT
+        context_text = self._with_benefits(state, context_text)
+
+        # the LLM check itself is optional: retrieval above is all generate_reply needs
+        if self._skip_optional(state, "validate_context", reserve=reserve):
+            return {"retrieved_context": context_text, "clarity_status": "unchecked",
+                    "skipped_stages": state.get("skipped_stages", []) + ["validate_context"]}
         prompt = DM_CONTEXT_VALIDATION_PROMPT.format(
             conversation_history_query=state.get('conversation_history_query'),
             conversation_history=json.dumps(state.get('conversation_history', []), indent=2),
@@ -92,7 +242,13 @@ class DMAIService:
         )
         messages = [SystemMessage(content=prompt)]
 
-        response = await self.model.ainvoke(messages)
+        try:
+            response = await self._invoke(messages, node="validate_context",
+                                          bypass_cache=state.get("bypass_cache", False),
+                                          deadline=deadline, reserve=reserve)
+        except DeadlineExceeded:
+            return {"retrieved_context": context_text, "clarity_status": "unchecked",
+                    "skipped_stages": self._skipped(state, "validate_context", "timeout")}
         json_response = response.content.strip()
         logger.debug(f"Raw response from context validation: {json_response}")
 
@@ -110,6 +266,7 @@ class DMAIService:
             logger.error(f"Failed to parse JSON output: {json_response}, Error: {e}")
             raise ValueError(f"Invalid JSON response from AI: {json_response}")
 
+    @stage_metrics.timed("graph.classify_conversation")
     async def conversation_classification_node(self, state: DMModeratorAgentState):
         """Classify the conversation type and assign priority."""
         logger.debug("conversation_classification_node")
@@ -119,7 +276,16 @@ class DMAIService:
             latest_message=state.get('latest_message')
         )
         messages = [SystemMessage(content=prompt)]
-        response = await self.model.ainvoke(messages)
+        try:
+            response = await self._invoke(messages, node="classify_conversation",
+                                          bypass_cache=state.get("bypass_cache", False),
+                                          deadline=state.get("deadline"),
+                                          reserve=self._reply_reserve(state))
+        except DeadlineExceeded:
+            # fall back to answering the latest message as-is
+            latest = state.get('latest_message') or ""
+            return {"category": "unclassified", "conversation_history_query": latest, "plan": detect_plan(latest),
+                    "skipped_stages": self._skipped(state, "classify_conversation", "timeout")}
         json_response = response.content.strip()
         logger.debug(f"Raw response from classifier: {json_response}")
 
@@ -129,13 +295,16 @@ class DMAIService:
             classification_json = json.loads(cleaned_response)
             category = classification_json.get("category")
             conversation_history_query = classification_json.get("conversation_history_query")
+            # the classifier's answer first, then a keyword match on the latest message
+            plan = normalize_plan(classification_json.get("plan")) or detect_plan(state.get('latest_message'))
 
-            return {"category": category, "conversation_history_query": conversation_history_query}
+            return {"category": category, "conversation_history_query": conversation_history_query, "plan": plan}
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON output: {json_response}, Error: {e}")
             raise ValueError(f"Invalid JSON classification output: {json_response}")
 
 
+    @stage_metrics.timed("graph.generate_reply")
     async def reply_generation_node(self, state: DMModeratorAgentState):
         """Generate a reply based on the DM type and context."""
         logger.debug("reply_generation_node")
@@ -146,7 +315,16 @@ class DMAIService:
             conversation_history_query=state.get('conversation_history_query'),
         )
         messages = [SystemMessage(content=prompt)]
-        response = await self.model.ainvoke(messages)
+        try:
+            response = await self._invoke(messages, node="generate_reply",
+                                          bypass_cache=state.get("bypass_cache", False),
+                                          deadline=state.get("deadline"),
+                                          reserve=self.deadline_config.margin_seconds,
+                                          on_token=state.get("on_token"))
+        except DeadlineExceeded:
+            logger.warning("generate_reply cut off by the request deadline, sending a best-effort reply")
+            return {"suggested_message_reply": self._best_effort_reply(state),
+                    "skipped_stages": self._skipped(state, "generate_reply", "timeout")}
         suggested_message_reply = response.content.strip()
         logger.debug(f"Generated Reply: {suggested_message_reply}")
 
@@ -154,25 +332,39 @@ class DMAIService:
             "suggested_message_reply": suggested_message_reply,
         }
 
+    @stage_metrics.timed("graph.generate_user_friendly_dm")
     async def generate_user_friendly_dm(self, state: DMModeratorAgentState):
         logger.debug("generate_user_friendly_dm")
+        if "generate_reply" in state.get("skipped_stages", []) or \
+                self._skip_optional(state, "generate_user_friendly_dm", reserve=self.deadline_config.margin_seconds):
+            return {"skipped_stages": state.get("skipped_stages", []) + ["generate_user_friendly_dm"]}
         prompt = GENERATE_READABLE_DM_FORMAT.format(
             suggested_message_reply=state.get('suggested_message_reply'),
             username=state.get('username')
         )
         messages = [SystemMessage(content=prompt)]
-        response = await self.model.ainvoke(messages)
+        try:
+            response = await self._invoke(messages, node="generate_user_friendly_dm",
+                                          bypass_cache=state.get("bypass_cache", False),
+                                          deadline=state.get("deadline"),
+                                          reserve=self.deadline_config.margin_seconds)
+        except DeadlineExceeded:
+            return {"skipped_stages": self._skipped(state, "generate_user_friendly_dm", "timeout")}
         response_text = response.content.strip()
 
         return {
             'formatted_suggested_dm': response_text
         }
 
+    @stage_metrics.timed("graph.grade_factual_consistency")
     async def grade_factual_consistency_node(self, state: DMModeratorAgentState):
         """
         Grade the factual consistency of the generated reply.
         Uses the DM_FACTUAL_CONSISTENCY_PROMPT to validate the response.
         """
+        if "generate_reply" in state.get("skipped_stages", []) or \
+                self._skip_optional(state, "grade_factual_consistency", reserve=self.deadline_config.margin_seconds):
+            return {"skipped_stages": state.get("skipped_stages", []) + ["grade_factual_consistency"]}
         # Prepare the prompt
         prompt = DM_FACTUAL_CONSISTENCY_PROMPT.format(
             suggested_message_reply=state['suggested_message_reply'],
@@ -182,7 +374,13 @@ class DMAIService:
 
         messages = [SystemMessage(content=prompt)]
         # Invoke the AI model
-        response = await self.model.ainvoke(messages)
+        try:
+            response = await self._invoke(messages, node="grade_factual_consistency",
+                                          bypass_cache=state.get("bypass_cache", False),
+                                          deadline=state.get("deadline"),
+                                          reserve=self.deadline_config.margin_seconds)
+        except DeadlineExceeded:
+            return {"skipped_stages": self._skipped(state, "grade_factual_consistency", "timeout")}
         factual_consistency_response = response.content.strip()
         logger.debug(f"Factual Consistency Grading Response: {factual_consistency_response}")
 
@@ -212,35 +410,75 @@ class DMAIService:
             raise ValueError(f"Invalid JSON response: {factual_consistency_response}")
 
 
-    async def analyse_dm_with_ai(self, message_context: MessageRecommendationContext) -> MessageAnalysis:
-        """Analyze a DM with AI to classify and suggest a reply."""
-        state = {
-            "username": message_context.user.user_name,
-            "conversation_history": message_context.enriched_messages,
-        }
-
+    def draw_graph(self, path: str = "diagram.png") -> None:
+        """Render the workflow graph (uses the mermaid.ink web API, dev only)."""
         try:
-            app = self.graph
-            image_data = app.get_graph().draw_mermaid_png()
-            with open("diagram.png", "wb") as f:
+            image_data = self.graph.get_graph().draw_mermaid_png()
+            with open(path, "wb") as f:
                 f.write(image_data)
-
-            import os
-            os.system("diagram.png")  # For Windows
-
         except Exception as e:
             logger.error(f"An error occurred: {e}")
 
-        # Run the State Graph
-        result = await self.graph.ainvoke(state)
+    def _with_benefits(self, state: DMModeratorAgentState, context_text: str) -> str:
+        """Exact benefits-table rows for the query, ahead of the retrieved context."""
+        rows = self.benefits.context(state.get('conversation_history_query'), state.get('plan'),
+                                     tenant=state.get('tenant')) if self.benefits else None
+        if not rows:
+            return context_text
+        return rows if context_text == NO_CONTEXT else f"{rows}\n\n{context_text}"
+
+    @staticmethod
+    def _best_effort_reply(state: DMModeratorAgentState) -> str:
+        context = state.get("retrieved_context")
+        if context and context != NO_CONTEXT:
+            return BEST_EFFORT_CONTEXT_REPLY.format(context=context.split("\n\n", 1)[0][:600])
+        return BEST_EFFORT_REPLY
+
+    async def analyse_dm_with_ai(self, message_context: MessageRecommendationContext,
+                                 bypass_cache: bool = False, deadline: Optional[Deadline] = None,
+                                 on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> MessageAnalysis:
+        """
+        Analyze a DM with AI to classify and suggest a reply. With a `deadline`, optional
+        nodes are skipped when the budget runs low and a best-effort reply is returned
+        if generate_reply cannot finish in time. With `on_token`, the reply text is
+        streamed into it while generate_reply runs.
+        """
+        # history is newest first; the latest user message is what the plan is detected from
+        latest_message = next((m.get("text") for m in message_context.enriched_messages
+                               if m.get("sender") == "user"), None)
+        state = {
+            "username": message_context.user.user_name,
+            "tenant": message_context.user.tenant,
+            "conversation_history": message_context.enriched_messages,
+            "latest_message": latest_message,
+            "bypass_cache": bypass_cache,
+            "deadline": deadline,
+            "skipped_stages": [],
+            "on_token": on_token,
+        }
+
+        # Run the State Graph (logged as the replayable input when recording)
+        with deadline.installed() if deadline else nullcontext():  # embedding / Pinecone calls see it too
+            result = await self.cassette.observe(
+                "analysis",
+                {"user_name": message_context.user.user_name,
+                 "conversation_history": message_context.enriched_messages},
+                lambda: self.graph.ainvoke(state),
+                encode=lambda r: {k: r.get(k) for k in ("category", "suggested_message_reply",
+                                                        "conversation_history_query", "clarity_status")},
+            )
         logger.debug(f"Message Type is : {result.get('message_type')}")
+        if result.get("skipped_stages"):
+            logger.info(f"Stages skipped to meet the deadline: {result['skipped_stages']}")
 
 
         return MessageAnalysis(
             message_category=result.get('category'),
             suggested_message_reply=result.get('suggested_message_reply'),
             conversation_summary=result.get('conversation_history_query'),
-            factual_consistency=result.get('clarity_status')
+            factual_consistency=result.get('clarity_status'),
+            plan=result.get('plan'),
+            skipped_stages=result.get('skipped_stages') or [],
         )
 
 
@@ -252,7 +490,10 @@ if __name__ == '__main__':
     )
     pinecone_db = PineconeDB(config=pinecone_config)
     vector_db_service = VectorDbService(vector_db=pinecone_db)
-    dmai_service = DMAIService(vector_db_service=vector_db_service)
+    dmai_service = DMAIService(vector_db_service=vector_db_service,
+                               scheduler=LLMScheduler(LLMSchedulerConfig()),
+                               response_cache=LLMResponseCache(LLMCacheConfig(), AZURE_MODEL_NAME,
+                                                               OPENAI_API_VERSION))
 
     message_context: MessageRecommendationContext = MessageRecommendationContext(
         enriched_messages=[{"text": "hello there"}],
@@ -263,4 +504,5 @@ if __name__ == '__main__':
         )
     )
 
+    dmai_service.draw_graph()
     asyncio.run(dmai_service.analyse_dm_with_ai(message_context=message_context))
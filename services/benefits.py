@@ -0,0 +1,260 @@
+"""
+Structured benefits table: the cost-sharing entries of the Summary of Benefits
+documents (deductible, out-of-pocket limit, copay / coinsurance per service),
+keyed by plan × benefit × network tier.
+
+Ingestion parses the tables (services.ingestion.benefits) and writes them
+column-wise to one JSON file; the API holds the columns in memory with a
+(plan, benefit) index and reloads them when the file changes. Benefits are the
+standard SBC rows below, recognised by the same patterns in the documents and
+in user questions, so "what's the specialist copay on Gold?" finds the
+"Specialist visit" row of the Gold 2500 document without any retrieval.
+
+Two uses (BenefitService): the exact rows are put in front of the retrieved
+context for generate_reply, and a short question about one benefit of one plan
+is answered from the table directly. Each tenant has its own table file
+(services.tenants), loaded on first use.
+"""
+import logging
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from models.ai_processing_models import BenefitsConfig, MessageAnalysis
+from models.vectordb_models import BenefitRow
+from services.plans import PLANS, detect_plan, plan_name
+from services.stage_metrics import stage_metrics
+from services.tenants import TenantRouter
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("plan", "benefit", "tier", "label", "value", "limitations", "source", "page")
+ALL_TIERS = "all"  # documents with a single cost column
+BENEFITS_CATEGORY = "benefits"
+
+# canonical benefit -> pattern over "<medical event> | <service>" (documents) or a question;
+# order matters: the first (most specific) pattern claims a span of the text
+BENEFITS: List[Tuple[str, re.Pattern]] = [(key, re.compile(pattern, re.IGNORECASE)) for key, pattern in [
+    ("specialist_referral", r"\breferral"),
+    ("specialist_visit", r"\bspecialist"),
+    ("primary_care_visit", r"primary care|\bpcp\b|doctor'?s? (office )?visit"),
+    ("preventive_care", r"preventive|screening|immuni[sz]ation"),
+    ("diagnostic_test", r"diagnostic test|blood ?work|\blab(oratory)?s?\b|lab tests?"),
+    ("imaging", r"imaging|x-?rays?|\bct\b|\bpet\b|\bmris?\b"),
+    ("generic_drugs", r"\bgeneric"),
+    ("non_preferred_brand_drugs", r"non-?preferred brand"),
+    ("preferred_brand_drugs", r"preferred brand|brand[- ]name drugs?"),
+    ("specialty_drugs", r"specialty drugs?"),
+    ("outpatient_surgery_physician", r"outpatient surgery.*(physician|surgeon)"),
+    ("outpatient_surgery_facility", r"outpatient surgery|ambulatory surgery"),
+    ("emergency_room", r"emergency room|\ber\b"),
+    ("emergency_transportation", r"emergency (medical )?transportation|ambulance"),
+    ("urgent_care", r"urgent care"),
+    ("hospital_stay_physician", r"hospital stay.*(physician|surgeon)"),
+    ("hospital_stay_facility", r"hospital stay|hospital room|inpatient hospital|hospitali[sz]ation"),
+    ("mental_health_inpatient", r"(mental|behavioral) health.*inpatient|inpatient (mental|behavioral)"),
+    ("mental_health_outpatient", r"mental health|behavioral health|substance (ab)?use|counsel+ing"),
+    ("pregnancy_office_visits", r"pregnan.*office visits?|prenatal|postnatal"),
+    ("childbirth_professional", r"(childbirth|delivery) professional"),
+    ("childbirth_facility", r"childbirth|delivery|maternity"),
+    ("home_health_care", r"home health"),
+    ("rehabilitation_services", r"\brehabilitation|physical therapy|\brehab\b"),
+    ("habilitation_services", r"\bhabilitation"),
+    ("skilled_nursing_care", r"skilled nursing|nursing facility"),
+    ("durable_medical_equipment", r"durable medical equipment|\bdme\b|wheelchair|crutches"),
+    ("hospice_services", r"hospice"),
+    ("children_eye_exam", r"eye exam|vision exam"),
+    ("children_glasses", r"glasses|eyewear"),
+    ("children_dental_checkup", r"dental"),
+    ("services_before_deductible", r"before (you meet )?(your |the )?deductible"),
+    ("other_deductibles", r"other deductibles|deductibles? for specific services"),
+    ("out_of_pocket_exclusions", r"not included in the out-of-pocket"),
+    ("out_of_pocket_limit", r"out[- ]of[- ]pocket (limit|max(imum)?)|\bmoop\b|\boop\b|out[- ]of[- ]pocket"),
+    ("overall_deductible", r"deductible"),
+    ("network_provider", r"network provider|network restrictions?"),
+]]
+
+_OUT_OF_NETWORK = re.compile(r"out[- ]of[- ]network|non[- ]network|non[- ]participating", re.IGNORECASE)
+_IN_NETWORK = re.compile(r"\bin[- ]network|participating provider|network provider", re.IGNORECASE)
+# direct answers are for value lookups only ("what's the X on plan Y", "how much is X for Y",
+# "Y X cost?"): once the question form, plan, tier and benefit are taken out, only filler may be left
+_LOOKUP_FORM = re.compile(r"^\s*(what\s+is|what's|whats|what\s+are|what\s+do\s+i\s+pay\s+for|"
+                          r"how\s+much\s+(is|are|does|do\s+i\s+pay\s+for|will\s+i\s+pay\s+for))\b", re.IGNORECASE)
+_PLAN_NAMES = [re.compile(p, re.IGNORECASE) for _, patterns in PLANS.values() for p in patterns] + \
+    [re.compile(r"\b\d[\d,]*\b")]
+_FILLER = {"the", "a", "an", "my", "our", "for", "on", "in", "under", "with", "of", "at", "plan", "plans",
+           "cost", "costs", "copay", "copays", "coinsurance", "price", "amount", "limit", "visit", "visits",
+           "provider", "providers", "please", "drug", "drugs", "medication", "medications", "prescription",
+           "prescriptions", "test", "tests", "service", "services", "care"}
+
+
+def is_lookup(text: str) -> bool:
+    """True for a question that only asks the value of benefits of a plan."""
+    rest = _LOOKUP_FORM.sub(" ", text)
+    for pattern in [_OUT_OF_NETWORK, _IN_NETWORK, *_PLAN_NAMES, *(p for _, p in BENEFITS)]:
+        rest = pattern.sub(" ", rest)
+    return all(word in _FILLER for word in re.findall(r"[a-z']+", rest.lower()))
+
+
+def find_benefits(text: str) -> List[str]:
+    """Canonical benefits named in `text`, most specific first; each span of text counts once."""
+    found, claimed = [], []
+    for key, pattern in BENEFITS:
+        for m in pattern.finditer(text):
+            if not any(m.start() < end and start < m.end() for start, end in claimed):
+                claimed.append(m.span())
+                if key not in found:
+                    found.append(key)
+    return found
+
+
+def benefit_key(text: str) -> Optional[str]:
+    found = find_benefits(text)
+    return found[0] if found else None
+
+
+def detect_tier(text: str) -> Optional[str]:
+    if _OUT_OF_NETWORK.search(text):
+        return "out_of_network"
+    if _IN_NETWORK.search(text):
+        return "in_network"
+    return None
+
+
+def format_rows(rows: List[Dict]) -> str:
+    """Rows as compact lines for a prompt or a reply."""
+    lines = []
+    for row in rows:
+        tier = "" if row["tier"] == ALL_TIERS else f" ({row['tier'].replace('_', '-')})"
+        line = f"{plan_name(row['plan']) or row['plan']} – {row['label'].rstrip('?')}{tier}: {row['value']}"
+        if row["limitations"] and row["limitations"].lower() not in ("none", "n/a"):
+            line += f". {row['limitations']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class BenefitTable:
+    """Columnar in-memory table with a (plan, benefit) index, backed by one JSON file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        self._columns: Dict[str, list] = {c: [] for c in COLUMNS}
+        self._index: Dict[Tuple[str, str], List[int]] = {}
+        self._stamp = None
+
+    @staticmethod
+    def write(path: str, rows: List[BenefitRow]) -> None:
+        """Replace the table at `path` (atomically, so readers never see half a file)."""
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        columns = {c: [getattr(r, c) for r in rows] for c in COLUMNS}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps({"version": 1, "columns": columns}))
+        os.replace(tmp, path)
+
+    def refresh(self) -> None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+        columns = orjson.loads(self.path.read_bytes())["columns"]
+        index = defaultdict(list)
+        for i, key in enumerate(zip(columns["plan"], columns["benefit"])):
+            index[key].append(i)
+        self._columns, self._index, self._stamp = columns, dict(index), stamp
+        logger.info(f"Benefits table loaded: {len(self)} rows, {len(self.plans())} plans")
+
+    def __len__(self) -> int:
+        return len(self._columns["plan"])
+
+    def plans(self) -> List[str]:
+        return sorted(set(self._columns["plan"]))
+
+    def _row(self, i: int) -> Dict:
+        return {c: self._columns[c][i] for c in COLUMNS}
+
+    def lookup(self, plan: str, benefit: str, tier: Optional[str] = None) -> List[Dict]:
+        """Rows of one plan and benefit; with `tier`, that tier's plus any single-column (`all`) row."""
+        self.refresh()
+        rows = [self._row(i) for i in self._index.get((plan, benefit), ())]
+        return [r for r in rows if tier is None or r["tier"] in (tier, ALL_TIERS)]
+
+    def match(self, text: str, plan: Optional[str] = None) -> List[Dict]:
+        """Rows for every benefit named in `text`, for `plan` (or the one plan the text names)."""
+        plan = plan or detect_plan(text)
+        if not plan or not text:
+            return []
+        tier = detect_tier(text)
+        return [row for benefit in find_benefits(text) for row in self.lookup(plan, benefit, tier)]
+
+
+class BenefitService:
+    def __init__(self, config: BenefitsConfig, table: BenefitTable, tenants: Optional[TenantRouter] = None):
+        self.config = config
+        self.table = table  # the default tenant's
+        self.tenants = tenants or TenantRouter()
+        self._tables: Dict[str, BenefitTable] = {}
+
+        # metrics
+        self._counts: dict[str, int] = defaultdict(int)
+
+    def table_for(self, tenant: Optional[str] = None) -> BenefitTable:
+        path = self.tenants.path(str(self.table.path), tenant)
+        if path == str(self.table.path):
+            return self.table
+        if path not in self._tables:
+            self._tables[path] = BenefitTable(path)
+        return self._tables[path]
+
+    def context(self, query: Optional[str], plan: Optional[str] = None,
+                tenant: Optional[str] = None) -> Optional[str]:
+        """Exact table rows for the benefits `query` is about, to put in front of the retrieved context."""
+        if not self.config.enabled or not query:
+            return None
+        rows = self.table_for(tenant).match(query, plan)
+        if not rows:
+            return None
+        self._counts["injected"] += 1
+        return f"Benefits table (exact figures from the plan documents):\n{format_rows(rows)}"
+
+    async def answer(self, history: List[Dict], tenant: Optional[str] = None) -> Optional[MessageAnalysis]:
+        """Answer a short question about one benefit of one plan straight from the table, or None."""
+        if not (self.config.enabled and self.config.direct_answers):
+            return None
+        text = next((m.get("text") for m in history if m.get("sender") == "user"), None)
+        if not text or len(text) > self.config.max_question_chars or not is_lookup(text):
+            return None
+        self._counts["lookups"] += 1
+        with stage_metrics.timer("benefits.lookup"):
+            plan, benefits = detect_plan(text), find_benefits(text)
+            rows = (self.table_for(tenant).lookup(plan, benefits[0], detect_tier(text))
+                    if plan and len(benefits) == 1 else [])
+        if not rows:
+            return None
+        self._counts["answered"] += 1
+        return MessageAnalysis(message_category=BENEFITS_CATEGORY,
+                               suggested_message_reply=format_rows(rows),
+                               conversation_summary=text,
+                               factual_consistency="table",
+                               plan=plan)
+
+    def stats(self) -> dict:
+        lookups = self._counts["lookups"]
+        self.table.refresh()
+        return {
+            "enabled": self.config.enabled,
+            "rows": len(self.table),
+            "plans": self.table.plans(),
+            "tenant_tables": len(self._tables),
+            "lookups": lookups,
+            "answered": self._counts["answered"],
+            "answer_rate": round(self._counts["answered"] / lookups, 4) if lookups else 0.0,
+            "injected": self._counts["injected"],
+        }
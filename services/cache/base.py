@@ -0,0 +1,164 @@
+"""
+Cache backends shared by the services: user records (UserService, MessageService),
+query embeddings (VectorDB) and LLM responses (LLMResponseCache, used by DMAIService).
+
+A backend stores bytes under "<namespace>:<key>" with a TTL; CacheBackend turns
+values into compact bytes (orjson, zlib above `compress_min_bytes`, raw bytes
+as they are) and keeps hit / miss / size counters per namespace. Three backends:
+
+• memory: an LRU dict in the process; every worker has its own;
+• shm: a memory-mapped file of fixed-size slots, shared by the workers on one host;
+• resp: any server speaking the Redis protocol, shared by every host.
+
+A cache must never fail a request: backend errors are counted and read as misses.
+"""
+import logging
+import time
+import zlib
+from abc import abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Optional
+
+import orjson
+
+from models.ai_processing_models import CacheConfig
+
+logger = logging.getLogger(__name__)
+
+# first byte of every stored value
+_JSON, _JSON_ZLIB, _RAW, _RAW_ZLIB = b"j", b"J", b"r", b"R"
+
+
+def encode(value: Any, compress_min_bytes: int) -> bytes:
+    raw = isinstance(value, (bytes, bytearray))
+    body = bytes(value) if raw else orjson.dumps(value)
+    if len(body) >= compress_min_bytes:
+        packed = zlib.compress(body, 1)
+        if len(packed) < len(body):
+            return (_RAW_ZLIB if raw else _JSON_ZLIB) + packed
+    return (_RAW if raw else _JSON) + body
+
+
+def decode(data: bytes) -> Any:
+    tag, body = data[:1], data[1:]
+    if tag in (_JSON_ZLIB, _RAW_ZLIB):
+        body = zlib.decompress(body)
+    return orjson.loads(body) if tag in (_JSON, _JSON_ZLIB) else body
+
+
+class CacheBackend:
+    name = "memory"
+    shared = False  # True when other workers see the same entries
+
+    def __init__(self, config: CacheConfig):
+        self.config = config
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "sets": 0, "errors": 0, "bytes": 0})
+
+    # ------------------------ storage (per backend) -------------------- #
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        pass
+
+    def _entries(self) -> Optional[int]:
+        return None
+
+    # ------------------------ public API ------------------------------- #
+    def ttl(self, namespace: str) -> int:
+        return self.config.namespace_ttl_seconds.get(namespace, self.config.default_ttl_seconds)
+
+    def get(self, namespace: str, key: str) -> Any:
+        """The cached value, or None on a miss (or a backend error)."""
+        stats = self._stats[namespace]
+        try:
+            data = self._get(f"{namespace}:{key}")
+            value = decode(data) if data is not None else None
+        except Exception as exc:
+            stats["errors"] += 1
+            logger.debug(f"Cache get failed ({self.name}/{namespace}): {exc!r}")
+            value = None
+        stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl(namespace) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        data = encode(value, self.config.compress_min_bytes)
+        stats = self._stats[namespace]
+        try:
+            self._set(f"{namespace}:{key}", data, ttl)
+        except Exception as exc:
+            stats["errors"] += 1
+            logger.debug(f"Cache set failed ({self.name}/{namespace}): {exc!r}")
+            return
+        stats["sets"] += 1
+        stats["bytes"] += len(data)
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self._delete(f"{namespace}:{key}")
+        except Exception as exc:
+            self._stats[namespace]["errors"] += 1
+            logger.debug(f"Cache delete failed ({self.name}/{namespace}): {exc!r}")
+
+    def get_or_load(self, namespace: str, key: str, load: Callable[[], Any]) -> Any:
+        """Cached value, or `load()` (cached unless None)."""
+        value = self.get(namespace, key)
+        if value is None:
+            value = load()
+            if value is not None:
+                self.set(namespace, key, value)
+        return value
+
+    def stats(self) -> dict:
+        namespaces = {}
+        for namespace, s in self._stats.items():
+            lookups = s["hits"] + s["misses"]
+            namespaces[namespace] = {
+                **s,
+                "hit_rate": round(s["hits"] / lookups, 4) if lookups else 0.0,
+                "avg_value_bytes": round(s["bytes"] / s["sets"]) if s["sets"] else 0,
+            }
+        return {"backend": self.name, "shared": self.shared, "entries": self._entries(), "namespaces": namespaces}
+
+    def close(self) -> None:
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU dict bounded by `max_entries`; private to the process."""
+
+    def __init__(self, config: CacheConfig):
+        super().__init__(config)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (value, time.time() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.config.max_entries:
+            self._data.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def _entries(self) -> Optional[int]:
+        return len(self._data)
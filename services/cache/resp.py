@@ -0,0 +1,136 @@
+"""
+Cache backend for any server speaking the Redis protocol (RESP2): Redis,
+Valkey, KeyDB, or benchmarks.redis_stub offline. Only GET, SET ... PX and DEL
+are used, over one blocking connection per process with a short timeout: a
+cache round trip on the local network is well under a millisecond, and a
+slow or unreachable server is a miss rather than a stalled request. After an
+error the server is skipped for `resp_retry_seconds` before reconnecting.
+"""
+import logging
+import socket
+import threading
+import time
+from typing import List, Optional, Union
+from urllib.parse import urlparse
+
+from models.ai_processing_models import CacheConfig
+from services.cache.base import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RespError(Exception):
+    """Error reply from the server."""
+
+
+class RespClient:
+    def __init__(self, url: str, timeout: float):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", str(self.db))
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    def _read(self) -> Union[bytes, int, List, None]:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed by the server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RespError(rest.decode(errors="replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read() for _ in range(count)]
+        raise ConnectionError(f"unexpected reply {line[:20]!r}")
+
+    def _call(self, *args):
+        self._sock.sendall(self._encode(args))
+        return self._read()
+
+    def call(self, *args):
+        """Send one command and return its reply; the connection is dropped on any transport error."""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._call(*args)
+            except RespError:
+                raise
+            except Exception:
+                self.close()
+                raise
+
+
+class RespCacheBackend(CacheBackend):
+    name = "resp"
+    shared = True
+
+    def __init__(self, config: CacheConfig):
+        super().__init__(config)
+        self.client = RespClient(config.resp_url, config.resp_timeout_seconds)
+        self._down_until = 0.0
+
+    def _key(self, key: str) -> str:
+        return f"{self.config.key_prefix}:{key}"
+
+    def _call(self, *args):
+        if time.monotonic() < self._down_until:
+            raise ConnectionError("cache server marked down")
+        try:
+            return self.client.call(*args)
+        except (OSError, ConnectionError) as exc:
+            self._down_until = time.monotonic() + self.config.resp_retry_seconds
+            logger.warning(f"Cache server {self.client.host}:{self.client.port} unavailable, "
+                           f"skipping it for {self.config.resp_retry_seconds}s: {exc!r}")
+            raise
+
+    def _get(self, key: str) -> Optional[bytes]:
+        return self._call("GET", self._key(key))
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        self._call("SET", self._key(key), value, "PX", max(1, int(ttl * 1000)))
+
+    def _delete(self, key: str) -> None:
+        self._call("DEL", self._key(key))
+
+    def close(self) -> None:
+        self.client.close()
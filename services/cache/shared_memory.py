@@ -0,0 +1,134 @@
+"""
+Cache backend over a memory-mapped file (put it on /dev/shm), shared by every
+worker process on the host.
+
+The file is a fixed table of `shm_slots` slots of `shm_slot_bytes` each,
+4-way set associative: a key hashes to a set of 4 slots and takes an empty or
+expired one, else the one closest to expiry. Slot layout:
+
+    seq u32 | key hash u64 | expires_at f64 | length u32 | value
+
+Writers (any process) serialise on an flock of the file and bump `seq` before
+and after writing (odd = being written); readers take no lock and retry as a
+miss when `seq` moved underneath them. Values larger than a slot are not cached.
+The layout is part of the file name, so workers started with other sizes (a
+rolling deploy) use their own file instead of resizing one that is mapped.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from models.ai_processing_models import CacheConfig
+from services.cache.base import CacheBackend
+
+_MAGIC = b"RBC1"
+_FILE_HEADER = struct.Struct("<4sII")      # magic, slots, slot bytes
+_HEADER_BYTES = 64
+_SLOT = struct.Struct("<IQdI")             # seq, key hash, expires_at, length
+WAYS = 4
+
+
+def _key_hash(key: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedMemoryCacheBackend(CacheBackend):
+    name = "shm"
+    shared = True
+
+    def __init__(self, config: CacheConfig):
+        super().__init__(config)
+        self.slots = max(WAYS, config.shm_slots - config.shm_slots % WAYS)
+        self.slot_bytes = config.shm_slot_bytes
+        self.path = Path(f"{config.shm_path}-{self.slots}x{self.slot_bytes}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = _HEADER_BYTES + self.slots * self.slot_bytes
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock = threading.Lock()  # flock does not exclude threads sharing the descriptor
+        with self._locked():
+            if os.fstat(self._fd).st_size != size or os.pread(self._fd, 4, 0) != _MAGIC:
+                # first worker: sparse file, so only slots in use take memory
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _FILE_HEADER.pack(_MAGIC, self.slots, self.slot_bytes), 0)
+        self._map = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER_BYTES + slot * self.slot_bytes
+
+    def _set_of(self, key_hash: int) -> range:
+        first = (key_hash % (self.slots // WAYS)) * WAYS
+        return range(first, first + WAYS)
+
+    # ------------------------ storage ---------------------------------- #
+    def _get(self, key: str) -> Optional[bytes]:
+        key_hash = _key_hash(key)
+        for slot in self._set_of(key_hash):
+            offset = self._offset(slot)
+            seq, slot_hash, expires_at, length = _SLOT.unpack_from(self._map, offset)
+            if slot_hash != key_hash:
+                continue
+            if seq % 2 or expires_at < time.time():
+                return None
+            start = offset + _SLOT.size
+            value = self._map[start:start + length]
+            if _SLOT.unpack_from(self._map, offset)[0] != seq:  # rewritten while copying
+                return None
+            return value
+        return None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        if _SLOT.size + len(value) > self.slot_bytes:
+            raise ValueError(f"{len(value)} bytes do not fit a {self.slot_bytes}-byte slot")
+        key_hash = _key_hash(key)
+        now = time.time()
+
+        def rank(entry: tuple) -> tuple:  # same key, else empty / expired, else the one expiring first
+            _, _, slot_hash, expires_at, _ = entry
+            if slot_hash == key_hash:
+                return 0, 0.0
+            if slot_hash == 0 or expires_at < now:
+                return 1, 0.0
+            return 2, expires_at
+
+        with self._locked():
+            slot, seq, *_ = min(((slot, *_SLOT.unpack_from(self._map, self._offset(slot)))
+                                 for slot in self._set_of(key_hash)), key=rank)
+            offset = self._offset(slot)
+            struct.pack_into("<I", self._map, offset, (seq + 1) & 0xFFFFFFFF)
+            self._map[offset + _SLOT.size:offset + _SLOT.size + len(value)] = value
+            _SLOT.pack_into(self._map, offset, (seq + 2) & 0xFFFFFFFF, key_hash, now + ttl, len(value))
+
+    def _delete(self, key: str) -> None:
+        key_hash = _key_hash(key)
+        with self._locked():
+            for slot in self._set_of(key_hash):
+                offset = self._offset(slot)
+                seq, slot_hash, _, _ = _SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    _SLOT.pack_into(self._map, offset, (seq + 2) & 0xFFFFFFFF, 0, 0.0, 0)
+
+    def _entries(self) -> Optional[int]:
+        now = time.time()
+        return sum(1 for slot in range(self.slots)
+                   if (entry := _SLOT.unpack_from(self._map, self._offset(slot)))[1] and entry[2] >= now)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+# (pattern, replacement) pairs applied to every string stored in a cassette
+REDACTIONS = [
+    (re.compile(r"pcsk_[A-Za-z0-9_]+"), "[REDACTED_PINECONE_KEY]"),
+    (re.compile(r"\bsk-[A-Za-z0-9_-]{16,}"), "[REDACTED_OPENAI_KEY]"),
+    (re.compile(r"\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+"), "[REDACTED_JWT]"),
+    (re.compile(r"(?i)\bbearer\s+[A-Za-z0-9._~+/-]+=*"), "Bearer [REDACTED]"),
+    (re.compile(r"\b[0-9a-f]{32}\b"), "[REDACTED_KEY]"),
+    (re.compile(r"\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}"), "[REDACTED_HASH]"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[REDACTED_EMAIL]"),
+]
+SECRET_FIELDS = {"password", "api_key", "api-key", "authorization", "token", "access_token"}
+
+
+class CassetteMiss(LookupError):
+    """Replay mode found no recorded exchange for a request."""
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, str):
+        for pattern, replacement in REDACTIONS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        return {
+            k: "[REDACTED]" if str(k).lower() in SECRET_FIELDS else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def pack_vector(values: list) -> str:
+    """float32 little-endian + base64: ~4x smaller than JSON floats."""
+    return base64.b64encode(struct.pack(f"<{len(values)}f", *values)).decode("ascii")
+
+
+def unpack_vector(packed: str) -> list:
+    raw = base64.b64decode(packed)
+    return list(struct.unpack(f"<{len(raw) // 4}f", raw))
+
+
+class Cassette:
+    """
+    Records or replays exchanges with external services (LLM, embeddings, Pinecone).
+
+    • record: every exchange is redacted and appended as one JSON line to a gzip file,
+      together with its wall-clock latency. Each process writes its own file next to
+      `path` ({name}.{pid}.jsonl.gz), off the event loop; reading merges them all.
+    • replay: exchanges are served from the file, sleeping the recorded latency
+      (scaled by `latency_scale`). Requests are matched on the hash of their redacted
+      form; when nothing matches exactly the next unused exchange with the same
+      kind/tag is served instead, so modified pipelines can still be driven.
+    • off: pass-through.
+    """
+
+    def __init__(self, mode: str = "off", path: Optional[str] = None, latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {MODES}")
+        if mode != "off" and not path:
+            raise ValueError("A cassette path is required to record or replay")
+        self.mode = mode
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exact: dict[str, deque] = defaultdict(deque)
+        self._by_tag: dict[str, deque] = defaultdict(deque)
+        self._served: set[int] = set()
+        self._last: dict[str, dict] = {}
+        self.stats = {"recorded": 0, "exact_hits": 0, "fallback_hits": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    # ------------------------ public API ------------------------------- #
+    async def exchange(
+        self,
+        kind: str,
+        request: dict,
+        call: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda r: r,
+        decode: Callable[[Any], Any] = lambda r: r,
+        tag: str = "",
+    ) -> Any:
+        if self.mode == "off":
+            return await call()
+
+        request = redact(request)
+        key = self._key(kind, request)
+        tag = f"{kind}:{tag}"
+
+        if self.mode == "replay":
+            entry = self._next(key, tag)
+            if self.latency_scale:
+                await asyncio.sleep(entry["latency_ms"] / 1000 * self.latency_scale)
+            return decode(entry["response"])
+
+        started = time.perf_counter()
+        response = await call()
+        latency_ms = (time.perf_counter() - started) * 1000
+        await self._append({
+            "kind": kind,
+            "tag": tag,
+            "key": key,
+            "request": request,
+            "response": redact(encode(response)),
+            "latency_ms": round(latency_ms, 2),
+        })
+        return response
+
+    async def observe(
+        self,
+        kind: str,
+        request: dict,
+        call: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda r: r,
+    ) -> Any:
+        """
+        Log an exchange in record mode but always execute `call`. Used for the
+        inputs of a pipeline run, which replay drives rather than serves.
+        """
+        if self.mode != "record":
+            return await call()
+        started = time.perf_counter()
+        response = await call()
+        request = redact(request)
+        await self._append({
+            "kind": kind,
+            "tag": f"{kind}:",
+            "key": self._key(kind, request),
+            "request": request,
+            "response": redact(encode(response)),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+        return response
+
+    def entries(self, kind: Optional[str] = None) -> list[dict]:
+        """All recorded exchanges (optionally of one kind), in recording order."""
+        return [e for e in self._read() if kind is None or e["kind"] == kind]
+
+    # ------------------------ internals -------------------------------- #
+    @staticmethod
+    def _key(kind: str, request: dict) -> str:
+        canonical = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _base(self) -> str:
+        return self.path[:-len(".jsonl.gz")] if self.path.endswith(".jsonl.gz") else self.path
+
+    def _process_path(self) -> str:
+        """This process's file: appends from several workers to one gzip file would interleave."""
+        return f"{self._base()}.{os.getpid()}.jsonl.gz"
+
+    def _paths(self) -> List[Path]:
+        """`path` itself (older single-file cassettes) and every per-process file next to it."""
+        base = Path(self._base())
+        part = re.compile(re.escape(base.name) + r"\.\d+\.jsonl\.gz$")
+        parts = sorted(p for p in base.parent.glob(f"{base.name}.*.jsonl.gz") if part.match(p.name))
+        return ([Path(self.path)] if Path(self.path).is_file() else []) + parts
+
+    async def _append(self, entry: dict) -> None:
+        entry["recorded_at"] = time.time()
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        await asyncio.to_thread(self._write, line)
+        self.stats["recorded"] += 1
+
+    def _write(self, line: str) -> None:
+        with self._lock, gzip.open(self._process_path(), "at", encoding="utf-8") as f:
+            f.write(line)
+
+    def _read(self) -> list[dict]:
+        """Every recorded exchange, the per-process files merged in recording order."""
+        paths = self._paths()
+        if not paths:
+            raise FileNotFoundError(f"No cassette at {self.path}")
+        entries = []
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+        return sorted(entries, key=lambda e: e.get("recorded_at", 0))
+
+    def _load(self) -> None:
+        for index, entry in enumerate(self._read()):
+            entry["_index"] = index
+            self._exact[entry["key"]].append(entry)
+            self._by_tag[entry["tag"]].append(entry)
+        logger.info(f"Loaded {len(self._by_tag)} exchange kinds from cassette {self.path}")
+
+    def _next(self, key: str, tag: str) -> dict:
+        queue = self._exact.get(key)
+        while queue:
+            entry = queue.popleft()
+            if entry["_index"] not in self._served:
+                self._served.add(entry["_index"])
+                self._last[key] = entry
+                self.stats["exact_hits"] += 1
+                return entry
+        if key in self._last:
+            # same request issued more often than recorded – repeat the answer
+            self.stats["exact_hits"] += 1
+            return self._last[key]
+
+        queue = self._by_tag.get(tag)
+        while queue:
+            entry = queue.popleft()
+            if entry["_index"] not in self._served:
+                self._served.add(entry["_index"])
+                self.stats["fallback_hits"] += 1
+                return entry
+
+        self.stats["misses"] += 1
+        raise CassetteMiss(f"No recorded exchange left for {tag} ({key[:12]})")
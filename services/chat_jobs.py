@@ -0,0 +1,191 @@
+"""
+Asynchronous chat jobs.
+
+`POST /messages/process?async=true` stores the user's message, records a job
+in Mongo and returns its id at once; the client polls (or long-polls)
+`GET /messages/jobs/{id}` for the reply. Jobs are run by a pool of workers,
+either inside each API process (`CHAT_JOB_WORKERS`) or in separate
+`python chat_worker.py` processes, all claiming from the same collection.
+
+A running job holds a lease that its worker renews; if the worker dies, the
+lease lapses and another worker picks the job up, so in-flight work survives
+restarts. A job is attempted at most `max_attempts` times.
+"""
+import asyncio
+import logging
+import math
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+from dao.chat_job_dao import ChatJobDAO
+from models.ai_processing_models import ChatJobConfig
+from services.messaging_service import MessageService
+
+logger = logging.getLogger(__name__)
+
+
+class ChatJobQueue:
+    def __init__(self, config: ChatJobConfig, job_dao: ChatJobDAO, message_service: MessageService):
+        self.config = config
+        self.job_dao = job_dao
+        self.message_service = message_service
+        self._name = f"{socket.gethostname()}-{os.getpid()}"
+        self._workers: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self._finished: Dict[str, asyncio.Event] = {}  # job id -> set when a local worker finishes it
+        self._waiters: dict[str, int] = defaultdict(int)  # job id -> long-polls holding its event
+        self._running = 0
+
+        # metrics
+        self._enqueued = 0
+        self._outcomes: dict[str, int] = defaultdict(int)
+        self._rejected: dict[str, int] = defaultdict(int)
+
+    # ------------------------ client side ------------------------------ #
+    def enqueue(self, user_id: int, text: str) -> Dict:
+        """Store the user's message and queue a job to answer it; 429 / 503 when over the limits."""
+        if self.job_dao.count_pending(user_id) >= self.config.max_pending_per_user:
+            self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_limit",
+                         "Too many messages in progress, please wait for the previous reply")
+        if self.job_dao.count_queued() >= self.config.max_queued:
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "overloaded", "Server is busy, please retry shortly")
+
+        message_id = self.message_service.store_message(text=text, sender="user", user_id=user_id)
+        job = self.job_dao.create(user_id=user_id, message_id=message_id, text=text)
+        self._enqueued += 1
+        self._wake.set()  # a local idle worker takes it right away
+        return job
+
+    async def get(self, job_id: str, user_id: int, wait: float = 0.0) -> Dict:
+        """The job as seen by its owner; with `wait`, hold until it finishes or `wait` seconds pass."""
+        job = self._owned(job_id, user_id)
+        if job["status"] in ChatJobDAO.FINAL or wait <= 0:
+            return job
+        finished = self._finished.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] += 1
+        give_up = time.monotonic() + min(wait, self.config.max_wait_seconds)
+        try:
+            while job["status"] not in ChatJobDAO.FINAL:
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    # woken at once if a worker here finishes it; polled if it runs in another process
+                    await asyncio.wait_for(finished.wait(), min(left, self.config.poll_interval_seconds * 4))
+                except asyncio.TimeoutError:
+                    pass
+                job = self._owned(job_id, user_id)
+        finally:
+            # the last waiter drops the event, whoever finished the job (or not yet)
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                if self._finished.get(job_id) is finished:
+                    del self._finished[job_id]
+        return job
+
+    def _owned(self, job_id: str, user_id: int) -> Dict:
+        job = self.job_dao.get(job_id)
+        if not job or job["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> None:
+        self._rejected[reason] += 1
+        retry_after = max(1, math.ceil(self.config.poll_interval_seconds * 4))
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+    # ------------------------ worker side ------------------------------ #
+    def start(self, workers: Optional[int] = None) -> None:
+        count = self.config.workers if workers is None else workers
+        self._workers = [asyncio.create_task(self._work(f"{self._name}-{i}")) for i in range(count)]
+        if count:
+            logger.info(f"Chat job workers started: {count}")
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back to the queue."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def run_forever(self, workers: Optional[int] = None) -> None:
+        """Standalone worker process: run the pool until cancelled."""
+        self.start(workers)
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self.stop()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "running": self._running,
+            "queued": self.job_dao.count_queued(),
+            "enqueued": self._enqueued,
+            "outcomes": dict(self._outcomes),
+            "rejected": dict(self._rejected),
+        }
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            self._wake.clear()  # before claiming, so an enqueue racing the claim still wakes us
+            job = self.job_dao.claim(worker, self.config.lease_seconds)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.config.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job, worker)
+
+    async def _run(self, job: Dict, worker: str) -> None:
+        job_id = job["job_id"]
+        if job["attempts"] > self.config.max_attempts:
+            self._finish(job_id, worker, "gave_up",
+                         error=f"Gave up after {self.config.max_attempts} attempts")
+            return
+        if job["attempts"] > 1:
+            logger.warning(f"Chat job {job_id}: attempt {job['attempts']} (previous worker stopped)")
+
+        self._running += 1
+        renewer = asyncio.create_task(self._renew(job_id, worker))
+        try:
+            analysis, reply_id = await self.message_service.reply_to_stored(job["user_id"], job["message_id"],
+                                                                         job.get("text"))
+        except asyncio.CancelledError:
+            self.job_dao.release(job_id, worker)
+            raise
+        except Exception as e:
+            logger.error(f"Chat job {job_id} failed: {e}")
+            self._finish(job_id, worker, "failed", error="Internal error")
+        else:
+            self._finish(job_id, worker, "done", result={
+                "reply": analysis.suggested_message_reply,
+                "message_id": reply_id,
+                "metadata": analysis.model_dump(exclude={"suggested_message_reply"}),
+            })
+        finally:
+            renewer.cancel()
+            self._running -= 1
+
+    async def _renew(self, job_id: str, worker: str) -> None:
+        while True:
+            await asyncio.sleep(self.config.lease_seconds / 3)
+            if not self.job_dao.renew(job_id, worker, self.config.lease_seconds):
+                logger.warning(f"Chat job {job_id}: lease lost by {worker}")
+                return
+
+    def _finish(self, job_id: str, worker: str, outcome: str,
+                result: Optional[Dict] = None, error: Optional[str] = None) -> None:
+        if not self.job_dao.finish(job_id, worker, self.config.result_ttl_seconds, result=result, error=error):
+            outcome = "lease_lost"  # another worker took over; its outcome stands
+        self._outcomes[outcome] += 1
+        finished = self._finished.pop(job_id, None)
+        if finished:
+            finished.set()
@@ -0,0 +1,233 @@
+"""
+WebSocket chat channel (`/messages/ws`).
+
+A connection authenticates once and then carries any number of chat turns;
+the user and their recent history live in a `ChatSession` for the life of
+the socket, so a turn costs the pipeline and two message inserts, nothing
+else. Protocol (JSON text frames):
+
+    client → server
+        {"type": "auth", "token": "<jwt>"}            first frame, unless the token came as
+                                                      `?token=` or an Authorization header
+        {"type": "message", "text": "...", "id": "c1"}  `id` is optional, echoed back
+    server → client
+        {"type": "ready", "user_id": 1, "history": 20}
+        {"type": "token", "id": "c1", "delta": "..."}   reply text as generate_reply streams it
+        {"type": "final", "id": "c1", "reply": "...", "metadata": {...}}
+        {"type": "error", "id": "c1", "code": 429, "detail": "...", "retry_after": 3}
+                                                      (`"repeated": n` when merged while unread)
+
+`final.reply` is authoritative: it replaces the streamed text when the reply
+was cut short by the request deadline.
+"""
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect, status
+
+from models.ai_processing_models import ChatSocketConfig
+from models.user_model import UserInDB
+from services.admission_control import AdmissionController
+from services.messaging_service import ChatSession, MessageService
+from services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_LENGTH = 500  # same limit as POST /messages/process
+
+
+class _Outbox:
+    """
+    Frames for one socket, written by a single task. While the client is slow to
+    read, token deltas of the same turn are merged into the frame still waiting
+    to go out, and so are repeats of the same error (counted in `repeated`), so a
+    slow reader never stalls the pipeline. Frames that cannot be merged are capped
+    by the server: past `max_pending_frames` the connection is closed.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._frames: deque = deque()
+        self._wake = asyncio.Event()
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def send(self, frame: dict) -> None:
+        last = self._frames[-1] if self._frames else None
+        if (last is not None and frame["type"] == "error" and last["type"] == "error"
+                and all(last.get(k) == frame.get(k) for k in ("id", "code", "detail"))):
+            last["repeated"] = last.get("repeated", 1) + 1
+            self.coalesced += 1
+            return
+        self._frames.append(frame)
+        self._wake.set()
+
+    async def token(self, turn_id, delta: str) -> None:
+        last = self._frames[-1] if self._frames else None
+        if last is not None and last["type"] == "token" and last["id"] == turn_id:
+            last["delta"] += delta
+            self.coalesced += 1
+            return
+        self.send({"type": "token", "id": turn_id, "delta": delta})
+
+    async def run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._frames:
+                frame = self._frames.popleft()  # popped first: later deltas start a new frame
+                await self._websocket.send_text(orjson.dumps(frame).decode())
+
+
+class ChatSocketServer:
+    """Serves `/messages/ws` connections for one worker, up to `max_connections` at a time."""
+
+    def __init__(self, config: ChatSocketConfig, user_service: UserService,
+                 message_service: MessageService, admission: AdmissionController):
+        self.config = config
+        self.user_service = user_service
+        self.message_service = message_service
+        self.admission = admission
+        self._open = 0
+
+        # metrics
+        self._accepted = 0
+        self._rejected: dict[str, int] = defaultdict(int)
+        self._turns = 0
+        self._busy = 0
+        self._coalesced = 0
+
+    # ------------------------ public API ------------------------------- #
+    async def serve(self, websocket: WebSocket) -> None:
+        await websocket.accept()
+        if self._open >= self.config.max_connections:
+            self._rejected["full"] += 1
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many connections")
+            return
+        self._open += 1
+        self._accepted += 1
+        try:
+            user = await self._authenticate(websocket)
+            if user is None:
+                return
+            session = self.message_service.open_session(user, self.config.history_size)
+            await websocket.send_text(orjson.dumps(
+                {"type": "ready", "user_id": user.user_id, "history": len(session.history)}).decode())
+            await self._converse(websocket, session)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._open -= 1
+
+    def stats(self) -> dict:
+        return {
+            "open": self._open,
+            "max_connections": self.config.max_connections,
+            "accepted": self._accepted,
+            "rejected": dict(self._rejected),
+            "turns": self._turns,
+            "busy": self._busy,
+            "tokens_coalesced": self._coalesced,
+        }
+
+    # ------------------------ internals -------------------------------- #
+    async def _authenticate(self, websocket: WebSocket) -> Optional[UserInDB]:
+        """Token from `?token=`, an Authorization header or the first frame; close 1008 if it is no good."""
+        token = websocket.query_params.get("token")
+        header = websocket.headers.get("authorization", "")
+        if not token and header.lower().startswith("bearer "):
+            token = header[7:]
+        try:
+            if not token:
+                frame = orjson.loads(await asyncio.wait_for(websocket.receive_text(),
+                                                            self.config.auth_timeout_seconds))
+                token = frame.get("token") if isinstance(frame, dict) and frame.get("type") == "auth" else None
+            if token:
+                return self.user_service.get_user_by_token(token)
+        except (asyncio.TimeoutError, orjson.JSONDecodeError, ValueError, HTTPException):
+            pass
+        self._rejected["auth"] += 1
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or expired token")
+        return None
+
+    async def _converse(self, websocket: WebSocket, session: ChatSession) -> None:
+        """Read frames while one turn at a time runs; at most `max_queued_turns` wait behind it."""
+        outbox = _Outbox(websocket)
+        turns: asyncio.Queue = asyncio.Queue(maxsize=self.config.max_queued_turns)
+        running: list = []  # id of the turn in progress, if any
+        sender = asyncio.create_task(outbox.run())
+        worker = asyncio.create_task(self._work(session, turns, outbox, running))
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(websocket.receive_text(), self.config.idle_timeout_seconds)
+                except asyncio.TimeoutError:
+                    if running or not turns.empty():
+                        continue  # quiet because it is waiting for a reply
+                    await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Idle timeout")
+                    return
+                if len(outbox) >= self.config.max_pending_frames:
+                    # sending frames without reading the answers: nothing bounds the outbox otherwise
+                    self._rejected["not_reading"] += 1
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Replies are not being read")
+                    return
+                turn_id, text, error = self._parse(raw)
+                if error:
+                    outbox.send({"type": "error", "id": turn_id, "code": 400, "detail": error})
+                    continue
+                try:
+                    turns.put_nowait((turn_id, text))
+                except asyncio.QueueFull:
+                    self._busy += 1
+                    outbox.send({"type": "error", "id": turn_id, "code": 429,
+                                 "detail": "A reply is still in progress, please wait for it"})
+        finally:
+            worker.cancel()  # client gone: stop the pipeline and free its LLM slots
+            sender.cancel()
+            await asyncio.gather(worker, sender, return_exceptions=True)
+            self._coalesced += outbox.coalesced
+
+    @staticmethod
+    def _parse(raw: str) -> tuple:
+        try:
+            frame = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return None, None, "Frames must be JSON"
+        if not isinstance(frame, dict) or frame.get("type") != "message":
+            return None, None, "Expected a frame of type 'message'"
+        turn_id, text = frame.get("id"), frame.get("text")
+        if not isinstance(text, str) or not text.strip():
+            return turn_id, None, "'text' must be a non-empty string"
+        if len(text) > MAX_TEXT_LENGTH:
+            return turn_id, None, f"'text' is longer than {MAX_TEXT_LENGTH} characters"
+        return turn_id, text, None
+
+    async def _work(self, session: ChatSession, turns: asyncio.Queue, outbox: _Outbox, running: list) -> None:
+        while True:
+            turn_id, text = await turns.get()
+            running.append(turn_id)
+            try:
+                # same per-user and per-worker limits as /messages/process
+                async with self.admission.admit(session.user.user_id):
+                    analysis = await session.turn(text, on_token=lambda delta: outbox.token(turn_id, delta))
+                self._turns += 1
+                outbox.send({
+                    "type": "final",
+                    "id": turn_id,
+                    "reply": analysis.suggested_message_reply,
+                    "metadata": analysis.model_dump(exclude={"suggested_message_reply"}),
+                })
+            except HTTPException as e:
+                retry_after = (e.headers or {}).get("Retry-After")
+                outbox.send({"type": "error", "id": turn_id, "code": e.status_code, "detail": e.detail,
+                             "retry_after": int(retry_after) if retry_after else None})
+            except Exception as e:
+                logger.error(f"Chat turn failed for user {session.user.user_id}: {e}")
+                outbox.send({"type": "error", "id": turn_id, "code": 500, "detail": "Internal error"})
+            finally:
+                running.clear()
@@ -0,0 +1,71 @@
+"""
+Per-request time budget.
+
+The chat route starts a `Deadline`; MessageService hands it to DMAIService,
+which keeps it in the graph state for the nodes and installs it as the
+current deadline for the lower layers (embedding calls, Pinecone queries)
+so they can bound their own waits without it being threaded through every
+signature.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's budget ran out before the awaited call finished."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return self.budget - (self.expires_at - time.monotonic())
+
+    def allows(self, seconds: float) -> bool:
+        """True if `seconds` of work still fits in the budget."""
+        return self.remaining() >= seconds
+
+    async def run(self, awaitable: Awaitable[T], reserve: float = 0.0) -> T:
+        """Await within the budget, keeping `reserve` seconds back for later stages."""
+        timeout = self.remaining() - reserve
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()  # never started; avoid the "never awaited" warning
+            raise DeadlineExceeded(f"no budget left ({self.remaining():.2f}s remaining, {reserve:.2f}s reserved)")
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError as exc:
+            raise DeadlineExceeded(f"timed out after {timeout:.2f}s") from exc
+
+    @staticmethod
+    def current() -> Optional["Deadline"]:
+        return _current.get()
+
+    @contextmanager
+    def installed(self):
+        """Make this the current deadline for code (and tasks) started inside the block."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Bound `awaitable` by the current request's deadline, if there is one."""
+    deadline = Deadline.current()
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(awaitable)
@@ -0,0 +1,77 @@
+"""
+FAQ fast path.
+
+Ingestion indexes the question / answer pairs it detects (services.ingestion.faq)
+in their own namespace. When the latest user message is close enough to one of
+those questions (`min_score`), the stored answer is the reply and the graph,
+with its five LLM calls, is skipped. Answers tied to a plan are only given when
+the message names that plan. Anything else (no match, a lookup error or a slow
+lookup) falls through to the graph.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from models.ai_processing_models import FaqConfig, MessageAnalysis
+from services.plans import GENERAL_PLAN, detect_plan
+from services.stage_metrics import stage_metrics
+from services.vector_db_service import VectorDbService
+
+logger = logging.getLogger(__name__)
+
+FAQ_CATEGORY = "faq"
+
+
+class FaqService:
+    def __init__(self, config: FaqConfig, vectordb_service: VectorDbService):
+        self.config = config
+        self.vectordb_service = vectordb_service
+
+        # metrics
+        self._counts: dict[str, int] = defaultdict(int)
+
+    async def answer(self, history: List[Dict], tenant: Optional[str] = None) -> Optional[MessageAnalysis]:
+        """The FAQ answer to the latest user message in `history` (newest first) from `tenant`'s index, or None."""
+        if not self.config.enabled:
+            return None
+        text = next((m.get("text") for m in history if m.get("sender") == "user"), None)
+        if not text or len(text) > self.config.max_message_chars:
+            return None
+
+        self._counts["lookups"] += 1
+        try:
+            with stage_metrics.timer("faq.lookup"):
+                matches = await asyncio.wait_for(self.vectordb_service.match_faq(text, tenant),
+                                                 timeout=self.config.lookup_timeout_seconds)
+        except Exception as exc:  # the graph can still answer
+            self._counts["errors"] += 1
+            logger.warning(f"FAQ lookup failed, using the graph: {exc!r}")
+            return None
+
+        plan = detect_plan(text)
+        for doc, score in matches:
+            if score < self.config.min_score:
+                break
+            entry_plan = doc.metadata.get("plan", GENERAL_PLAN)
+            if entry_plan != GENERAL_PLAN and entry_plan != plan:
+                continue
+            self._counts["hits"] += 1
+            logger.info(f"FAQ hit ({score:.3f}): {doc.page_content[:80]}")
+            return MessageAnalysis(message_category=FAQ_CATEGORY,
+                                   suggested_message_reply=doc.metadata["answer"],
+                                   conversation_summary=doc.page_content,
+                                   factual_consistency="faq",
+                                   plan=plan or (entry_plan if entry_plan != GENERAL_PLAN else None))
+        return None
+
+    def stats(self) -> dict:
+        lookups = self._counts["lookups"]
+        return {
+            "enabled": self.config.enabled,
+            "min_score": self.config.min_score,
+            "lookups": lookups,
+            "hits": self._counts["hits"],
+            "errors": self._counts["errors"],
+            "hit_rate": round(self._counts["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,114 @@
+"""
+Idempotency keys and in-flight coalescing for `POST /messages/process`.
+
+Clients retry when a chat turn is slow, and each retry used to store another
+copy of the message and run the whole graph again. Now:
+
+• Requests carrying the same `Idempotency-Key` (per user) run once: the first
+  reserves the key in Mongo, the others get its stored response, for
+  `ttl_seconds` afterwards, from any worker.
+• A retry that arrives while the original is still running in this worker
+  waits for that run instead of starting its own.
+
+Requests without a key always run: the same text twice ("yes", then "yes"
+to the next question) is two turns, and nothing tells it from a retry.
+
+Reusing a key with a different message is a client bug and gets 422.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from dao.idempotency_dao import IdempotencyDAO
+from models.ai_processing_models import IdempotencyConfig
+
+logger = logging.getLogger(__name__)
+
+Response = Tuple[int, Dict]  # status code, JSON body
+
+
+def request_fingerprint(*parts) -> str:
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode()).hexdigest()
+
+
+class IdempotencyService:
+    def __init__(self, config: IdempotencyConfig, dao: IdempotencyDAO):
+        self.config = config
+        self.dao = dao
+        self._inflight: Dict[tuple, Tuple[str, asyncio.Future]] = {}
+
+        # metrics
+        self._counts: dict[str, int] = defaultdict(int)
+
+    async def run(self, user_id: int, key: Optional[str], fingerprint: str,
+                  handler: Callable[[], Awaitable[Response]]) -> Tuple[int, Dict, bool]:
+        """
+        Run `handler` at most once per `key`; returns (status code, body, replayed).
+        Without a key it simply runs.
+        """
+        if not self.config.enabled or key is None:
+            return (*await handler(), False)
+        if not 0 < len(key) <= self.config.max_key_length:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        flight = (user_id, key)
+        running = self._inflight.get(flight)
+        if running:
+            self._check_fingerprint(running[0], fingerprint)
+            self._counts["coalesced"] += 1
+            return (*await asyncio.shield(running[1]), True)
+
+        existing = self.dao.begin(user_id, key, fingerprint, self.config.lock_seconds)
+        if existing:
+            return (*await self._replay(user_id, key, fingerprint, existing), True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight] = (fingerprint, future)
+        try:
+            response = await handler()
+        except BaseException as e:
+            self.dao.abandon(user_id, key)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            self.dao.complete(user_id, key, *response, ttl_seconds=self.config.ttl_seconds)
+            future.set_result(response)
+            self._counts["executed"] += 1
+            return (*response, False)
+        finally:
+            del self._inflight[flight]
+
+    def stats(self) -> dict:
+        return {"enabled": self.config.enabled, "in_flight": len(self._inflight), **self._counts}
+
+    # ------------------------ internals -------------------------------- #
+    def _check_fingerprint(self, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            self._counts["mismatched"] += 1
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Idempotency-Key was already used for a different request")
+
+    async def _replay(self, user_id: int, key: str, fingerprint: str, record: Dict) -> Response:
+        """Stored response of an earlier request with this key; waits while it runs in another worker."""
+        self._check_fingerprint(record["fingerprint"], fingerprint)
+        give_up = time.monotonic() + self.config.wait_seconds
+        while record and record["status"] != "done" and time.monotonic() < give_up:
+            await asyncio.sleep(self.config.poll_interval_seconds)
+            record = self.dao.get(user_id, key)
+        if record and record["status"] == "done":
+            self._counts["replayed"] += 1
+            return record["status_code"], record["body"]
+        # still running elsewhere, or it failed and was dropped: the client should retry
+        self._counts["conflicts"] += 1
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="A request with this Idempotency-Key is still in progress",
+                            headers={"Retry-After": "1"})
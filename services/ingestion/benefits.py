@@ -0,0 +1,96 @@
+"""
+Benefits-table rows (services.benefits) parsed from the extracted tables of a
+Summary of Benefits document. Two table shapes carry the figures:
+
+• "Important Questions | Answers | Why This Matters": deductible, out-of-pocket
+  limit, referrals ... (question -> answer);
+• "Common Medical Event | Services You May Need | <cost column(s)> |
+  Limitations": one row per service and network tier. The event cell is only
+  printed on the first row of its group, and a cell that wraps onto the next
+  page shows up as a row without event or service: both are carried over.
+
+Other tables are ignored.
+"""
+import re
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from models.vectordb_models import BenefitRow
+from services.benefits import ALL_TIERS, benefit_key, detect_tier
+
+
+def _cell(value) -> str:
+    text = "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+    return "" if text == "None" else re.sub(r"\s+", " ", text).strip()
+
+
+def _rows(df: pd.DataFrame) -> List[List[str]]:
+    """All rows including the header: camelot keeps it in the first row, pdfplumber / docx in the columns."""
+    rows = [[_cell(c) for c in r] for r in df.values.tolist()]
+    if not all(isinstance(c, int) for c in df.columns):
+        rows.insert(0, [_cell(c) for c in df.columns])
+    return rows
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"\W+", "_", text.lower()).strip("_")[:60]
+
+
+def _cost_tier(header: str) -> Optional[str]:
+    header = header.lower()
+    if "network" in header:
+        return detect_tier(header) or ALL_TIERS
+    if "pay" in header or "out of pocket" in header or "cost" in header:
+        return ALL_TIERS
+    return None
+
+
+def parse_benefit_tables(tables: List[Tuple[Optional[int], pd.DataFrame]], source: str,
+                         plan: str) -> List[BenefitRow]:
+    """Benefit rows of one document's tables (in page order)."""
+    out: List[BenefitRow] = []
+    layout = None  # column positions of the current services table, kept across page breaks
+    event, last = "", []
+    for page, df in tables:
+        rows = _rows(df)
+        if not rows:
+            continue
+        header = [c.lower() for c in rows[0]]
+
+        if any("important questions" in h for h in header) and len(header) >= 2:
+            for row in rows[1:]:
+                if row[0] and row[1]:
+                    out.append(BenefitRow(plan=plan, benefit=benefit_key(row[0]) or _slug(row[0]), label=row[0],
+                                          value=row[1], source=source, page=page))
+            continue
+
+        if any("services you may need" in h for h in header):
+            service = header.index(next(h for h in header if "services you may need" in h))
+            layout = {
+                "event": next((i for i, h in enumerate(header) if "medical event" in h), None),
+                "service": service,
+                "costs": [(i, t) for i, h in enumerate(header) if i != service and (t := _cost_tier(h))],
+                "limits": next((i for i, h in enumerate(header) if "limitation" in h), None),
+            }
+            rows = rows[1:]
+        elif layout is None or len(header) <= max([layout["service"], *(i for i, _ in layout["costs"])]):
+            continue  # not a services table
+
+        for row in rows:
+            get = lambda i: row[i] if i is not None and i < len(row) else ""  # noqa: E731
+            if get(layout["event"]):
+                event = get(layout["event"])
+            label = get(layout["service"])
+            if not label:  # wrapped cell: the rest of the previous service's figures
+                for i, tier in layout["costs"]:
+                    prev = next((r for r in reversed(last) if r.tier == tier), None)
+                    if prev is not None and get(i):
+                        prev.value = f"{prev.value} {get(i)}"
+                continue
+            key = benefit_key(f"{event} | {label}") or _slug(label)
+            last = [BenefitRow(plan=plan, benefit=key, tier=tier, label=label, value=get(i),
+                               limitations=get(layout["limits"]), source=source, page=page)
+                    for i, tier in layout["costs"] if get(i)]
+            out.extend(last)
+    return out
@@ -0,0 +1,154 @@
+"""
+Durable progress of ingestion jobs: one row per job, per file and per batch,
+kept in a local sqlite file so an interrupted run can pick up where it stopped.
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    job_id TEXT PRIMARY KEY, folder TEXT, namespace TEXT, status TEXT,
+    started_at REAL, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS ingestion_files (
+    job_id TEXT, path TEXT, sha256 TEXT, chunks INTEGER, batches INTEGER, status TEXT,
+    PRIMARY KEY (job_id, path)
+);
+CREATE TABLE IF NOT EXISTS ingestion_batches (
+    job_id TEXT, path TEXT, batch INTEGER, status TEXT, attempts INTEGER, error TEXT,
+    PRIMARY KEY (job_id, path, batch)
+);
+CREATE TABLE IF NOT EXISTS ingestion_vectors (
+    job_id TEXT, path TEXT, vector_id TEXT,
+    PRIMARY KEY (job_id, path, vector_id)
+);
+"""
+
+
+class CheckpointStore:
+    """
+    Every write is its own transaction (autocommit), so a crash loses at most
+    the batch that was in flight.
+    """
+
+    def __init__(self, path: str):
+        Path(path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ------------------------ jobs ------------------------------------- #
+    def start_job(self, job_id: str, folder: str, namespace: str) -> bool:
+        """Register the job (or reopen it); returns True when resuming an existing one."""
+        existing = self.job(job_id)
+        now = time.time()
+        if existing:
+            self._conn.execute("UPDATE ingestion_jobs SET status = 'running', updated_at = ? WHERE job_id = ?",
+                               (now, job_id))
+            return True
+        self._conn.execute("INSERT INTO ingestion_jobs VALUES (?, ?, ?, 'running', ?, ?)",
+                           (job_id, folder, namespace, now, now))
+        return False
+
+    def finish_job(self, job_id: str, status: str) -> None:
+        self._conn.execute("UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                           (status, time.time(), job_id))
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT job_id, folder, namespace, status, started_at, updated_at FROM ingestion_jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("job_id", "folder", "namespace", "status", "started_at", "updated_at"), row))
+
+    def reset_job(self, job_id: str) -> None:
+        """Forget the job's progress; not the vectors it wrote, which are still in the index."""
+        for table in ("ingestion_batches", "ingestion_files", "ingestion_jobs"):
+            self._conn.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+
+    # ------------------------ files ------------------------------------ #
+    def file(self, job_id: str, path: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT sha256, chunks, batches, status FROM ingestion_files WHERE job_id = ? AND path = ?",
+            (job_id, path),
+        ).fetchone()
+        return dict(zip(("sha256", "chunks", "batches", "status"), row)) if row else None
+
+    def start_file(self, job_id: str, path: str, sha256: str, chunks: int, batches: int) -> None:
+        """(Re)register a file; a changed hash discards its old batch checkpoints."""
+        previous = self.file(job_id, path)
+        if previous and previous["sha256"] == sha256 and previous["batches"] == batches:
+            return
+        self._conn.execute("DELETE FROM ingestion_batches WHERE job_id = ? AND path = ?", (job_id, path))
+        self._conn.execute("INSERT OR REPLACE INTO ingestion_files VALUES (?, ?, ?, ?, ?, ?)",
+                           (job_id, path, sha256, chunks, batches, PENDING))
+
+    def finish_file(self, job_id: str, path: str, status: str) -> None:
+        self._conn.execute("UPDATE ingestion_files SET status = ? WHERE job_id = ? AND path = ?",
+                           (status, job_id, path))
+
+    # ------------------------ batches ---------------------------------- #
+    def done_batches(self, job_id: str, path: str) -> set:
+        rows = self._conn.execute(
+            "SELECT batch FROM ingestion_batches WHERE job_id = ? AND path = ? AND status = ?",
+            (job_id, path, DONE),
+        )
+        return {r[0] for r in rows}
+
+    def record_batch(self, job_id: str, path: str, batch: int, status: str, attempts: int,
+                     error: Optional[str] = None) -> None:
+        self._conn.execute(
+            "INSERT INTO ingestion_batches VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (job_id, path, batch) DO UPDATE SET "
+            "status = excluded.status, attempts = ingestion_batches.attempts + excluded.attempts, "
+            "error = excluded.error",
+            (job_id, path, batch, status, attempts, error),
+        )
+
+    # ------------------------ vectors ---------------------------------- #
+    def vector_ids(self, job_id: str, path: str) -> set:
+        """Ids of the vectors upserted for this file, by this or any earlier version of it."""
+        rows = self._conn.execute(
+            "SELECT vector_id FROM ingestion_vectors WHERE job_id = ? AND path = ?", (job_id, path),
+        )
+        return {r[0] for r in rows}
+
+    def record_vectors(self, job_id: str, path: str, ids: List[str]) -> None:
+        self._conn.executemany("INSERT OR IGNORE INTO ingestion_vectors VALUES (?, ?, ?)",
+                               [(job_id, path, vid) for vid in ids])
+
+    def forget_vectors(self, job_id: str, path: str, ids: List[str]) -> None:
+        self._conn.executemany("DELETE FROM ingestion_vectors WHERE job_id = ? AND path = ? AND vector_id = ?",
+                               [(job_id, path, vid) for vid in ids])
+
+    def failed_batches(self, job_id: str) -> List[Dict]:
+        rows = self._conn.execute(
+            "SELECT path, batch, attempts, error FROM ingestion_batches WHERE job_id = ? AND status = ?",
+            (job_id, FAILED),
+        )
+        return [dict(zip(("path", "batch", "attempts", "error"), r)) for r in rows]
+
+    def summary(self, job_id: str) -> Dict:
+        files = self._conn.execute(
+            "SELECT status, COUNT(*), COALESCE(SUM(chunks), 0) FROM ingestion_files WHERE job_id = ? GROUP BY status",
+            (job_id,),
+        ).fetchall()
+        batches = self._conn.execute(
+            "SELECT status, COUNT(*) FROM ingestion_batches WHERE job_id = ? GROUP BY status", (job_id,),
+        ).fetchall()
+        return {
+            "job": self.job(job_id),
+            "files": {status: count for status, count, _ in files},
+            "chunks": sum(chunks for _, _, chunks in files),
+            "batches": dict(batches),
+            "failed": self.failed_batches(job_id),
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,140 @@
+"""
+Exact and near-duplicate detection for extracted chunks, run between
+extraction and embedding.
+
+The SOB PDFs repeat most of their boilerplate and many benefit rows verbatim
+or nearly so; embedding every copy costs money, grows the index and fills
+retrieval's `top_k` with the same text. Chunks are grouped by exact
+(normalised) text first, then by MinHash similarity over word shingles, with
+LSH banding so only chunks sharing a band are ever compared (roughly linear
+in the number of chunks). Each group is ingested once, carrying the sources
+and plans of all its members.
+"""
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.vectordb_models import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d[\d,.]*%?")
+_PRIME = (1 << 31) - 1  # hashes are < 2^31, so a * h + b fits in int64
+
+
+class ChunkDeduplicator:
+    """
+    MinHash (NUM_PERM permutations) + LSH (BANDS bands of NUM_PERM // BANDS rows).
+    Two chunks are near-duplicates when their estimated Jaccard similarity is at
+    least `threshold` *and* they contain the same figures: "$40 copay" and
+    "$75 copay" rows of two plans are similar text but different facts.
+    """
+
+    NUM_PERM = 128
+    BANDS = 16
+    SHINGLE = 3  # words per shingle
+
+    def __init__(self, threshold: float = 0.85, seed: int = 1):
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, self.NUM_PERM, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, self.NUM_PERM, dtype=np.int64)
+
+    # ------------------------ public API ------------------------------- #
+    def deduplicate(self, chunks: List[DocumentChunk]) -> Tuple[List[Optional[DocumentChunk]], Dict]:
+        """
+        Returns a list parallel to `chunks`: the merged chunk at the position of each
+        group's representative, None for the duplicates folded into it; plus a report.
+        """
+        words = [_WORD.findall(c.text.lower()) for c in chunks]
+        parent = list(range(len(chunks)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int) -> None:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        # 1. exact duplicates (after case / whitespace / punctuation normalisation)
+        first_seen: Dict[str, int] = {}
+        exact = 0
+        for i, w in enumerate(words):
+            key = " ".join(w)
+            if key in first_seen:
+                union(first_seen[key], i)
+                exact += 1
+            else:
+                first_seen[key] = i
+
+        # 2. near duplicates among the distinct texts
+        distinct = list(first_seen.values())
+        signatures = {i: self._signature(words[i]) for i in distinct}
+        numbers = {i: _NUMBER.findall(chunks[i].text) for i in distinct}
+        rows = self.NUM_PERM // self.BANDS
+        for band in range(self.BANDS):
+            # one member per group seen in the bucket; a chunk is compared with each of them,
+            # not only the first, which may differ from a true duplicate in its figures
+            buckets: Dict[bytes, List[int]] = {}
+            for i in distinct:
+                key = signatures[i][band * rows:(band + 1) * rows].tobytes()
+                members = buckets.setdefault(key, [])
+                grouped = False
+                for j in members:
+                    if find(i) == find(j):
+                        grouped = True
+                        continue
+                    similarity = float(np.mean(signatures[i] == signatures[j]))
+                    if similarity >= self.threshold and numbers[i] == numbers[j]:
+                        union(i, j)
+                        grouped = True
+                if not grouped:
+                    members.append(i)
+
+        # 3. one merged chunk per group
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(chunks)):
+            groups.setdefault(find(i), []).append(i)
+        result: List[Optional[DocumentChunk]] = [None] * len(chunks)
+        for members in groups.values():
+            # keep the most complete wording; ties go to the first occurrence
+            keep = max(members, key=lambda i: (len(chunks[i].text), -i))
+            result[keep] = self._merge(chunks[keep], [chunks[i] for i in members])
+
+        report = {
+            "chunks": len(chunks),
+            "unique": len(groups),
+            "exact_duplicates": exact,
+            "near_duplicates": len(chunks) - len(groups) - exact,
+            "dedup_ratio": round(1 - len(groups) / len(chunks), 4) if chunks else 0.0,
+        }
+        logger.info(f"Dedup: {report['chunks']} chunks -> {report['unique']} unique "
+                    f"({report['exact_duplicates']} exact, {report['near_duplicates']} near duplicates, "
+                    f"ratio {report['dedup_ratio']:.1%})")
+        return result, report
+
+    # ------------------------ internals -------------------------------- #
+    def _signature(self, words: List[str]) -> np.ndarray:
+        k = self.SHINGLE
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) & _PRIME for s in shingles), dtype=np.int64)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    @staticmethod
+    def _merge(keep: DocumentChunk, members: List[DocumentChunk]) -> DocumentChunk:
+        if len(members) == 1:
+            return keep
+        sources = list(dict.fromkeys(m.source for m in members))
+        plans = list(dict.fromkeys(p for m in members for p in m.plans()))
+        return keep.model_copy(update={
+            "sources": sources if len(sources) > 1 else None,
+            "plan": plans[0] if len(plans) == 1 else sorted(plans),
+        })
@@ -0,0 +1,203 @@
+"""
+Text extraction for ingestion (PDF / DOCX -> paragraphs and table rows).
+
+Pulls in pandas, camelot, pdfplumber and python-docx, so it must only be
+imported by the ingestion path, never by the API at startup.
+"""
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import camelot
+import docx
+import pandas as pd
+import pdfplumber
+
+from models.vectordb_models import BenefitRow, DocumentChunk, ParsedPage, ParsedTable
+from services.ingestion.benefits import parse_benefit_tables
+from services.ingestion.page_cache import ParsedPageCache, file_sha256
+from services.plans import GENERAL_PLAN, detect_plan
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {".pdf", ".docx"}
+
+
+class DocumentExtractor:
+    def __init__(self, page_cache: Optional[ParsedPageCache] = None):
+        self.page_cache = page_cache
+        self.timings: Dict[str, Dict] = {}  # per PDF: seconds per stage and page cache outcome
+
+    # ───────────────────────── helpers ──────────────────────────
+    @staticmethod
+    def _row_to_text(row: pd.Series) -> str:
+        return "\n".join(
+            f"{col} is {row[col]}" for col in row.index if str(row[col]).strip()
+        )
+
+    @staticmethod
+    def _split_paragraphs(text: str) -> List[str]:
+        paras = [
+            p.strip()
+            for p in re.split(r"\n\s*\n", text)
+            if p and len(p.strip()) > 25  # heuristically keep “real” paragraphs
+        ]
+        return paras
+
+    # ---------------------- PDF extraction ----------------------
+    # One camelot pass finds the ruled tables and where they are; one pdfplumber
+    # pass reads each page's text outside those regions, so table cells are only
+    # embedded as table rows. Without camelot's tables, pdfplumber's own (largest
+    # per page) are taken in the same pass.
+    @staticmethod
+    def _camelot_tables(path: Path) -> Optional[Dict[int, List[Tuple[tuple, ParsedTable]]]]:
+        """Tables per page with their (x0, y0, x1, y1) region in PDF space; None when camelot fails."""
+        try:
+            tables = camelot.read_pdf(str(path), pages="all", strip_text="\n")
+        except Exception as e:
+            logger.debug(f"Camelot failed on {path.name}: {e}")
+            return None
+        found: Dict[int, List[Tuple[tuple, ParsedTable]]] = {}
+        for t in tables:
+            rows = [[str(c) for c in r] for r in t.df.values.tolist()]
+            found.setdefault(int(t.page), []).append((t._bbox, ParsedTable(rows=rows)))
+        return found
+
+    @staticmethod
+    def _largest_table(page) -> Optional[Tuple[tuple, ParsedTable]]:
+        # the table page.extract_table() returns, with its region
+        tables = sorted(page.find_tables(), key=lambda t: (-len(t.cells), t.bbox[1], t.bbox[0]))
+        rows = [[c or "" for c in r] for r in tables[0].extract()] if tables else []
+        if len(rows) < 2:
+            return None
+        return tables[0].bbox, ParsedTable(rows=rows[1:], columns=rows[0])
+
+    @staticmethod
+    def _text_outside(page, regions: List[tuple]) -> str:
+        """Page text without the characters inside `regions` (x0, top, x1, bottom)."""
+        if not regions:
+            return page.extract_text() or ""
+
+        def outside(obj) -> bool:
+            if obj.get("object_type") != "char":
+                return True
+            x, y = (obj["x0"] + obj["x1"]) / 2, (obj["top"] + obj["bottom"]) / 2
+            return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in regions)
+
+        return page.filter(outside).extract_text() or ""
+
+    def _parse_pdf(self, path: Path, timings: Dict) -> List[ParsedPage]:
+        started = time.perf_counter()
+        camelot_tables = self._camelot_tables(path)
+        timings["camelot_s"] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        pages: List[ParsedPage] = []
+        with pdfplumber.open(str(path)) as pdf:
+            for page in pdf.pages:
+                if camelot_tables is None:
+                    tables = [t for t in [self._largest_table(page)] if t]
+                else:  # camelot measures y from the bottom of the page, pdfplumber from the top
+                    tables = [((x0, page.height - y1, x1, page.height - y0), table)
+                              for (x0, y0, x1, y1), table in camelot_tables.get(page.page_number, [])]
+                pages.append(ParsedPage(page=page.page_number,
+                                        text=self._text_outside(page, [region for region, _ in tables]),
+                                        tables=[table for _, table in tables]))
+        timings["pages_s"] = round(time.perf_counter() - started, 3)
+        return pages
+
+    def parse_pdf(self, path: Path) -> List[ParsedPage]:
+        """Text and tables of every page, from the page cache when this exact file was parsed before."""
+        timings = self.timings[path.name] = {"cache": "off"}
+        started = time.perf_counter()
+        if self.page_cache is None:
+            pages = self._parse_pdf(path, timings)
+        else:
+            sha = file_sha256(path)
+            timings["hash_s"] = round(time.perf_counter() - started, 3)
+            pages = self.page_cache.get(sha, self.PARSER_VERSION)
+            timings["cache"] = "miss" if pages is None else "hit"
+            if pages is None:
+                pages = self._parse_pdf(path, timings)
+                try:
+                    self.page_cache.put(sha, self.PARSER_VERSION, pages)
+                except OSError as e:
+                    logger.warning(f"Page cache write failed for {path.name}: {e}")
+        timings["total_s"] = round(time.perf_counter() - started, 3)
+        return pages
+
+    @staticmethod
+    def _table_df(table: ParsedTable) -> pd.DataFrame:
+        # camelot-style tables keep their header in the first row, under integer columns
+        return pd.DataFrame(table.rows, columns=table.columns) if table.columns else pd.DataFrame(table.rows)
+
+    @staticmethod
+    def _tables_from_docx(path: Path) -> List[Tuple[Optional[int], pd.DataFrame]]:
+        doc = docx.Document(str(path))
+        dfs: List[Tuple[Optional[int], pd.DataFrame]] = []
+        for t in doc.tables:
+            rows = [[c.text.strip() for c in r.cells] for r in t.rows]
+            if len(rows) > 1:
+                dfs.append((None, pd.DataFrame(rows[1:], columns=rows[0])))
+        return dfs
+
+    @staticmethod
+    def _paragraphs_from_docx(path: Path) -> List[Tuple[Optional[int], str]]:
+        doc = docx.Document(str(path))
+        return [(None, p.text.strip()) for p in doc.paragraphs if len(p.text.strip()) > 25]
+
+    # ---------------------- public API ----------------------
+    # bump when chunk text or metadata changes, so ingestion re-processes unchanged files
+    VERSION = 3
+    # bump when what a PDF page parses to changes, so cached pages are parsed again
+    PARSER_VERSION = 1
+
+    def extract_document(self, file: Path) -> Tuple[List[DocumentChunk], List[BenefitRow]]:
+        """
+        Paragraphs followed by one chunk per table row, tagged with source, page and
+        plan, plus the benefits-table rows parsed from the same tables.
+        """
+        suffix = file.suffix.lower()
+        if suffix == ".pdf":
+            pages = self.parse_pdf(file)
+            paras = [(p.page, text) for p in pages for text in self._split_paragraphs(p.text)]
+            tables = [(p.page, self._table_df(t)) for p in pages for t in p.tables]
+        elif suffix == ".docx":
+            paras, tables = self._paragraphs_from_docx(file), self._tables_from_docx(file)
+        else:
+            return [], []
+
+        plan = detect_plan(file.stem) or GENERAL_PLAN
+        chunks = [DocumentChunk(text=text, source=file.name, page=page, plan=plan) for page, text in paras]
+        for page, df in tables:
+            chunks.extend(
+                DocumentChunk(text=self._row_to_text(row), source=file.name, page=page, plan=plan, kind="table_row")
+                for _, row in df.iterrows()
+            )
+        benefits = parse_benefit_tables(tables, file.name, plan) if plan != GENERAL_PLAN else []
+        timings = self.timings.get(file.name) if suffix == ".pdf" else None
+        parsed = f", parsed in {timings['total_s']}s, page cache {timings['cache']}" if timings else ""
+        logger.info(f"{file.name}: added {len(paras)} paragraphs + {len(tables)} tables (plan: {plan}, "
+                    f"{len(benefits)} benefit rows{parsed})")
+        return chunks, benefits
+
+    def extract_chunks(self, file: Path) -> List[DocumentChunk]:
+        """Paragraphs followed by one chunk per table row, tagged with source, page and plan."""
+        return self.extract_document(file)[0]
+
+    def extract_file(self, file: Path) -> List[str]:
+        """Paragraphs followed by one text chunk per table row."""
+        return [chunk.text for chunk in self.extract_chunks(file)]
+
+    def extract_folder(self, folder: Path) -> List[str]:
+        texts: List[str] = []
+        for file in sorted(folder.iterdir()):
+            if not file.is_file():
+                continue
+            try:
+                texts.extend(self.extract_file(file))
+            except Exception as exc:
+                logger.warning(f"{file.name} skipped: {exc}")
+        return texts
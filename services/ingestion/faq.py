@@ -0,0 +1,57 @@
+"""
+Question / answer pairs for the FAQ fast path, detected in the paragraphs of
+each file as extracted (before dedup). Three shapes are recognised:
+
+• a question paragraph (ending in "?") followed by its answer paragraph(s);
+• a paragraph opening with a question and answering it inline
+  ("Does this plan provide Minimum Essential Coverage? Yes ...");
+• an eligibility rule, "If <condition>, you will / can / ... <outcome>", as in
+  the medical-questions document: the condition is the question and the whole
+  rule the answer.
+
+Everything else only goes to the main index, as before.
+"""
+import re
+from typing import List
+
+from models.vectordb_models import DocumentChunk, FaqEntry
+
+_QUESTION_PREFIX = re.compile(r"^\s*(?:Q|Question)\s*[:.)-]\s*", re.IGNORECASE)
+_ANSWER_PREFIX = re.compile(r"^\s*(?:A|Answer)\s*[:.)-]\s*", re.IGNORECASE)
+_INLINE = re.compile(r"^(?P<question>[A-Z][^?\n]{10,200}\?)[ \t]+(?P<answer>\S.{10,})$", re.DOTALL)
+_RULE = re.compile(
+    r"^If (?P<condition>.{10,}?),\s*(?P<outcome>you(?:'ll|’ll| will| can| cannot| may| must| are| should| would)\b.+)$",
+    re.IGNORECASE | re.DOTALL,
+)
+MAX_QUESTION_CHARS = 600
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _is_question(text: str) -> bool:
+    return text.endswith("?") and len(text) <= MAX_QUESTION_CHARS
+
+
+def detect_faq(paragraphs: List[DocumentChunk]) -> List[FaqEntry]:
+    """FAQ entries found in one file's paragraphs (in document order)."""
+    entries: List[FaqEntry] = []
+    texts = [_clean(p.text) for p in paragraphs]
+    i = 0
+    while i < len(paragraphs):
+        chunk, text = paragraphs[i], _QUESTION_PREFIX.sub("", texts[i])
+        entry = dict(source=chunk.source, page=chunk.page, plan=chunk.plan)
+        if _is_question(text):
+            answer = []
+            while i + 1 < len(paragraphs) and not _is_question(_QUESTION_PREFIX.sub("", texts[i + 1])):
+                i += 1
+                answer.append(_ANSWER_PREFIX.sub("", texts[i]))
+            if answer:
+                entries.append(FaqEntry(question=text, answer="\n\n".join(answer), **entry))
+        elif match := _INLINE.match(chunk.text.strip()):
+            entries.append(FaqEntry(question=_clean(match["question"]), answer=_clean(match["answer"]), **entry))
+        elif (match := _RULE.match(text)) and len(match["condition"]) <= MAX_QUESTION_CHARS:
+            entries.append(FaqEntry(question=f"What if {_clean(match['condition'])}?", answer=text, **entry))
+        i += 1
+    return entries
@@ -0,0 +1,289 @@
+"""
+Checkpointed ingestion job: folder -> chunks -> dedup -> embeddings -> Pinecone,
+one batch at a time, recording every finished batch so a crashed or partially
+failed run can be resumed without redoing work.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from models.vectordb_models import BenefitRow, DocumentChunk, FaqEntry, IngestionConfig
+from services.benefits import BenefitTable
+from services.ingestion.checkpoints import CheckpointStore, DONE, FAILED
+from services.ingestion.dedup import ChunkDeduplicator
+from services.ingestion.extractors import DocumentExtractor, SUPPORTED_SUFFIXES
+from services.ingestion.faq import detect_faq
+from services.ingestion.page_cache import ParsedPageCache, file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+def chunks_digest(chunks: List[Tuple[int, DocumentChunk]]) -> str:
+    """Digest of what a file contributes after dedup, so a change in merged metadata redoes the file."""
+    payload = json.dumps([(i, c.model_dump()) for i, c in chunks], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def faq_digest(entries: List[FaqEntry]) -> str:
+    payload = json.dumps([e.model_dump() for e in entries], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def default_job_id(folder: Path, namespace: str) -> str:
+    """Same folder + namespace => same job, so re-running the command resumes it."""
+    return hashlib.sha1(f"{folder}|{namespace}".encode()).hexdigest()[:12]
+
+
+class IngestionProgress:
+    """Files / chunks done, embedding throughput of this run and an ETA."""
+
+    def __init__(self, files_total: int):
+        self.files_total = files_total
+        self.files_done = 0
+        self.files_seen = 0
+        self.chunks_known = 0      # chunks of files extracted (or checkpointed) so far
+        self.chunks_done = 0       # embedded now or in an earlier run
+        self.embedded = 0          # embedded by this run
+        self._started = time.perf_counter()
+
+    def add_file(self, chunks: int) -> None:
+        self.files_seen += 1
+        self.chunks_known += chunks
+
+    def embeddings_per_second(self) -> float:
+        elapsed = time.perf_counter() - self._started
+        return self.embedded / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.embeddings_per_second()
+        if not rate:
+            return None
+        # files not extracted yet are assumed to be as large as the average so far
+        avg = self.chunks_known / self.files_seen if self.files_seen else 0
+        remaining = self.chunks_known - self.chunks_done + avg * (self.files_total - self.files_seen)
+        return max(remaining, 0) / rate
+
+    def snapshot(self) -> Dict:
+        eta = self.eta_seconds()
+        return {
+            "files": f"{self.files_done}/{self.files_total}",
+            "chunks": f"{self.chunks_done}/{self.chunks_known}",
+            "embedded_this_run": self.embedded,
+            "embeddings_per_s": round(self.embeddings_per_second(), 1),
+            "eta_s": round(eta, 1) if eta is not None else None,
+        }
+
+    def log(self) -> None:
+        s = self.snapshot()
+        eta = f"{s['eta_s']:.0f}s" if s["eta_s"] is not None else "?"
+        logger.info(f"files {s['files']} · chunks {s['chunks']} · {s['embeddings_per_s']} emb/s · ETA {eta}")
+
+
+class IngestionJob:
+    """
+    Runs (or resumes) one ingestion job.
+
+    • All files are extracted first and near-duplicate chunks across them are folded
+      into one (ChunkDeduplicator); each file then ingests only the chunks it keeps.
+    • Files whose hash (and deduplicated content) matches a completed checkpoint are skipped.
+    • Within a file only batches without a `done` checkpoint are embedded and upserted.
+    • Vector ids are derived from the file hash and chunk index, so re-upserting a
+      batch that was in flight during a crash overwrites instead of duplicating.
+    • The ids written for each file are checkpointed; once a changed file is fully
+      re-ingested, the vectors of its previous version are deleted.
+    • A batch that still fails after `max_attempts` is recorded as failed and the
+      job moves on; the next run retries just those batches.
+    • With a `faq_namespace`, question / answer pairs found in the paragraphs are
+      indexed there as well (rebuilt whole when they change).
+    • With a `benefits_path`, the benefit rows parsed from the tables replace the
+      benefits table there (services.benefits); the API reloads it on change.
+    """
+
+    FAQ_KEY = "<faq index>"  # checkpoint key of the FAQ index; never a file name
+
+    def __init__(self, vector_db, namespace: str, config: IngestionConfig,
+                 extractor: Optional[DocumentExtractor] = None, store: Optional[CheckpointStore] = None,
+                 faq_namespace: Optional[str] = None):
+        self.vector_db = vector_db
+        self.namespace = namespace
+        self.faq_namespace = faq_namespace if config.faq else None
+        self.config = config
+        self.extractor = extractor or DocumentExtractor(
+            page_cache=ParsedPageCache(config.page_cache_path) if config.page_cache_path else None)
+        self.store = store or CheckpointStore(config.checkpoint_path)
+
+    async def run(self, folder: Path, job_id: Optional[str] = None, restart: bool = False) -> Dict:
+        job_id = job_id or default_job_id(folder, self.namespace)
+        if restart:
+            self.store.reset_job(job_id)
+        resumed = self.store.start_job(job_id, str(folder), self.namespace)
+        files = [f for f in sorted(folder.iterdir()) if f.is_file() and f.suffix.lower() in SUPPORTED_SUFFIXES]
+        logger.info(f"{'Resuming' if resumed else 'Starting'} ingestion job {job_id}: {len(files)} files")
+
+        extracted = [await self._extract(file) for file in files]
+        kept, dedup_report = self._deduplicate([chunks or [] for _, chunks, _ in extracted])
+
+        progress = IngestionProgress(len(files))
+        complete = True
+        for (file, chunks, _), file_chunks in zip(extracted, kept):
+            if chunks is None:
+                progress.add_file(0)  # unreadable files are skipped, as before, not retried forever
+            else:
+                complete &= await self._ingest_file(job_id, file, file_chunks, progress, extracted=len(chunks))
+            progress.files_done += 1
+            progress.log()
+        if self.faq_namespace:
+            complete &= await self._ingest_faq(job_id, [chunks or [] for _, chunks, _ in extracted])
+        if self.config.benefits_path:
+            rows = [row for _, _, benefits in extracted for row in benefits]
+            BenefitTable.write(self.config.benefits_path, rows)
+            logger.info(f"Benefits table: {len(rows)} rows written to {self.config.benefits_path}")
+
+        status = "completed" if complete else "incomplete"
+        self.store.finish_job(job_id, status)
+        summary = {**self.store.summary(job_id), "progress": progress.snapshot(), "dedup": dedup_report}
+        if not complete:
+            logger.warning(f"Job {job_id} incomplete: {len(summary['failed'])} failed batches; "
+                           f"re-run to retry them")
+        return summary
+
+    async def dedup_report(self, folder: Path) -> Dict:
+        """Extract and deduplicate `folder` without embedding anything."""
+        files = [f for f in sorted(folder.iterdir()) if f.is_file() and f.suffix.lower() in SUPPORTED_SUFFIXES]
+        extracted = [await self._extract(file) for file in files]
+        return self._deduplicate([chunks or [] for _, chunks, _ in extracted])[1]
+
+    # ------------------------ extraction + dedup ------------------------ #
+    async def _extract(self, file: Path) -> Tuple[Path, Optional[List[DocumentChunk]], List[BenefitRow]]:
+        try:
+            return file, *await asyncio.to_thread(self.extractor.extract_document, file)
+        except Exception as exc:
+            logger.warning(f"{file.name} skipped: {exc}")
+            return file, None, []
+
+    def _deduplicate(self, per_file: List[List[DocumentChunk]]
+                     ) -> Tuple[List[List[Tuple[int, DocumentChunk]]], Optional[Dict]]:
+        """Per file, the (index in file, chunk) pairs it still ingests once duplicates are folded."""
+        if not self.config.dedup:
+            return [list(enumerate(chunks)) for chunks in per_file], None
+        flat = [(f, i) for f, chunks in enumerate(per_file) for i in range(len(chunks))]
+        merged, report = ChunkDeduplicator(self.config.dedup_threshold).deduplicate(
+            [per_file[f][i] for f, i in flat])
+        kept: List[List[Tuple[int, DocumentChunk]]] = [[] for _ in per_file]
+        for (f, i), chunk in zip(flat, merged):
+            if chunk is not None:
+                kept[f].append((i, chunk))
+        return kept, report
+
+    # ------------------------ per file --------------------------------- #
+    async def _ingest_file(self, job_id: str, file: Path, chunks: List[Tuple[int, DocumentChunk]],
+                           progress: IngestionProgress, extracted: int = 0) -> bool:
+        """`chunks` are the (index, chunk) pairs dedup kept out of the `extracted` ones."""
+        key = file.name
+        sha = file_sha256(file)
+        # new extractor output or a different dedup outcome => file is redone
+        fingerprint = f"{sha}:v{self.extractor.VERSION}:{chunks_digest(chunks)}"
+        checkpoint = self.store.file(job_id, key)
+        if checkpoint and checkpoint["sha256"] == fingerprint and checkpoint["status"] == DONE:
+            progress.add_file(checkpoint["chunks"])
+            progress.chunks_done += checkpoint["chunks"]
+            logger.info(f"{key}: unchanged and already ingested, skipped")
+            return True
+
+        size = self.config.batch_size
+        batches = math.ceil(len(chunks) / size)
+        self.store.start_file(job_id, key, fingerprint, len(chunks), batches)
+        progress.add_file(len(chunks))
+        done = self.store.done_batches(job_id, key)
+
+        # ids keep the chunk's position in the file, so they stay stable whatever dedup folds away
+        ids = [f"{sha[:16]}-{i}" for i, _ in chunks]
+        ok = True
+        for batch in range(batches):
+            batch_chunks = [chunk for _, chunk in chunks[batch * size:(batch + 1) * size]]
+            if batch in done:
+                progress.chunks_done += len(batch_chunks)
+                continue
+            batch_ids = ids[batch * size:(batch + 1) * size]
+            if await self._ingest_batch(job_id, key, batch, batch_ids, batch_chunks):
+                self.store.record_vectors(job_id, key, batch_ids)
+                progress.chunks_done += len(batch_chunks)
+                progress.embedded += len(batch_chunks)
+                progress.log()
+            else:
+                ok = False
+
+        if ok:
+            # chunks now folded into another's representative may have been upserted on an
+            # earlier run (possibly before ids were recorded): their ids are known, delete them too
+            folded = {f"{sha[:16]}-{i}" for i in range(extracted)} - set(ids)
+            ok = await self._delete_stale(job_id, key, set(ids), folded)
+        self.store.finish_file(job_id, key, DONE if ok else FAILED)
+        return ok
+
+    async def _delete_stale(self, job_id: str, key: str, current: set, folded: set = frozenset()) -> bool:
+        """
+        Delete the vectors an earlier version of the file wrote that this one did not
+        (a changed file gets new ids), and those of its `folded` duplicates. Only once
+        the new version is fully upserted, so retrieval never finds the document missing.
+        """
+        stale = sorted((self.store.vector_ids(job_id, key) | folded) - current)
+        if not stale:
+            return True
+        try:
+            await self.vector_db.delete_ids(stale, namespace=self.namespace)
+        except Exception as exc:
+            logger.error(f"{key}: deleting {len(stale)} stale or folded vectors failed: {exc}")
+            return False
+        self.store.forget_vectors(job_id, key, stale)
+        logger.info(f"{key}: deleted {len(stale)} stale or folded vectors")
+        return True
+
+    # ------------------------ FAQ index -------------------------------- #
+    async def _ingest_faq(self, job_id: str, per_file: List[List[DocumentChunk]]) -> bool:
+        """Rebuild the FAQ namespace from the detected pairs, unless they are unchanged since the last run."""
+        entries = [e for chunks in per_file for e in detect_faq([c for c in chunks if c.kind == "paragraph"])]
+        fingerprint = f"faq:{faq_digest(entries)}"
+        checkpoint = self.store.file(job_id, self.FAQ_KEY)
+        if checkpoint and checkpoint["sha256"] == fingerprint and checkpoint["status"] == DONE:
+            logger.info(f"FAQ index unchanged ({len(entries)} questions), skipped")
+            return True
+
+        self.store.start_file(job_id, self.FAQ_KEY, fingerprint, len(entries), 1)
+        await self.vector_db.delete_namespace(namespace=self.faq_namespace)  # drop questions that went away
+        ok = True
+        if entries:
+            ids = [f"faq-{hashlib.sha1(f'{e.source}|{e.question}'.encode()).hexdigest()[:16]}" for e in entries]
+            ok = await self._ingest_batch(job_id, self.FAQ_KEY, 0, ids, entries, namespace=self.faq_namespace)
+        self.store.finish_file(job_id, self.FAQ_KEY, DONE if ok else FAILED)
+        logger.info(f"FAQ index: {len(entries)} questions in namespace '{self.faq_namespace}'")
+        return ok
+
+    # ------------------------ per batch -------------------------------- #
+    async def _ingest_batch(self, job_id: str, key: str, batch: int, ids: List[str],
+                            chunks: List[Union[DocumentChunk, FaqEntry]], namespace: Optional[str] = None) -> bool:
+        texts = [c.question if isinstance(c, FaqEntry) else c.text for c in chunks]
+        for attempt in range(1, self.config.max_attempts + 1):
+            try:
+                embeddings = await self.vector_db.embed_texts(texts, concurrency=self.config.embed_concurrency)
+                vectors = [self.vector_db.to_vector(i, t, e, c.metadata())
+                           for i, t, c, e in zip(ids, texts, chunks, embeddings)]
+                report = await self.vector_db.upsert_all(vectors, namespace=namespace or self.namespace)
+                if report["failed_ids"]:
+                    raise Exception(f"{len(report['failed_ids'])} vectors not upserted: {report['errors'][:3]}")
+                self.store.record_batch(job_id, key, batch, DONE, attempt)
+                return True
+            except Exception as exc:
+                if attempt == self.config.max_attempts:
+                    logger.error(f"{key} batch {batch} failed after {attempt} attempts: {exc}")
+                    self.store.record_batch(job_id, key, batch, FAILED, attempt, str(exc)[:500])
+                    return False
+                delay = self.config.retry_backoff_seconds * 2 ** (attempt - 1)
+                logger.warning(f"{key} batch {batch} attempt {attempt} failed, retrying in {delay}s: {exc}")
+                await asyncio.sleep(delay)
+        return False
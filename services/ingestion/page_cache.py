@@ -0,0 +1,52 @@
+"""
+Parsed PDF pages on disk, keyed by file hash: parsing (layout analysis and
+table detection) is most of a PDF's extraction time, and re-running ingestion
+over a folder parses every unchanged file again. One gzip JSON file per
+document and parser version; a changed file has a new hash and is parsed anew.
+"""
+import gzip
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+
+from models.vectordb_models import ParsedPage
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParsedPageCache:
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+
+    def _file(self, sha: str, version: int) -> Path:
+        return self.path / f"{sha}.v{version}.json.gz"
+
+    def get(self, sha: str, version: int) -> Optional[List[ParsedPage]]:
+        try:
+            data = orjson.loads(gzip.decompress(self._file(sha, version).read_bytes()))
+        except FileNotFoundError:
+            return None
+        except Exception as exc:  # truncated or from an incompatible build: parse again
+            logger.warning(f"Ignoring unreadable page cache entry {sha[:12]}: {exc}")
+            return None
+        return [ParsedPage.model_validate(page) for page in data]
+
+    def put(self, sha: str, version: int, pages: List[ParsedPage]) -> None:
+        """Store `pages` (atomically, so a concurrent run never reads half a file)."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self._file(sha, version)
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(gzip.compress(orjson.dumps([p.model_dump() for p in pages]), compresslevel=5))
+        os.replace(tmp, target)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Optional
+
+from langchain_core.messages import AIMessage
+
+from models.ai_processing_models import LLMCacheConfig
+from services.cache.base import CacheBackend
+
+logger = logging.getLogger(__name__)
+SHARED_NAMESPACE = "llm"
+
+
+class _DiskTier:
+    """
+    Tiny sqlite-backed key/value store shared by every worker on the host.
+    The cache is optional: a locked or corrupt database is a miss, or a skipped write.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, content TEXT, latency REAL, expires_at REAL)"
+        )
+
+    def get(self, key: str) -> Optional[tuple]:
+        try:
+            row = self._conn.execute(
+                "SELECT content, latency, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[2] < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache read failed: {e}")
+            return None
+        return row
+
+    def set(self, key: str, content: str, latency: float, expires_at: float) -> None:
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                (key, content, latency, expires_at),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache write failed: {e}")
+
+
+class LLMResponseCache:
+    """
+    Prompt-hash keyed cache in front of the chat model.
+
+    • Memory tier: LRU bounded by `max_entries`.
+    • Disk tier (optional): sqlite file, consulted on memory misses.
+    • Shared tier (optional): a cache backend other workers see (shm / resp),
+      consulted after the disk tier.
+    • Keys include the deployment name and API version, so a model rollout
+      never serves answers produced by the previous deployment.
+    """
+
+    def __init__(self, config: LLMCacheConfig, deployment: str, api_version: str,
+                 backend: Optional[CacheBackend] = None):
+        self.config = config
+        # a per-process backend would only duplicate the memory tier
+        self._shared = backend if backend is not None and backend.shared else None
+        self._namespace = f"{deployment}|{api_version}"
+        self._memory: OrderedDict[str, tuple] = OrderedDict()
+        self._disk = self._open_disk(config.disk_path) if config.disk_path else None
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "latency_saved_s": 0.0})
+
+    # ------------------------ public API ------------------------------- #
+    def key(self, node: str, messages: list) -> str:
+        payload = json.dumps(
+            [self._namespace, node, [(m.type, m.content) for m in messages]],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_call(
+        self,
+        node: str,
+        messages: list,
+        call: Callable[[], Awaitable[AIMessage]],
+        bypass: bool = False,
+    ) -> AIMessage:
+        ttl = self.config.node_ttl_seconds.get(node, self.config.default_ttl_seconds)
+        if bypass or not self.config.enabled or ttl <= 0:
+            return await call()
+
+        key = self.key(node, messages)
+        hit = self._lookup(key)
+        if hit is not None:
+            content, latency = hit
+            stats = self._stats[node]
+            stats["hits"] += 1
+            stats["latency_saved_s"] += latency
+            return AIMessage(content=content)
+
+        self._stats[node]["misses"] += 1
+        started = time.monotonic()
+        response = await call()
+        latency = time.monotonic() - started
+        self._store(key, response.content, latency, time.time() + ttl)
+        return response
+
+    def stats(self) -> dict:
+        per_node = {}
+        for node, s in self._stats.items():
+            total = s["hits"] + s["misses"]
+            per_node[node] = {
+                "hits": s["hits"],
+                "misses": s["misses"],
+                "hit_rate": round(s["hits"] / total, 4) if total else 0.0,
+                "latency_saved_ms": round(1000 * s["latency_saved_s"], 1),
+            }
+        return {"entries": len(self._memory), "nodes": per_node}
+
+    # ------------------------ internals -------------------------------- #
+    @staticmethod
+    def _open_disk(path: str) -> Optional[_DiskTier]:
+        try:
+            return _DiskTier(path)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM disk cache at {path} unusable, running without it: {e}")
+            return None
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            content, latency, expires_at = entry
+            if expires_at >= time.time():
+                self._memory.move_to_end(key)
+                return content, latency
+            del self._memory[key]
+
+        if self._disk is not None:
+            row = self._disk.get(key)
+            if row is not None:
+                self._remember(key, row)
+                return row[0], row[1]
+
+        if self._shared is not None:
+            hit = self._shared.get(SHARED_NAMESPACE, key)
+            if hit is not None:
+                content, latency, expires_at = hit
+                self._remember(key, (content, latency, expires_at))
+                return content, latency
+        return None
+
+    def _store(self, key: str, content: str, latency: float, expires_at: float) -> None:
+        self._remember(key, (content, latency, expires_at))
+        if self._disk is not None:
+            self._disk.set(key, content, latency, expires_at)
+        if self._shared is not None:
+            self._shared.set(SHARED_NAMESPACE, key, [content, latency, expires_at],
+                             ttl=expires_at - time.time())
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.config.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from models.ai_processing_models import LLMSchedulerConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# rough chars-per-token ratio for English prompts (good enough for budgeting)
+CHARS_PER_TOKEN = 4
+
+
+class Priority(IntEnum):
+    """Scheduling lanes – lower value is served first."""
+    INTERACTIVE = 0   # user is waiting on this (reply generation)
+    DEFAULT = 1
+    BACKGROUND = 2    # grading / housekeeping
+
+
+def estimate_tokens(messages) -> int:
+    """Cheap prompt-size estimate; avoids running a tokenizer on the hot path."""
+    chars = sum(len(getattr(m, "content", m) or "") for m in messages)
+    return max(1, chars // CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    The level may go negative when actual usage is reconciled after a call.
+    """
+
+    def __init__(self, rate_per_minute: int, capacity: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 when available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Charge (+) or refund (-) tokens once real usage is known."""
+        self._refill()
+        self._level = min(self.capacity, self._level - delta)
+
+
+class LLMScheduler:
+    """
+    Shared gate in front of the chat model.
+
+    • Caps concurrent in-flight calls.
+    • Budgets requests-per-minute and tokens-per-minute with token buckets.
+    • Serves waiters strictly by priority lane, FIFO inside a lane.
+    • Backs off globally when the upstream answers 429.
+    """
+
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, config: LLMSchedulerConfig):
+        self.config = config
+        self._tokens = TokenBucket(config.tokens_per_minute)
+        self._requests = TokenBucket(config.requests_per_minute)
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # metrics
+        self._completed = 0
+        self._rate_limited = 0
+        self._waits: dict[str, deque] = {p.name: deque(maxlen=self.WAIT_SAMPLES) for p in Priority}
+
+    # ------------------------ public API ------------------------------- #
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        *,
+        estimated_tokens: int,
+        priority: Priority = Priority.DEFAULT,
+    ) -> T:
+        """Wait for a slot and budget, then execute `call`."""
+        cost = estimated_tokens + self.config.expected_completion_tokens
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), cost, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot was granted just before cancellation – hand it back
+                self._release()
+            raise
+        self._waits[priority.name].append(time.monotonic() - enqueued)
+
+        try:
+            result = await call()
+        except Exception as exc:
+            if getattr(exc, "status_code", None) == 429:
+                self._rate_limited += 1
+                self._pause(self._retry_after(exc))
+            raise
+        finally:
+            self._release()
+
+        usage = getattr(result, "usage_metadata", None) or {}
+        if usage.get("total_tokens"):
+            self._tokens.adjust(usage["total_tokens"] - cost)
+        self._completed += 1
+        return result
+
+    def stats(self) -> dict:
+        depth = {p.name: 0 for p in Priority}
+        for prio, _, _, future in self._queue:
+            if not future.done():
+                depth[Priority(prio).name] += 1
+        waits = {}
+        for lane, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[lane] = {
+                "samples": len(ordered),
+                "avg_ms": round(1000 * sum(ordered) / len(ordered), 2) if ordered else 0.0,
+                "p95_ms": round(1000 * ordered[int(0.95 * (len(ordered) - 1))], 2) if ordered else 0.0,
+                "max_ms": round(1000 * ordered[-1], 2) if ordered else 0.0,
+            }
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": depth,
+            "wait_time": waits,
+            "completed": self._completed,
+            "rate_limited": self._rate_limited,
+        }
+
+    # ------------------------ internals -------------------------------- #
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM rate limited upstream, pausing dispatch for {seconds:.1f}s")
+
+    @staticmethod
+    def _retry_after(exc: Exception) -> float:
+        response = getattr(exc, "response", None)
+        try:
+            return float(response.headers.get("retry-after", 1))
+        except (AttributeError, TypeError, ValueError):
+            return 1.0
+
+    def _dispatch(self) -> None:
+        """Grant slots to queued waiters while concurrency and budgets allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue and self._in_flight < self.config.max_concurrency:
+            _, _, cost, future = self._queue[0]
+            if future.done():  # waiter was cancelled
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self._requests.time_until(1),
+                self._tokens.time_until(cost),
+            )
+            if wait > 0:
+                # head of the highest lane is blocked – nobody may jump ahead of it
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._queue)
+            self._requests.consume(1)
+            self._tokens.consume(cost)
+            self._in_flight += 1
+            future.set_result(None)
@@ -0,0 +1,68 @@
+"""
+Retention for the `messages` collection.
+
+Hot messages stay in `messages`; everything older than `hot_days` (except each
+user's newest `min_hot_messages`) is moved, oldest first, into compressed
+per-user batches in `message_archive` (mode "archive") or dropped (mode
+"delete"). That keeps `messages` and its (user_id, timestamp, id) index at the
+size of the recent working set. The history endpoint reads through to the
+archive when paging back past the hot messages.
+
+Each batch is written before its hot copies are deleted and is keyed by its
+id range, so a run that stops halfway can simply be run again.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import orjson
+
+from dao.message_archive_dao import MessageArchiveDAO
+from dao.message_dao import MessageDAO
+from models.ai_processing_models import RetentionConfig
+
+logger = logging.getLogger(__name__)
+
+
+class MessageArchiver:
+    def __init__(self, config: RetentionConfig, message_dao: MessageDAO, archive_dao: MessageArchiveDAO):
+        self.config = config
+        self.message_dao = message_dao
+        self.archive_dao = archive_dao
+
+    def run(self, now: Optional[datetime] = None, dry_run: bool = False) -> Dict:
+        """Move (or delete) every message past the retention window; returns a report."""
+        started = time.perf_counter()
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.config.hot_days)
+        report = {"mode": self.config.mode, "cutoff": cutoff.isoformat(), "dry_run": dry_run,
+                  "users": 0, "messages": 0, "batches": 0, "raw_bytes": 0, "archived_bytes": 0}
+
+        for user_id in self.message_dao.users_with_messages_before(cutoff):
+            moved, after = 0, None
+            while True:
+                batch = self.message_dao.get_archivable(user_id, cutoff, keep=self.config.min_hot_messages,
+                                                        limit=self.config.batch_size, after=after)
+                if not batch:
+                    break
+                report["raw_bytes"] += len(orjson.dumps(batch))
+                if dry_run:
+                    after = (batch[-1]["timestamp"], batch[-1]["id"])  # nothing is deleted: walk on
+                else:
+                    if self.config.mode == "archive":
+                        report["archived_bytes"] += self.archive_dao.store_batch(
+                            user_id, batch, ttl_days=self.config.archive_ttl_days)
+                    self.message_dao.delete_messages(user_id, [m["id"] for m in batch])
+                report["batches"] += 1
+                moved += len(batch)
+                if len(batch) < self.config.batch_size:
+                    break
+            if moved:
+                report["users"] += 1
+                report["messages"] += moved
+
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        logger.info(f"Retention ({self.config.mode}{', dry run' if dry_run else ''}): {report['messages']} messages "
+                    f"of {report['users']} users older than {cutoff:%Y-%m-%d} in {report['batches']} batches, "
+                    f"{report['raw_bytes'] / 1e6:.1f} MB -> {report['archived_bytes'] / 1e6:.1f} MB")
+        return report
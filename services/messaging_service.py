@@ -1,13 +1,25 @@
 # backend/services/message_service.py
+import base64
+import binascii
+from collections import deque
 from datetime import datetime
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from fastapi import HTTPException
 
 from dao.message_dao import MessageDAO
+from dao.message_archive_dao import MessageArchiveDAO
 from models.message_model import Message, MessageInDB
-from models.ai_processing_models import MessageRecommendationContext, MessageAnalysis
+from models.ai_processing_models import MessageRecommendationContext, MessageAnalysis, DeadlineConfig
+from models.user_model import UserInDB
 from dao.user_dao import UserDAO
-from services.ai_processing_service import DMAIService
+from services.ai_processing_service import DMAIService, BEST_EFFORT_REPLY
+from services.deadline import Deadline, DeadlineExceeded
+from services.faq_service import FaqService
+from services.benefits import BenefitService
+from services.tenants import tenant_of
+from services.cache.base import CacheBackend
+from services.user_service import USERS_NAMESPACE, cacheable_user, shared_cache
+from services.stage_metrics import stage_metrics
 
 
 class MessageService:
@@ -17,10 +29,29 @@ class MessageService:
     • Verifies the user exists via UserDAO.
     • Provides helper to echo-reply (can be swapped for real bot logic).
     """
-    def __init__(self, message_dao: MessageDAO, user_dao: UserDAO, ai_processing_service: DMAIService):
+    def __init__(self, message_dao: MessageDAO, user_dao: UserDAO, ai_processing_service: DMAIService,
+                 deadline_config: Optional[DeadlineConfig] = None,
+                 archive_dao: Optional[MessageArchiveDAO] = None, faq_service: Optional[FaqService] = None,
+                 benefit_service: Optional[BenefitService] = None, cache: Optional[CacheBackend] = None):
         self.message_dao = message_dao
+        self.archive_dao = archive_dao
+        self.faq_service = faq_service
+        self.benefit_service = benefit_service
         self.user_dao = user_dao
+        self.cache = shared_cache(cache)
         self.ai_prcoessing_service = ai_processing_service
+        self.deadline_config = deadline_config or DeadlineConfig()
+
+    def _find_user(self, user_id: int) -> Optional[Dict]:
+        """
+        User document by id; a chat turn looks it up several times, so through the cache.
+        A cached user has no password hash: `password` is empty, as in `get_user_by_email`.
+        """
+        if self.cache is None:
+            return self.user_dao.find_by_id(user_id)
+        user_data = self.cache.get_or_load(USERS_NAMESPACE, f"id:{user_id}",
+                                           lambda: cacheable_user(self.user_dao.find_by_id(user_id)))
+        return {**user_data, "password": ""} if user_data else None
 
     def store_message(
         self,
@@ -28,13 +59,14 @@ class MessageService:
         sender: str,          # 'user' | 'bot'
         user_id: int,
         ts: datetime | None = None,
+        verify_user: bool = True,
     ) -> int:
         # 1. validate sender
         if sender not in {"user", "bot"}:
             raise HTTPException(status_code=400, detail="Invalid sender")
 
-        # 2. verify user exists (optional but nice)
-        if not self.user_dao.find_by_id(user_id):
+        # 2. verify user exists (optional but nice; skipped for an authenticated chat session)
+        if verify_user and not self._find_user(user_id):
             raise HTTPException(status_code=404, detail="User not found")
 
         # 3. persist
@@ -47,17 +79,165 @@ class MessageService:
         return self.message_dao.store_message(msg)
 
     def get_messages(self, user_id: int, limit: int = 20) -> List[MessageInDB]:
-        if not self.user_dao.find_by_id(user_id):
+        if not self._find_user(user_id):
             raise HTTPException(status_code=404, detail="User not found")
 
         return self.message_dao.get_messages(user_id=user_id, limit=limit)
 
+    # ------------------------ history paging ----------------------------- #
+    @staticmethod
+    def encode_cursor(doc: Dict) -> str:
+        """Opaque cursor for a message: url-safe base64 of `<iso timestamp>|<id>`."""
+        raw = f"{doc['timestamp'].isoformat()}|{doc['id']}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            ts, msg_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(ts), int(msg_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+    def get_history_page(
+        self,
+        user_id: int,
+        limit: int = 20,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> Dict:
+        """
+        One page of history as plain dicts (newest → oldest) with cursors:
+        `next_before` pages to older messages (None at the start of history),
+        `next_after` fetches anything newer than this page.
+        """
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+        before_key = self.decode_cursor(before) if before else None
+        after_key = self.decode_cursor(after) if after else None
+        if self.archive_dao is None:
+            docs, has_more = self.message_dao.get_messages_page(
+                user_id=user_id, limit=limit, before=before_key, after=after_key)
+        else:
+            docs, has_more = self._page_with_archive(user_id, limit, before_key, after_key)
+        older_exist = has_more if not after else bool(docs)
+        return {
+            "messages": docs,
+            "next_before": self.encode_cursor(docs[-1]) if older_exist and docs else None,
+            "next_after": self.encode_cursor(docs[0]) if docs else after,
+        }
+
+    def _page_with_archive(self, user_id: int, limit: int, before: Optional[Tuple[datetime, int]],
+                           after: Optional[Tuple[datetime, int]]) -> Tuple[List[Dict], bool]:
+        """
+        Read through to the archive, which only holds messages older than every hot
+        one of the user: going back, archive pages continue where `messages` runs
+        out; going forward (`after`), the archive comes first.
+        """
+        if after is not None:
+            docs, has_more = self.archive_dao.get_messages_page(user_id, limit=limit, after=after)
+            if has_more or len(docs) == limit:
+                return docs, True if has_more else self._hot_after(user_id, after)
+            newer, has_more = self.message_dao.get_messages_page(user_id, limit=limit - len(docs), after=after)
+            return newer + docs, has_more
+
+        docs, has_more = self.message_dao.get_messages_page(user_id, limit=limit, before=before)
+        if has_more:
+            return docs, True
+        boundary = (docs[-1]["timestamp"], docs[-1]["id"]) if docs else before
+        if len(docs) == limit:  # page filled from `messages`: is anything archived further back?
+            return docs, bool(self.archive_dao.get_messages_page(user_id, limit=1, before=boundary)[0])
+        older, has_more = self.archive_dao.get_messages_page(user_id, limit=limit - len(docs), before=boundary)
+        return docs + older, has_more
+
+    def _hot_after(self, user_id: int, after: Tuple[datetime, int]) -> bool:
+        return bool(self.message_dao.get_messages_page(user_id, limit=1, after=after)[0])
+
     async def process_user_message(self, user_id: int, text: str) -> str:
         # Save user's message
-        self.store_message(text=text, sender="user", user_id=user_id)
-        db_rows = self.get_messages(user_id=user_id)
-        history_dicts = [
-            {k: v for k, v in row.model_dump().items() if k != "timestamp"}
+        with stage_metrics.timer("messages.store_user"):
+            self.store_message(text=text, sender="user", user_id=user_id)
+        with stage_metrics.timer("messages.load_history"):
+            db_rows = self.get_messages(user_id=user_id)
+        analysis = await self.run_pipeline(self._find_user(user_id), self._history_dicts(db_rows))
+        reply = analysis.suggested_message_reply
+
+        # Save bot's message
+        with stage_metrics.timer("messages.store_bot"):
+            self.store_message(text=reply, sender="bot", user_id=user_id)
+
+        return reply
+
+    async def run_pipeline(
+        self,
+        user: Union[UserInDB, Dict],
+        history: List[Dict],
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> MessageAnalysis:
+        """
+        Run the chat graph over `history` (newest first) under a fresh request deadline.
+        Always returns an analysis: a best-effort reply if the deadline is hit. A
+        question the benefits table answers exactly, or a confident FAQ match, is
+        answered without running the graph at all (the table first: no embedding needed).
+        """
+        tenant = tenant_of(user)
+        for fast_path in (self.benefit_service, self.faq_service):
+            analysis = await fast_path.answer(history, tenant) if fast_path is not None else None
+            if analysis is not None:
+                if on_token:
+                    await on_token(analysis.suggested_message_reply)
+                return analysis
+        deadline = Deadline(self.deadline_config.request_timeout_seconds)
+        message_context = MessageRecommendationContext(enriched_messages=history, user=user)
+        try:
+            with stage_metrics.timer("graph.total"):
+                # the graph degrades on its own as the budget runs low; this is the backstop
+                return await deadline.run(
+                    self.ai_prcoessing_service.analyse_dm_with_ai(message_context=message_context,
+                                                                  deadline=deadline, on_token=on_token)
+                )
+        except DeadlineExceeded:
+            stage_metrics.skip("graph.total", "timeout")
+            return MessageAnalysis(message_category="unclassified", suggested_message_reply=BEST_EFFORT_REPLY,
+                                   conversation_summary="", factual_consistency="unchecked",
+                                   skipped_stages=["graph"])
+
+    async def reply_to_stored(self, user_id: int, message_id: int,
+                              text: Optional[str] = None) -> Tuple[MessageAnalysis, int]:
+        """
+        Answer a user message stored earlier (asynchronous jobs): history up to and
+        including it, the pipeline, then the bot reply. Returns the analysis and the reply's id.
+        """
+        with stage_metrics.timer("messages.load_history"):
+            stored = self.message_dao.get_message(user_id, message_id)
+            if stored is not None:
+                # the page ending at the stored message, however many the user sent since
+                db_rows, _ = self.message_dao.get_messages_page(
+                    user_id=user_id, before=(stored["timestamp"], message_id + 1))
+            else:  # archived or deleted meanwhile: answer the job's own text
+                db_rows = [{"id": message_id, "text": text or "", "sender": "user", "user_id": user_id}]
+        history = self._history_dicts(db_rows)
+        analysis = await self.run_pipeline(self._find_user(user_id), history)
+        with stage_metrics.timer("messages.store_bot"):
+            reply_id = self.store_message(text=analysis.suggested_message_reply, sender="bot",
+                                          user_id=user_id, verify_user=False)
+        return analysis, reply_id
+
+    def open_session(self, user: UserInDB, history_size: int = 20) -> "ChatSession":
+        """Per-connection chat state for an authenticated user; history is loaded once, here."""
+        with stage_metrics.timer("messages.load_history"):
+            db_rows = self.message_dao.get_messages(user_id=user.user_id, limit=history_size)
+        return ChatSession(self, user, self._history_dicts(db_rows), history_size)
+
+    @staticmethod
+    def _history_dicts(db_rows: List[Union[MessageInDB, Dict]]) -> List[Dict]:
+        return [
+            {k: v for k, v in row.items() if k != "timestamp"}
+            if isinstance(row, dict)
+
+            else {k: v for k, v in row.model_dump().items() if k != "timestamp"}
             if hasattr(row, "model_dump")
 
             else {
@@ -69,13 +249,30 @@ class MessageService:
             for row in db_rows
         ]
 
-        message_context = MessageRecommendationContext(
-            enriched_messages=history_dicts,
-            user=self.user_dao.find_by_id(user_id=user_id)
-        )
-        message_analysis: MessageAnalysis = await self.ai_prcoessing_service.analyse_dm_with_ai(message_context=message_context)
 
-        # Save bot's message
-        self.store_message(text=message_analysis.suggested_message_reply, sender="bot", user_id=user_id)
+class ChatSession:
+    """
+    State for one chat connection: the authenticated user and their recent
+    history (newest first), kept in memory so a turn only stores the two
+    messages and runs the pipeline, with no token decode, user lookup or
+    history reload.
+    """
+
+    def __init__(self, service: MessageService, user: UserInDB, history: List[Dict], history_size: int = 20):
+        self.service = service
+        self.user = user
+        self.history: deque = deque(history, maxlen=history_size)
+
+    async def turn(self, text: str, on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> MessageAnalysis:
+        with stage_metrics.timer("messages.store_user"):
+            self._remember(text, "user")
+        analysis = await self.service.run_pipeline(self.user, list(self.history), on_token=on_token)
+        with stage_metrics.timer("messages.store_bot"):
+            self._remember(analysis.suggested_message_reply, "bot")
+        return analysis
 
-        return message_analysis.suggested_message_reply
+    def _remember(self, text: str, sender: str) -> None:
+        user_id = self.user.user_id
+        msg_id = self.service.store_message(text=text, sender=sender, user_id=user_id, verify_user=False)
+        # same shape (and key order) as _history_dicts, so prompts and cache keys match /process
+        self.history.appendleft({"text": text, "sender": sender, "user_id": user_id, "id": msg_id})
@@ -0,0 +1,50 @@
+"""
+The insurance plans covered by the knowledge base, and how to recognise them
+in file names, classifier output and free text.
+
+Chunks are tagged with a plan id at ingestion time (`plan` metadata); chunks
+that apply to every plan (FAQ, general terms) get `GENERAL_PLAN`.
+"""
+import re
+from typing import Optional
+
+GENERAL_PLAN = "general"
+
+# plan id -> (display name, patterns that identify it on their own)
+PLANS = {
+    "gold_2500": ("Gold 2500", (r"\bgold\b", r"\b2,?500\b")),
+    "bronze_5000": ("Bronze 5000", (r"\bbronze\b",)),
+    "hsa_5000": ("HSA 5000", (r"\bhsa\b",)),
+    "copper_7350": ("Copper 7350", (r"\bcopper\b", r"\b7,?350\b")),
+}
+
+_PATTERNS = {plan_id: [re.compile(p, re.IGNORECASE) for p in patterns] for plan_id, (_, patterns) in PLANS.items()}
+
+
+def detect_plan(text: Optional[str]) -> Optional[str]:
+    """Plan id when exactly one plan is mentioned; None for no plan or a comparison of several."""
+    if not text:
+        return None
+    # "_" counts as a word character, so file names like "5000_Bronze_SOB" are split first
+    text = text.replace("_", " ")
+    found = {plan_id for plan_id, patterns in _PATTERNS.items() if any(p.search(text) for p in patterns)}
+    return found.pop() if len(found) == 1 else None
+
+
+def normalize_plan(value: Optional[str]) -> Optional[str]:
+    """Map classifier output ("Gold 2500", "gold_2500", "none", ...) to a plan id or None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.lower() in PLANS:
+        return value.lower()
+    return detect_plan(value)
+
+
+def plan_name(plan_id: Optional[str]) -> Optional[str]:
+    return PLANS[plan_id][0] if plan_id in PLANS else None
+
+
+def plan_filter(plan_id: str) -> dict:
+    """Metadata pre-filter: chunks of that plan plus the ones that apply to every plan."""
+    return {"plan": {"$in": [plan_id, GENERAL_PLAN]}}
@@ -0,0 +1,230 @@
+"""
+Opt-in sampling profiler for a live worker.
+
+A background thread samples Python stacks every `interval_ms` while a
+capture is active and writes them in folded-stack format (one
+`frame;frame;frame count` line per distinct stack), which flamegraph.pl,
+speedscope and inferno read directly. Two kinds of capture:
+
+• request: one HTTP request, chosen by an admin (`X-Profile: 1` with
+  `X-Admin-Token`) or at random (`sample_rate`). All requests share the event
+  loop thread, so a sample only counts when the task running at that moment
+  belongs to the request: the request's own task, or a task created while it
+  ran (LangGraph runs nodes in tasks of their own). Only on-CPU time on the
+  loop thread is seen; time spent awaiting I/O is not.
+• window: every thread for N seconds (`POST /ops/profiles/window`).
+
+When the profiler is disabled nothing is installed: no middleware, no task
+factory and no sampling thread.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from models.ai_processing_models import ProfilerConfig
+
+logger = logging.getLogger(__name__)
+
+_capture: contextvars.ContextVar[Optional["_Capture"]] = contextvars.ContextVar("profile_capture", default=None)
+_NAME = re.compile(r"^[\w.-]+\.folded$")
+
+
+class _Capture:
+    def __init__(self, kind: str, label: str):
+        slug = re.sub(r"[^\w]+", "_", label).strip("_")[:40] or "root"
+        self.name = f"{time.strftime('%Y%m%dT%H%M%S')}-{kind}-{slug}-{uuid.uuid4().hex[:6]}.folded"
+        self.kind = kind
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+
+class SamplingProfiler:
+    def __init__(self, config: ProfilerConfig):
+        self.config = config
+        self.directory = Path(config.directory)
+        self._active: List[_Capture] = []
+        self._owners: Dict[asyncio.Task, _Capture] = {}  # task -> request capture it works for
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._switch_interval = sys.getswitchinterval()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._labels: Dict[object, str] = {}  # code object -> "function (file:line)"
+
+    # ------------------------ setup ------------------------------------ #
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Install the task factory that lets request captures follow their child tasks."""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):  # `context=` on Python 3.11+
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            capture = _capture.get()
+            if capture is not None:
+                self._owners[task] = capture
+                task.add_done_callback(self._forget)
+            return task
+
+        loop.set_task_factory(factory)
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self._owners.pop(task, None)
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        return bool(self.config.admin_token and token) and secrets.compare_digest(token, self.config.admin_token)
+
+    def wants(self, headers: Dict[str, str]) -> bool:
+        """Profile this request? Asked for by an admin, or picked at `sample_rate`."""
+        if headers.get("x-profile") and self.is_admin(headers.get("x-admin-token")):
+            return True
+        return self.config.sample_rate > 0 and random.random() < self.config.sample_rate
+
+    # ------------------------ captures --------------------------------- #
+    @contextmanager
+    def profile_request(self, label: str):
+        """Capture the current task (and the tasks it starts) for the duration of the block."""
+        capture = _Capture("request", label)
+        task = asyncio.current_task()
+        token = _capture.set(capture)
+        self._owners[task] = capture
+        self._start(capture)
+        try:
+            yield capture
+        finally:
+            self._owners.pop(task, None)
+            _capture.reset(token)
+            self._finish(capture)
+
+    async def profile_window(self, seconds: float) -> _Capture:
+        capture = _Capture("window", f"{seconds:g}s")
+        self._start(capture)
+        try:
+            await asyncio.sleep(min(seconds, self.config.max_window_seconds))
+        finally:
+            self._finish(capture)
+        return capture
+
+    def list(self) -> List[dict]:
+        if not self.directory.is_dir():
+            return []
+        files = sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [{"name": p.name, "bytes": p.stat().st_size,
+                 "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(p.stat().st_mtime))}
+                for p in files]
+
+    def path(self, name: str) -> Optional[Path]:
+        """Path of a capture by name; None for unknown or malformed names."""
+        if not _NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    # ------------------------ internals -------------------------------- #
+    def _start(self, capture: _Capture) -> None:
+        with self._lock:
+            self._active.append(capture)
+            if self._thread is None:
+                # the sampler only runs when the loop thread hands over the GIL, which busy code does every
+                # switch interval (5 ms by default); shorten it while sampling so CPU bursts are seen
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.config.interval_ms / 1000))
+                self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+                self._thread.start()
+
+    def _finish(self, capture: _Capture) -> None:
+        with self._lock:
+            self._active.remove(capture)
+        self._write(capture)
+
+    def _sample(self) -> None:
+        interval = self.config.interval_ms / 1000
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._thread = None
+                    return
+                captures = list(self._active)
+            frames = sys._current_frames()
+            owner = None
+            if self._loop is not None:
+                running = asyncio.current_task(self._loop)
+                owner = self._owners.get(running) if running is not None else None
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for capture in captures:
+                if capture.kind == "window":
+                    for ident, frame in frames.items():
+                        if ident != own:
+                            self._add(capture, frame, names.get(ident, str(ident)))
+                elif capture is owner and self._loop_thread in frames:
+                    self._add(capture, frames[self._loop_thread])
+            del frames
+            time.sleep(interval)
+
+    def _add(self, capture: _Capture, frame, thread: Optional[str] = None) -> None:
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if thread:
+            stack.append(thread)
+        capture.stacks[";".join(reversed(stack))] += 1
+        capture.samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            parts = Path(code.co_filename).parts[-2:]
+            label = f"{code.co_name} ({'/'.join(parts)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _write(self, capture: _Capture) -> None:
+        if not capture.samples:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {count}" for stack, count in sorted(capture.stacks.items())]
+        (self.directory / capture.name).write_text("\n".join(lines) + "\n")
+        logger.info(f"Profile written: {capture.name} ({capture.samples} samples)")
+        files = sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+        for old in files[:max(0, len(files) - self.config.max_files)]:
+            old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: runs selected HTTP requests under a request capture (see SamplingProfiler.wants)."""
+
+    def __init__(self, app, profiler: Callable[[], SamplingProfiler]):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profiler = self.profiler()
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]
+                   if k in (b"x-profile", b"x-admin-token")}
+        if not profiler.wants(headers):
+            return await self.app(scope, receive, send)
+
+        with profiler.profile_request(f"{scope['method']} {scope['path']}") as capture:
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":  # tell the caller where to find it
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-id", capture.name.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
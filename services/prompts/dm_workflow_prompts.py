@@ -16,32 +16,39 @@ Your task is to:
 Output a valid JSON object with the following fields:
   "category": "POLICY_INQUIRY | GENERAL_INQUIRY | CLAIM_SUPPORT_REQUEST | PARTNERSHIP_OPPORTUNITY | LEAD_GEN | OTHERS | CONVERSATION_RESOLVED",
   "conversation_history_query": A summarisation of what the query is asking by taking the full conversation history in context.
+  "plan": The insurance plan the query is about: "Gold 2500", "Bronze 5000", "HSA 5000" or "Copper 7350". Use "none" when no single plan is identified (general questions, comparisons between plans).
 
 ### Example Outputs:
 
 Example 1:
 "category": "POLICY_INQUIRY",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "Gold 2500"
 
 Example 2:
 "category": "GENERAL_INQUIRY",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "none"
 
 Example 3: 
 "category": "CLAIM_SUPPORT_REQUEST",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "Bronze 5000"
 
 Example 4: 
 "category": "LEAD_GEN",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "none"
 
 Example 5: 
 "category": "PARTNERSHIP_OPPORTUNITY",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "none"
 
 Example 6: 
 "category": "OTHERS",
-"conversation_history_query": The generated summary
+"conversation_history_query": The generated summary,
+"plan": "none"
 
 Ensure the final classification reflects the user’s latest message and the overall context of the conversation history.
 Now classify the following conversation history. Return only the JSON output.
@@ -1,14 +1,21 @@
+import asyncio
+import hashlib
 import logging
 import os
+import struct
 from abc import abstractmethod
 from typing import Iterable, List, Optional, Tuple
 
 from langchain.docstore.document import Document
-from langchain_openai import AzureOpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 
 from helpers import get_env_value
+from services.cache.base import CacheBackend
+from services.cassettes import Cassette, pack_vector, unpack_vector
+from services.deadline import within_deadline
 
 logger = logging.getLogger(__name__)
+EMBEDDINGS_NAMESPACE = "embeddings"
 DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
 AZURE_EMBEDDING_MODEL =get_env_value("AZURE_OPENAI_EMBEDDING_MODEL", default="embedding")
 ENDPOINT = get_env_value("AZURE_OPENAI_ENDPOINT")
@@ -17,15 +24,73 @@ API_KEY = get_env_value("AZURE_OPENAI_API_KEY")
 
 
 class VectorDB:
-    async def create_azure_embedding(self, text, embeddings: AzureOpenAIEmbeddings):
+    cassette: Cassette = Cassette()  # pass-through unless a recording/replaying one is injected
+    _text_key: str = "text"  # metadata field holding the chunk text
+    cache: Optional[CacheBackend] = None  # query embeddings, shared with the other workers when the backend is
+
+    async def create_azure_embedding(self, text, embeddings: Embeddings):
         try:
             input_text = text
-            embedding_vector = await embeddings.aembed_query(input_text)
+            if self.cassette.enabled:
+                embedding_vector = await self.cassette.exchange(
+                    "embedding",
+                    {"text": input_text},
+                    lambda: within_deadline(embeddings.aembed_query(input_text)),
+                    encode=pack_vector,
+                    decode=unpack_vector,
+                )
+            else:
+                embedding_vector = await within_deadline(embeddings.aembed_query(input_text))
             return list(embedding_vector)
         except Exception as e:
             logger.error(f"Error creating embedding: {str(e)}")
         raise
 
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embedding of a search query, through the cache: the same question (or the
+        plan-filter retry of one) is embedded once across workers. Chunk embeddings
+        at ingestion are not cached, and neither is anything while a cassette runs.
+        """
+        if self.cache is None or self.cassette.enabled:
+            return await self.create_azure_embedding(text, embeddings=self.embeddings)
+        model = getattr(self.embeddings, "deployment", None) or getattr(self.embeddings, "model", "")
+        key = hashlib.sha256(f"{model}|{text}".encode("utf-8")).hexdigest()
+        packed = self.cache.get(EMBEDDINGS_NAMESPACE, key)
+        if packed is not None:
+            return list(struct.unpack(f"<{len(packed) // 4}f", packed))
+        vector = await self.create_azure_embedding(text, embeddings=self.embeddings)
+        self.cache.set(EMBEDDINGS_NAMESPACE, key, struct.pack(f"<{len(vector)}f", *vector))
+        return vector
+
+    def to_vector(self, vector_id: str, text: str, embedding: List[float], metadata: Optional[dict] = None) -> dict:
+        metadata = dict(metadata or {})
+        metadata[self._text_key] = text
+        return {"id": vector_id, "values": embedding, "metadata": metadata}
+
+    async def embed_texts(self, texts: List[str], concurrency: int = 8) -> List[List[float]]:
+        """Embed texts with up to `concurrency` requests in flight; order is preserved."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def embed(text: str) -> List[float]:
+            async with semaphore:
+                return await self.create_azure_embedding(text, embeddings=self.embeddings)
+
+        return await asyncio.gather(*(embed(t) for t in texts))
+
+    async def upsert_all(self, vectors: List[dict], namespace: Optional[str] = None) -> dict:
+        """
+        Upsert any number of vectors, reporting ids that never landed. Backends with
+        request limits (Pinecone) override this to split, parallelise and retry.
+        """
+        await self.upsert_vectors(vectors, namespace=namespace)
+        return {"vectors": len(vectors), "requests": 1, "retries": 0, "failed_ids": [], "errors": [],
+                "upserted": len(vectors)}
+
+    def stats(self) -> dict:
+        """Backend-specific runtime counters for /ops/metrics."""
+        return {}
+
     @abstractmethod
     async def ingest_data(
             self,
@@ -49,3 +114,8 @@ class VectorDB:
     async def delete_namespace(self,
         namespace: Optional[str] = None):
         pass
+
+    @abstractmethod
+    async def delete_ids(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        """Delete these vectors; ids not in the namespace are ignored."""
+        pass
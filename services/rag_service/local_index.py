@@ -0,0 +1,400 @@
+"""
+Self-hosted vector index stored as memory-mapped files, with quantized vectors.
+
+Per namespace directory:
+    index.json      dims, dtype, row count
+    vectors.bin     row-major codes: float32, float16, or int8
+    scales.bin      float32 per-vector scale (int8 only): v ≈ code * scale
+    full.bin        float32 originals, read only for rescoring top candidates
+    records.jsonl   one {"id", "metadata"} line per row
+
+Vectors are L2-normalised on write, so a dot product is the cosine similarity.
+The .bin files are opened with np.memmap, so all workers on a host share the
+same page cache instead of each holding its own copy.
+"""
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+
+from models.vectordb_models import LocalIndexConfig
+from services.cache.base import CacheBackend
+from services.cassettes import Cassette
+from services.rag_service.base_vector_db import VectorDB
+from services.rag_service.metadata_filter import matches
+from services.stage_metrics import stage_metrics
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+SCORE_BLOCK_ROWS = 4096  # rows de-quantized at a time while scoring (fits in L2/L3)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Normalised float32 rows -> (codes, per-row scales or None)."""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(DTYPES[dtype]), None
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class QuantizedVectorStore:
+    """
+    One namespace of the index. Single writer (the ingestion job), any number of
+    readers; readers pick up new rows when `index.json` changes.
+    """
+
+    def __init__(self, path: Path, dims: int, dtype: str = "int8", keep_full: bool = True):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {sorted(DTYPES)}")
+        self.path = Path(path)
+        self.dims = dims
+        self.dtype = dtype
+        self.keep_full = keep_full and dtype != "float32"
+        self.count = 0
+        self.ids: List[str] = []
+        self.metadata: List[dict] = []
+        self._row: Dict[str, int] = {}
+        self._codes = self._scales = self._full = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._stamp = None
+        self._stale_records = False
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    # ------------------------ files ------------------------------------ #
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _load(self) -> None:
+        meta_file = self._file("index.json")
+        if not meta_file.exists():
+            return
+        meta = json.loads(meta_file.read_text())
+        if meta["dims"] != self.dims or meta["dtype"] != self.dtype:
+            raise ValueError(f"{self.path} holds {meta['dtype']}/{meta['dims']}d vectors, "
+                             f"not {self.dtype}/{self.dims}d; rebuild it or change the config")
+        self.count = meta["count"]
+        self.keep_full = meta.get("keep_full", False)
+        self.ids, self.metadata = [], []
+        with open(self._file("records.jsonl"), encoding="utf-8") as fh:
+            for line in fh:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.metadata.append(record["metadata"])
+        # rows a crashed write left behind are ignored, and dropped from the file on the next write
+        self._stale_records = len(self.ids) > self.count
+        del self.ids[self.count:], self.metadata[self.count:]
+        self._row = {vid: i for i, vid in enumerate(self.ids)}
+        self._map()
+        self._stamp = meta_file.stat().st_mtime_ns
+
+    def _map(self) -> None:
+        self._masks.clear()
+        if not self.count:
+            self._codes = self._scales = self._full = None
+            return
+        shape = (self.count, self.dims)
+        self._codes = np.memmap(self._file("vectors.bin"), dtype=DTYPES[self.dtype], mode="r", shape=shape)
+        self._scales = (np.memmap(self._file("scales.bin"), dtype=np.float32, mode="r", shape=(self.count,))
+                        if self.dtype == "int8" else None)
+        self._full = (np.memmap(self._file("full.bin"), dtype=np.float32, mode="r", shape=shape)
+                      if self.keep_full else None)
+
+    def refresh(self) -> None:
+        """Re-map if a writer has committed new rows since the last load."""
+        meta_file = self._file("index.json")
+        if meta_file.exists() and meta_file.stat().st_mtime_ns != self._stamp:
+            self._load()
+
+    def _commit(self) -> None:
+        tmp = self._file("index.json.tmp")
+        tmp.write_text(json.dumps({"dims": self.dims, "dtype": self.dtype, "count": self.count,
+                                   "keep_full": self.keep_full}))
+        os.replace(tmp, self._file("index.json"))
+        self._stamp = self._file("index.json").stat().st_mtime_ns
+        self._map()
+
+    # ------------------------ writes ----------------------------------- #
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadatas: List[dict]) -> None:
+        """Overwrite rows whose id exists, append the rest; committed atomically via index.json."""
+        vectors = _normalise(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dims))
+        codes, scales = quantize(vectors, self.dtype)
+
+        existing = [(n, self._row[vid]) for n, vid in enumerate(ids) if vid in self._row]
+        fresh = [n for n, vid in enumerate(ids) if vid not in self._row]
+
+        if existing:
+            src, rows = map(list, zip(*existing))
+            self._write_rows(rows, codes[src], scales[src] if scales is not None else None, vectors[src])
+            for n, row in existing:
+                self.metadata[row] = metadatas[n]
+            self._rewrite_records()
+
+        if fresh:
+            for name, data in (("vectors.bin", codes[fresh]),
+                               ("scales.bin", scales[fresh] if scales is not None else None),
+                               ("full.bin", vectors[fresh] if self.keep_full else None)):
+                if data is not None:
+                    with open(self._file(name), "r+b" if self._file(name).exists() else "wb") as fh:
+                        fh.seek(self.count * data.itemsize * (self.dims if data.ndim == 2 else 1))
+                        fh.write(np.ascontiguousarray(data).tobytes())
+            if self._stale_records:
+                self._rewrite_records()
+            with open(self._file("records.jsonl"), "a", encoding="utf-8") as fh:
+                for n in fresh:
+                    fh.write(json.dumps({"id": ids[n], "metadata": metadatas[n]}, ensure_ascii=False) + "\n")
+            for n in fresh:
+                self._row[ids[n]] = len(self.ids)
+                self.ids.append(ids[n])
+                self.metadata.append(metadatas[n])
+            self.count = len(self.ids)
+
+        self._commit()
+
+    def delete(self, ids: List[str]) -> int:
+        """Drop rows by id, compacting the files; committed atomically via index.json. Returns rows dropped."""
+        gone = {self._row[vid] for vid in ids if vid in self._row}
+        if not gone:
+            return 0
+        keep = np.array([row for row in range(self.count) if row not in gone], dtype=np.int64)
+        for name, data in (("vectors.bin", self._codes), ("scales.bin", self._scales), ("full.bin", self._full)):
+            if data is not None:
+                tmp = self._file(f"{name}.tmp")
+                tmp.write_bytes(np.ascontiguousarray(data[keep]).tobytes())
+                os.replace(tmp, self._file(name))
+        self.ids = [self.ids[row] for row in keep]
+        self.metadata = [self.metadata[row] for row in keep]
+        self._row = {vid: i for i, vid in enumerate(self.ids)}
+        self.count = len(self.ids)
+        self._rewrite_records()
+        self._commit()
+        return len(gone)
+
+    def _write_rows(self, rows: List[int], codes, scales, vectors) -> None:
+        shape = (self.count, self.dims)
+        target = np.memmap(self._file("vectors.bin"), dtype=DTYPES[self.dtype], mode="r+", shape=shape)
+        target[rows] = codes
+        target.flush()
+        if scales is not None:
+            target = np.memmap(self._file("scales.bin"), dtype=np.float32, mode="r+", shape=(self.count,))
+            target[rows] = scales
+            target.flush()
+        if self.keep_full:
+            target = np.memmap(self._file("full.bin"), dtype=np.float32, mode="r+", shape=shape)
+            target[rows] = vectors
+            target.flush()
+
+    def _rewrite_records(self) -> None:
+        tmp = self._file("records.jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for vid, metadata in zip(self.ids, self.metadata):
+                fh.write(json.dumps({"id": vid, "metadata": metadata}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._file("records.jsonl"))
+        self._stale_records = False
+
+    # ------------------------ search ----------------------------------- #
+    def _mask(self, flt: Optional[dict]) -> Optional[np.ndarray]:
+        if not flt:
+            return None
+        key = json.dumps(flt, sort_keys=True)
+        if key not in self._masks:
+            self._masks[key] = np.fromiter((matches(m, flt) for m in self.metadata), dtype=bool, count=self.count)
+        return self._masks[key]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine scores for every row, computed on the compact codes."""
+        out = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCORE_BLOCK_ROWS):
+            block = self._codes[start:start + SCORE_BLOCK_ROWS]
+            scored = block.astype(np.float32, copy=False) @ query
+            if self._scales is not None:
+                scored *= self._scales[start:start + SCORE_BLOCK_ROWS]
+            out[start:start + len(block)] = scored
+        return out
+
+    def search(self, query, top_k: int, flt: Optional[dict] = None,
+               rescore: bool = True, candidates: int = 50) -> List[Tuple[int, float]]:
+        """(row, score) pairs, best first. With `rescore`, the best `candidates` are re-ranked in float32."""
+        if not self.count:
+            return []
+        q = _normalise(np.asarray(query, dtype=np.float32))
+        scores = self.scores(q)
+        mask = self._mask(flt)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        rescore = rescore and self._full is not None
+        n = min(self.count, max(top_k, candidates) if rescore else top_k)
+        rows = np.argpartition(-scores, n - 1)[:n]
+        rows = rows[np.isfinite(scores[rows])]
+        if rescore and len(rows):
+            rows.sort()  # sequential reads from full.bin
+            exact = self._full[rows] @ q
+            order = np.argsort(-exact)[:top_k]
+            return [(int(rows[i]), float(exact[i])) for i in order]
+        order = np.argsort(-scores[rows])[:top_k]
+        return [(int(rows[i]), float(scores[rows[i]])) for i in order]
+
+    def nbytes(self) -> Dict[str, int]:
+        """Bytes on disk / in page cache per component."""
+        sizes = {name: self._file(name).stat().st_size
+                 for name in ("vectors.bin", "scales.bin", "full.bin", "records.jsonl") if self._file(name).exists()}
+        sizes["search_resident"] = sizes.get("vectors.bin", 0) + sizes.get("scales.bin", 0)
+        return sizes
+
+    def resident_bytes(self) -> int:
+        """What keeping this namespace loaded costs: the scanned codes, the metadata held in memory, filter masks."""
+        sizes = self.nbytes()
+        return (sizes["search_resident"] + sizes.get("records.jsonl", 0)
+                + sum(mask.nbytes for mask in self._masks.values()))
+
+
+class LocalVectorDB(VectorDB):
+    """
+    VectorDB over QuantizedVectorStore namespaces, a drop-in for PineconeDB.
+
+    Namespaces (one or two per tenant) are loaded on first use. With
+    `max_resident_mb`, the least recently used ones are dropped when loading
+    another one takes the total above it; they are re-mapped on their next query.
+    """
+
+    def __init__(self, config: LocalIndexConfig, embeddings: Optional[Embeddings] = None,
+                 cassette: Optional[Cassette] = None, cache: Optional[CacheBackend] = None, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.config = config
+        if cassette is not None:
+            self.cassette = cassette
+        self.cache = cache
+        self.root = Path(config.path).expanduser()
+        self._stores: "OrderedDict[str, QuantizedVectorStore]" = OrderedDict()  # least recently used first
+        self._loads = self._evictions = 0
+        if embeddings is None:
+            from langchain_openai import AzureOpenAIEmbeddings
+            from services.rag_service.pinecone import API_KEY, API_VERSION, AZURE_EMBEDDING_MODEL, ENDPOINT
+            embeddings = AzureOpenAIEmbeddings(model=AZURE_EMBEDDING_MODEL, azure_endpoint=ENDPOINT,
+                                               api_key=API_KEY, openai_api_version=API_VERSION)
+        self.embeddings = embeddings
+
+    def store(self, namespace: Optional[str]) -> QuantizedVectorStore:
+        name = namespace or "default"
+        store = self._stores.get(name)
+        if store is None:
+            store = self._stores[name] = QuantizedVectorStore(self.root / name, self.config.dims, self.config.dtype,
+                                                              keep_full=self.config.rescore)
+            self._loads += 1
+            self._evict(keep=name)
+        else:
+            self._stores.move_to_end(name)
+        store.refresh()
+        return store
+
+    def _resident_bytes(self) -> int:
+        return sum(store.resident_bytes() for store in self._stores.values())
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used namespaces (never `keep`) until the loaded ones fit in max_resident_mb."""
+        if self.config.max_resident_mb is None:
+            return
+        budget = self.config.max_resident_mb * 1024 ** 2
+        sizes = {name: store.resident_bytes() for name, store in self._stores.items()}
+        total = sum(sizes.values())
+        for name in list(self._stores):
+            if total <= budget:
+                break
+            if name != keep:
+                del self._stores[name]  # the memmaps are released with the store
+                total -= sizes[name]
+                self._evictions += 1
+                logger.debug(f"Evicted namespace '{name}' ({sizes[name] / 1024 ** 2:.1f} MB)")
+
+    def stats(self) -> dict:
+        return {
+            "namespaces_loaded": len(self._stores),
+            "resident_mb": round(self._resident_bytes() / 1024 ** 2, 2),
+            "max_resident_mb": self.config.max_resident_mb,
+            "loads": self._loads,
+            "evictions": self._evictions,
+        }
+
+    async def upsert_vectors(self, vectors: List[dict], namespace: Optional[str] = None) -> None:
+        self.store(namespace).upsert(
+            [v["id"] for v in vectors],
+            np.asarray([v["values"] for v in vectors], dtype=np.float32),
+            [v.get("metadata") or {} for v in vectors],
+        )
+
+    async def ingest_data(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            namespace: Optional[str] = None,
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [f"{namespace or 'default'}-{self.store(namespace).count + i}" for i in range(len(texts))]
+        embeddings = await self.embed_texts(texts)
+        vectors = [self.to_vector(ids[i], text, embeddings[i], metadatas[i] if metadatas else None)
+                   for i, text in enumerate(texts)]
+        await self.upsert_vectors(vectors, namespace=namespace)
+        return ids
+
+    async def similarity_search_with_score(
+            self,
+            query: str,
+            filter: Optional[dict] = None,
+            namespace: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        with stage_metrics.timer("retrieval.embed_query"):
+            query_vector = await self.embed_query(query)
+        with stage_metrics.timer("retrieval.local_query"):
+            store = self.store(namespace)
+            hits = store.search(query_vector, self.config.top_k, filter,
+                                rescore=self.config.rescore, candidates=self.config.rescore_candidates)
+        docs = []
+        for row, score in hits:
+            metadata = dict(store.metadata[row])
+            text = metadata.pop(self._text_key, "")
+            docs.append((Document(page_content=text, metadata=metadata), score))
+        return docs
+
+    async def delete_namespace(self, namespace: Optional[str] = None) -> None:
+        store = self._stores.pop(namespace or "default", None)
+        shutil.rmtree(store.path if store else self.root / (namespace or "default"), ignore_errors=True)
+        logger.info(f"Namespace '{namespace}' has been successfully deleted.")
+
+    async def delete_ids(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        self.store(namespace).delete(ids)
+
+    async def warm_up(self, embed: bool = False) -> None:
+        """
+        Map every namespace (as many as fit in max_resident_mb) and fault in its
+        compact vectors so the first query is not a cold read.
+        """
+        budget = self.config.max_resident_mb
+        if self.root.is_dir():
+            for path in sorted(self.root.iterdir()):
+                if budget is not None and self._resident_bytes() >= budget * 1024 ** 2:
+                    break
+                if (path / "index.json").exists():
+                    store = self.store(path.name)
+                    if store.count:
+                        store.scores(np.zeros(self.config.dims, dtype=np.float32))
+        if embed:
+            await self.embeddings.aembed_query("warm-up")
+
+    async def aclose(self) -> None:
+        return None
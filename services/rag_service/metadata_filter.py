@@ -0,0 +1,31 @@
+"""Evaluation of Pinecone-style metadata filters against a metadata dict."""
+from typing import Optional
+
+
+def matches(metadata: dict, flt: Optional[dict]) -> bool:
+    """Subset of Pinecone's metadata filter language: implicit AND, $eq, $ne, $in, $nin, $and, $or."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches(metadata, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(metadata, c) for c in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if op == "$eq" and target not in values:
+                return False
+            if op == "$ne" and target in values:
+                return False
+            if op == "$in" and not set(values) & set(target):
+                return False
+            if op == "$nin" and set(values) & set(target):
+                return False
+    return True
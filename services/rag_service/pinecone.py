@@ -1,12 +1,20 @@
+import asyncio
+import hashlib
 import logging
 import uuid
 import aiohttp
-from typing import Iterable, List, Optional, Tuple
+import orjson
+from typing import Dict, Iterable, List, Optional, Tuple
 from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import AzureOpenAIEmbeddings
 
 from services.rag_service.base_vector_db import VectorDB
 from models.vectordb_models import PineconeConfig
+from services.stage_metrics import stage_metrics
+from services.cache.base import CacheBackend
+from services.cassettes import Cassette, pack_vector
+from services.deadline import within_deadline
 
 from helpers import get_env_value
 
@@ -18,12 +26,62 @@ API_VERSION = get_env_value("OPENAI_API_VERSION")
 API_KEY = get_env_value("AZURE_OPENAI_API_KEY")
 
 
+class PineconeError(Exception):
+    """Error answer from Pinecone: an error status, or a 2xx without the expected body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Pinecone returned {status}: {message}")
+        self.status = status
+
+    @property
+    def transient(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+def _json(payload) -> str:
+    return orjson.dumps(payload).decode()
+
+
+def pack_upserts(vectors: List[dict], max_bytes: int, max_vectors: int) -> Tuple[List[List[dict]], List[dict]]:
+    """
+    Greedily pack vectors into requests of at most `max_bytes` serialized (as sent:
+    compact orjson) and `max_vectors` each. Returns the batches and the vectors
+    too large to be sent on their own. An id given more than once is sent once,
+    with its last values: twice in one request Pinecone rejects it or applies it
+    twice, and in two concurrent requests either could land last.
+    """
+    unique = {v["id"]: v for v in vectors}  # first position, last occurrence
+    batches, oversized = [], []
+    batch, size = [], 0
+    for vector in unique.values():
+        vector_size = len(orjson.dumps(vector)) + 1  # + separator
+        if vector_size > max_bytes:
+            oversized.append(vector)
+            continue
+        if batch and (size + vector_size > max_bytes or len(batch) >= max_vectors):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(vector)
+        size += vector_size
+    if batch:
+        batches.append(batch)
+    return batches, oversized
+
+
 class PineconeDB(VectorDB):
-    def __init__(self, config: PineconeConfig, *args, **kwargs) -> None:
+    MAX_DELETE_IDS = 1000  # Pinecone's limit per delete request
+
+    def __init__(self, config: PineconeConfig, embeddings: Optional[Embeddings] = None,
+                 cassette: Optional[Cassette] = None, cache: Optional[CacheBackend] = None, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.config = config
+        if cassette is not None:
+            self.cassette = cassette
+        self.cache = cache
         self._text_key = "text"
-        self.embeddings = AzureOpenAIEmbeddings(
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.embeddings = embeddings or AzureOpenAIEmbeddings(
             model=AZURE_EMBEDDING_MODEL,
             azure_endpoint=ENDPOINT,
             api_key=API_KEY,
@@ -37,24 +95,76 @@ class PineconeDB(VectorDB):
             "Content-Type": "application/json"
         }
 
-    async def _post(self, endpoint: str, payload: dict) -> dict:
+    async def _post(self, endpoint: str, payload: dict, check_status: bool = False) -> dict:
         """
         Send a POST request to a given endpoint on the Pinecone service.
-        Automatically checks for unauthorized responses and returns JSON.
+        Automatically checks for unauthorized responses and returns JSON;
+        with `check_status`, any other error status raises PineconeError.
+        Bounded by the current request's deadline, if any.
         """
+        if self.cassette.enabled and endpoint in ("query", "vectors/upsert"):
+            return await self.cassette.exchange(
+                f"pinecone.{endpoint}",
+                self._cassette_request(payload),
+                lambda: within_deadline(self._http_post(endpoint, payload, check_status)),
+                tag=endpoint,
+            )
+        return await within_deadline(self._http_post(endpoint, payload, check_status))
+
+    @staticmethod
+    def _cassette_request(payload: dict) -> dict:
+        """Compact form of a Pinecone payload: vectors are reduced to a digest / their ids."""
+        request = {k: v for k, v in payload.items() if k not in ("vector", "vectors")}
+        if "vector" in payload:
+            request["vector_sha"] = hashlib.sha256(pack_vector(payload["vector"]).encode()).hexdigest()
+        if "vectors" in payload:
+            request["ids"] = [v["id"] for v in payload["vectors"]]
+        return request
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Shared keep-alive connection pool. A session is bound to the event loop
+        that created it, so a new one is opened if the loop changed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+                json_serialize=_json,  # compact and fast; also what pack_upserts measures
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def _http_post(self, endpoint: str, payload: dict, check_status: bool = False) -> dict:
         url = f"{self.config.base_url}/{endpoint}"
         headers = self._get_headers()
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                logger.debug(f"POST {url} returned status {response.status}")
-                if response.status == 401:
-                    raise Exception("Unauthorized: Check your API key and URL.")
-                try:
-                    return await response.json()
-                except aiohttp.ContentTypeError:
-                    # In some cases, a non-JSON response might be acceptable.
-                    return {}
-        await session.close()
+        async with self._get_session().post(url, headers=headers, json=payload) as response:
+            logger.debug(f"POST {url} returned status {response.status}")
+            if response.status == 401:
+                raise Exception("Unauthorized: Check your API key and URL.")
+            if check_status and response.status >= 400:
+                raise PineconeError(response.status, (await response.text())[:300])
+            try:
+                return await response.json()
+            except aiohttp.ContentTypeError:
+                # In some cases, a non-JSON response might be acceptable.
+                return {}
+
+    async def warm_up(self, embed: bool = False) -> None:
+        """
+        Open the HTTP pool to Pinecone (and optionally the embeddings endpoint) ahead of traffic.
+        Raises unless Pinecone answered with index stats: an error status or an HTML error
+        page must not mark the worker ready.
+        """
+        stats = await self._http_post("describe_index_stats", {}, check_status=True)
+        if not stats:
+            raise PineconeError(200, "describe_index_stats returned no JSON")
+        if embed:
+            await self.embeddings.aembed_query("warm-up")
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
 
     async def delete_namespace(self, namespace: Optional[str] = None) -> None:
         """
@@ -66,16 +176,20 @@ class PineconeDB(VectorDB):
         }
         headers = self._get_headers()
         # POST request to delete vectors and the namespace
-        async with aiohttp.ClientSession() as session:
-            delete_url = f"{self.config.base_url}/vectors/delete"
-            async with session.post(delete_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    logger.info(f"Namespace '{namespace}' has been successfully deleted.")
-                else:
-                    error_msg = await response.text()
-                    logger.error(f"Failed to delete namespace '{namespace}'. Response: {error_msg}")
-                    raise Exception(f"Namespace deletion failed with status {response.status}")
-        await session.close()
+        delete_url = f"{self.config.base_url}/vectors/delete"
+        async with self._get_session().post(delete_url, headers=headers, json=payload) as response:
+            if response.status == 200:
+                logger.info(f"Namespace '{namespace}' has been successfully deleted.")
+            else:
+                error_msg = await response.text()
+                logger.error(f"Failed to delete namespace '{namespace}'. Response: {error_msg}")
+                raise Exception(f"Namespace deletion failed with status {response.status}")
+
+    async def delete_ids(self, ids: List[str], namespace: Optional[str] = None) -> None:
+        """Delete vectors by id, MAX_DELETE_IDS per request."""
+        for start in range(0, len(ids), self.MAX_DELETE_IDS):
+            await self._post("vectors/delete", {"ids": ids[start:start + self.MAX_DELETE_IDS],
+                                                "namespace": namespace}, check_status=True)
 
     async def ingest_data(
             self,
@@ -93,30 +207,67 @@ class PineconeDB(VectorDB):
 
         for i, text in enumerate(texts):
             embedding = await self.create_azure_embedding(text, embeddings=self.embeddings)
-            metadata = metadatas[i] if metadatas else {}
-            metadata[self._text_key] = text
-            docs.append({"id": ids[i], "values": embedding, "metadata": metadata})
+            docs.append(self.to_vector(ids[i], text, embedding, metadatas[i] if metadatas else None))
 
         logger.info("Embeddings are created!")
-        batch_size = 100
-
-        upserted_ids: list[str] = []
-        for i in range(0, len(docs), batch_size):
-            batch: list[dict[str, str]] = docs[i:i + batch_size]
-            payload: dict = {
-                "vectors": batch,
-                "namespace": namespace
-            }
+        report = await self.upsert_all(docs, namespace=namespace)
+        failed = set(report["failed_ids"])
+        return [doc["id"] for doc in docs if doc["id"] not in failed]
+
+    async def upsert_all(self, vectors: List[dict], namespace: Optional[str] = None) -> Dict:
+        """
+        Upsert any number of vectors: packed into requests by serialized size, up to
+        `upsert_concurrency` requests in flight, transient failures retried with
+        backoff. Returns a report including the ids that never landed.
+        """
+        batches, oversized = pack_upserts(vectors, self.config.upsert_max_bytes, self.config.upsert_max_vectors)
+        semaphore = asyncio.Semaphore(self.config.upsert_concurrency)
+        report = {"vectors": len(vectors), "requests": len(batches), "retries": 0,
+                  "failed_ids": [v["id"] for v in oversized], "errors": []}
+        if oversized:
+            report["errors"].append(f"{len(oversized)} vectors exceed {self.config.upsert_max_bytes} bytes on their own")
+
+        async def send(batch: List[dict]) -> None:
+            async with semaphore:
+                error = await self._upsert_with_retry(batch, namespace, report)
+            if error:
+                report["failed_ids"].extend(v["id"] for v in batch)
+                report["errors"].append(error)
+
+        await asyncio.gather(*(send(batch) for batch in batches))
+        report["duplicate_ids"] = len(vectors) - len(oversized) - sum(len(b) for b in batches)
+        report["upserted"] = len(vectors) - report["duplicate_ids"] - len(report["failed_ids"])
+        if report["failed_ids"]:
+            logger.error(f"{len(report['failed_ids'])} of {len(vectors)} vectors were not upserted "
+                         f"to '{namespace}': {report['errors'][:3]}")
+        return report
+
+    async def _upsert_with_retry(self, batch: List[dict], namespace: Optional[str], report: Dict) -> Optional[str]:
+        """None once the batch landed, else the last error."""
+        for attempt in range(1, self.config.upsert_max_attempts + 1):
             try:
-                response_json: dict = await self._post("vectors/upsert", payload)
-                if "message" in response_json:
-                    logger.error(f"Error upserting vectors: {response_json}")
-                else:
-                    upserted_ids.extend([doc["id"] for doc in batch])
-            except Exception as e:
-                logger.error(f"Error upserting batch {i // batch_size + 1}: {e}")
+                await self.upsert_vectors(batch, namespace=namespace)
+                return None
+            except (PineconeError, aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                if isinstance(exc, PineconeError) and not exc.transient:
+                    return str(exc)  # e.g. 400: retrying the same payload cannot help
+                if attempt == self.config.upsert_max_attempts:
+                    return f"{exc} (after {attempt} attempts)"
+                report["retries"] += 1
+                delay = self.config.upsert_backoff_seconds * 2 ** (attempt - 1)
+                logger.warning(f"Upsert of {len(batch)} vectors failed (attempt {attempt}), "
+                               f"retrying in {delay}s: {exc}")
+                await asyncio.sleep(delay)
+        # only reached when upsert_max_attempts < 1: nothing was sent, so the batch did not land
+        return f"not sent (upsert_max_attempts={self.config.upsert_max_attempts})"
 
-        return upserted_ids
+    async def upsert_vectors(self, vectors: List[dict], namespace: Optional[str] = None) -> None:
+        """Upsert one request's worth of vectors; raises if Pinecone rejects it so callers can retry."""
+        response_json: dict = await self._post("vectors/upsert", {"vectors": vectors, "namespace": namespace},
+                                               check_status=True)
+        if "message" in response_json:
+            # a 2xx carrying an error body: a rejection, reported per batch like a 4xx
+            raise PineconeError(200, f"error upserting vectors: {response_json['message']}")
 
     async def similarity_search_with_score(
             self,
@@ -128,7 +279,8 @@ class PineconeDB(VectorDB):
         Return Pinecone documents most similar to the query, along with scores.
         """
 
-        query_obj = await self.create_azure_embedding(query, embeddings=self.embeddings)
+        with stage_metrics.timer("retrieval.embed_query"):
+            query_obj = await self.embed_query(query)
         payload = {
             "top_k": self.config.top_k,
             "namespace": namespace,
@@ -136,7 +288,8 @@ class PineconeDB(VectorDB):
             "vector": query_obj,
             "includeMetadata": True,
         }
-        results = await self._post("query", payload)
+        with stage_metrics.timer("retrieval.pinecone_query"):
+            results = await self._post("query", payload)
 
         docs = []
         for res in results.get("matches", []):
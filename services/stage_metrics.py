@@ -0,0 +1,81 @@
+import functools
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Optional
+
+
+class StageMetrics:
+    """
+    Process-wide latency recorder for the named stages of the chat request path
+    (history load, each graph node, retrieval, ...). Keeps a bounded window of
+    recent samples per stage so percentiles stay cheap to compute.
+    """
+
+    WINDOW = 4096
+
+    def __init__(self):
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=self.WINDOW))
+        self._counts: dict[str, int] = defaultdict(int)
+        self._skips: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._samples[stage].append(seconds)
+        self._counts[stage] += 1
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def timed(self, stage: str):
+        """Decorator recording the wall time of an async function under `stage`."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def skip(self, stage: str, reason: str) -> None:
+        """Count a stage that was skipped (e.g. `budget`: not enough time left, `timeout`: cut off)."""
+        self._skips[stage][reason] += 1
+
+    def skips(self) -> dict:
+        return {stage: dict(reasons) for stage, reasons in self._skips.items()}
+
+    def percentile(self, stage: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Recent `q` percentile of `stage` in seconds, or None with fewer than `min_samples` samples."""
+        samples = self._samples.get(stage)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def stats(self) -> dict:
+        out = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            pick = lambda q: round(1000 * ordered[int(q * (len(ordered) - 1))], 3)
+            out[stage] = {
+                "count": self._counts[stage],
+                "mean_ms": round(1000 * sum(ordered) / len(ordered), 3),
+                "p50_ms": pick(0.50),
+                "p95_ms": pick(0.95),
+                "p99_ms": pick(0.99),
+            }
+        return out
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self._counts.clear()
+        self._skips.clear()
+
+
+stage_metrics = StageMetrics()
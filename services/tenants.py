@@ -0,0 +1,58 @@
+"""
+Tenants: several brands served by one deployment, each with its own knowledge base.
+
+A user belongs to one tenant (set at registration, carried in the access token).
+Each tenant gets its own vector namespaces and benefits table, derived from the
+deployment-wide names: the default tenant keeps them as they are, so a
+single-brand deployment is unchanged; tenant `acme` uses `acme__insurance_namespace`,
+`acme__faq_namespace` and `benefits.acme.json`. Ingestion targets one tenant
+(`python ingest.py data/ --tenant acme`).
+
+With the local index, every namespace is a shard loaded on first use and evicted
+least-recently-used above LocalIndexConfig.max_resident_mb.
+"""
+import re
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from models.user_model import User
+from models.vectordb_models import TenantConfig
+
+NAMESPACE_SEPARATOR = "__"
+# tenant ids end up in namespace, directory and file names
+_TENANT_ID = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,46}[a-z0-9])?$")
+
+
+def tenant_of(user: Union[User, Dict, None]) -> Optional[str]:
+    """The tenant stored on a user (model or Mongo document), if any."""
+    if user is None:
+        return None
+    return user.get("tenant") if isinstance(user, dict) else getattr(user, "tenant", None)
+
+
+class TenantRouter:
+    def __init__(self, config: Optional[TenantConfig] = None):
+        self.config = config or TenantConfig()
+
+    def validate(self, tenant: Optional[str]) -> str:
+        """The tenant id to use for `tenant` (None = the default one); ValueError if it is not served here."""
+        if not tenant or tenant == self.config.default_tenant:
+            return self.config.default_tenant
+        if not _TENANT_ID.match(tenant):
+            raise ValueError(f"Invalid tenant id {tenant!r}: lowercase letters, digits and '-' only")
+        if self.config.tenants and tenant not in self.config.tenants:
+            raise ValueError(f"Unknown tenant {tenant!r}")
+        return tenant
+
+    def namespace(self, base: str, tenant: Optional[str] = None) -> str:
+        """`base` for the default tenant, `<tenant>__<base>` for the others."""
+        tenant = self.validate(tenant)
+        return base if tenant == self.config.default_tenant else f"{tenant}{NAMESPACE_SEPARATOR}{base}"
+
+    def path(self, path: str, tenant: Optional[str] = None) -> str:
+        """`path` for the default tenant, `<stem>.<tenant><suffix>` next to it for the others."""
+        tenant = self.validate(tenant)
+        if tenant == self.config.default_tenant:
+            return path
+        p = Path(path)
+        return str(p.with_name(f"{p.stem}.{tenant}{p.suffix}"))
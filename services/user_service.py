@@ -6,13 +6,30 @@ from datetime import datetime, timedelta
 from dao.user_dao import UserDAO
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer
+from services.tenants import TenantRouter
+from services.cache.base import CacheBackend
 import uuid
 
+USERS_NAMESPACE = "users"
+
+
+def cacheable_user(doc: Optional[dict]) -> Optional[dict]:
+    """A user document for the cache: without Mongo's ObjectId nor the password hash."""
+    return {k: v for k, v in doc.items() if k not in ("_id", "password")} if doc else None
+
+
+def shared_cache(cache: Optional[CacheBackend]) -> Optional[CacheBackend]:
+    """`cache` if every worker sees it: a user deleted on one worker must not stay valid on the others."""
+    return cache if cache is not None and cache.shared else None
+
 
 class UserService:
-    def __init__(self, user_dao: UserDAO, secret_key: str):
+    def __init__(self, user_dao: UserDAO, secret_key: str, tenants: Optional[TenantRouter] = None,
+                 cache: Optional[CacheBackend] = None):
         self.user_dao = user_dao
         self.secret_key = secret_key
+        self.tenants = tenants or TenantRouter()
+        self.cache = shared_cache(cache)
         self._algorithm = 'HS256'
         self._access_token_expiry_minutes = 60
         self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -25,25 +42,36 @@ class UserService:
         return self._pwd_context.verify(plain_password, hashed_password)
 
     def get_user_by_email(self, email: str) -> Optional[UserInDB]:
-        user_data = self.user_dao.find_by_email(email)
-        return UserInDB(**user_data) if user_data else None
+        """
+        Every authenticated request resolves its token to a user, so this read is cached;
+        a cached user has no password hash (empty `password`). Logins read Mongo directly.
+        """
+        if self.cache is None:
+            user_data = self.user_dao.find_by_email(email)
+            return UserInDB(**user_data) if user_data else None
+        user_data = self.cache.get_or_load(USERS_NAMESPACE, f"email:{email}",
+                                           lambda: cacheable_user(self.user_dao.find_by_email(email)))
+        return UserInDB(**{**user_data, "password": ""}) if user_data else None
 
     def create_user(self, user: User) -> UserInDB:
-        if self.get_user_by_email(user.user_email):
+        if self.user_dao.find_by_email(user.user_email):
             raise ValueError("User already exists")
+        tenant = self.tenants.validate(user.tenant)
         user_id = str(uuid.uuid4())
         hashed_password = self.get_password_hash(user.password)
         user_data = {
             "user_id": user_id,
             "user_name": user.user_name,
             "user_email": user.user_email,
-            "password": hashed_password
+            "password": hashed_password,
+            "tenant": tenant,
         }
         self.user_dao.insert_user(user_data)
         return UserInDB(**user_data)
 
     def authenticate_user(self, email: str, password: str) -> Optional[UserInDB]:
-        user = self.get_user_by_email(email)
+        user_data = self.user_dao.find_by_email(email)  # uncached: the hash never goes through the cache
+        user = UserInDB(**user_data) if user_data else None
         if not user or not self.verify_password(password, user.password):
             return None
         return user
@@ -70,11 +98,21 @@ class UserService:
         user = self.get_user_by_email(email)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        # a token minted for one tenant never reaches another tenant's knowledge base
+        if "tenant" in payload and payload["tenant"] != self.tenants.validate(user.tenant):
+            raise HTTPException(status_code=401, detail="Token issued for another tenant")
         return user
 
+    def token_claims(self, user: UserInDB) -> dict:
+        return {"sub": user.user_email, "tenant": self.tenants.validate(user.tenant)}
+
     def delete_user(self, email: str):
         """Delete user by email"""
         user = self.get_user_by_email(email)
         if not user:
             raise ValueError("User not found")
-        return self.user_dao.delete_user(user.user_id)
+        result = self.user_dao.delete_user(user.user_id)
+        if self.cache is not None:
+            self.cache.delete(USERS_NAMESPACE, f"email:{email}")
+            self.cache.delete(USERS_NAMESPACE, f"id:{user.user_id}")
+        return result
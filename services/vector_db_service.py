@@ -1,149 +1,78 @@
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-import pandas as pd
-import asyncio
-from dotenv import load_dotenv
-from helpers import get_env_value
 
-load_dotenv()
-import pdfplumber
-import camelot
-import re
-import docx
+from models.vectordb_models import IngestionConfig
+from services.plans import plan_filter
 from services.rag_service.base_vector_db import VectorDB
-from models.vectordb_models import PineconeConfig
-from services.rag_service.pinecone import PineconeDB
+from services.tenants import TenantRouter
 from langchain.docstore.document import Document
 
 logger = logging.getLogger(__name__)
 
+
 class VectorDbService:
-    def __init__(self, vector_db: VectorDB):
+    def __init__(self, vector_db: VectorDB, ingestion_config: Optional[IngestionConfig] = None,
+                 filter_by_plan: bool = True, tenants: Optional[TenantRouter] = None):
         self.vector_db = vector_db
+        # namespaces of the default tenant; other tenants get prefixed ones (services.tenants)
         self.namespace = "insurance_namespace"
-
-    # ───────────────────────── helpers ──────────────────────────
-    @staticmethod
-    def _row_to_text(row: pd.Series) -> str:
-        return "\n".join(
-            f"{col} is {row[col]}" for col in row.index if str(row[col]).strip()
-        )
-
-    @staticmethod
-    def _split_paragraphs(text: str) -> List[str]:
-        paras = [
-            p.strip()
-            for p in re.split(r"\n\s*\n", text)
-            if p and len(p.strip()) > 25  # heuristically keep “real” paragraphs
-        ]
-        return paras
-
-    # ---------------------- PDF extraction ----------------------
-    @staticmethod
-    def _tables_from_pdf(path: Path) -> List[pd.DataFrame]:
-        try:
-            tables = camelot.read_pdf(str(path), pages="all", strip_text="\n")
-            return [t.df for t in tables] if tables else []
-        except Exception as e:
-            logger.debug(f"Camelot failed on {path.name}: {e}")
-
-        dfs: List[pd.DataFrame] = []
-        with pdfplumber.open(str(path)) as pdf:
-            for page in pdf.pages:
-                tbl = page.extract_table()
-                if tbl and len(tbl) > 1:
-                    dfs.append(pd.DataFrame(tbl[1:], columns=tbl[0]))
-        return dfs
-
-    @staticmethod
-    def _paragraphs_from_pdf(path: Path) -> List[str]:
-        paras: List[str] = []
-        with pdfplumber.open(str(path)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                paras.extend(VectorDbService._split_paragraphs(text))
-        return paras
-
-    @staticmethod
-    def _tables_from_docx(path: Path) -> List[pd.DataFrame]:
-        doc = docx.Document(str(path))
-        dfs: List[pd.DataFrame] = []
-        for t in doc.tables:
-            rows = [[c.text.strip() for c in r.cells] for r in t.rows]
-            if len(rows) > 1:
-                dfs.append(pd.DataFrame(rows[1:], columns=rows[0]))
-        return dfs
-
-    @staticmethod
-    def _paragraphs_from_docx(path: Path) -> List[str]:
-        doc = docx.Document(str(path))
-        return [p.text.strip() for p in doc.paragraphs if len(p.text.strip()) > 25]
-
-
-    async def ingest_to_vector_db(self, folder_path: str):
+        self.faq_namespace = "faq_namespace"  # detected question / answer pairs (FAQ fast path)
+        self.ingestion_config = ingestion_config or IngestionConfig()
+        self.filter_by_plan = filter_by_plan
+        self.tenants = tenants or TenantRouter()
+
+    def namespace_for(self, tenant: Optional[str] = None) -> str:
+        return self.tenants.namespace(self.namespace, tenant)
+
+    def faq_namespace_for(self, tenant: Optional[str] = None) -> str:
+        return self.tenants.namespace(self.faq_namespace, tenant)
+
+    async def ingest_to_vector_db(self, folder_path: str, job_id: Optional[str] = None,
+                                  restart: bool = False, tenant: Optional[str] = None) -> Dict:
+        """
+        Run (or resume) a checkpointed ingestion job over `folder_path` into the
+        namespaces (and benefits table) of `tenant`; see services.ingestion.jobs.
+        Returns the job summary.
+        """
         folder = Path(folder_path).expanduser().resolve()
         if not folder.is_dir():
             raise FileNotFoundError(f"{folder} is not a directory")
 
-        texts: List[str] = []
-        for file in folder.iterdir():
-            if not file.is_file():
-                continue
-
-            try:
-                if file.suffix.lower() == ".pdf":
-                    # --- body text ---
-                    paras = self._paragraphs_from_pdf(file)
-                    texts.extend(paras)
-                    # --- tables ---
-                    for df in self._tables_from_pdf(file):
-                        texts.extend(self._row_to_text(row) for _, row in df.iterrows())
-                    logger.info(f"{file.name}: added {len(paras)} paragraphs + tables")
-
-                elif file.suffix.lower() == ".docx":
-                    paras = self._paragraphs_from_docx(file)
-                    texts.extend(paras)
-                    for df in self._tables_from_docx(file):
-                        texts.extend(self._row_to_text(row) for _, row in df.iterrows())
-                    logger.info(f"{file.name}: added {len(paras)} paragraphs + tables")
-
-            except Exception as exc:
-                logger.warning(f"{file.name} skipped: {exc}")
-
-        if not texts:
+        # heavy PDF/DOCX tooling – only loaded when something is actually ingested
+        from services.ingestion.jobs import IngestionJob
+
+        config = self.ingestion_config
+        if config.benefits_path:
+            config = config.model_copy(update={"benefits_path": self.tenants.path(config.benefits_path, tenant)})
+        namespace = self.namespace_for(tenant)
+        job = IngestionJob(self.vector_db, namespace=namespace, config=config,
+                           faq_namespace=self.faq_namespace_for(tenant))
+        summary = await job.run(folder, job_id=job_id, restart=restart)
+        if not summary["chunks"]:
             logger.warning("Nothing to ingest – no paragraphs or tables detected.")
-            return
-
-        ids = await self.vector_db.ingest_data(texts, namespace=self.namespace)
-        logger.info(f"Ingested {len(ids)} docs (paras + rows) into namespace '{self.namespace}'")
-
-    async def retrieve(self, query: str) -> List[Tuple[Document, float]]:
-        return await self.vector_db.similarity_search_with_score(query=query, namespace=self.namespace)
-
-
-
-async def main():
-    # Assuming you have a DataFrame ready (replace with actual DataFrame)
-    data = {
-        "title": ["Hair Oil", "Hair Serum"],
-        "description": ["Nourishing oil for hair growth", "Smoothening serum for frizzy hair"],
-        "price": [25.00, 30.00]
-    }
-    dataframe = pd.DataFrame(data)
-    #namespace = "hair_originals_index_06_01_2025"
-
-
-    config = PineconeConfig(
-        api_key=get_env_value('PINECONE_API_KEY'),
-        base_url=get_env_value('PINECONE_URL')
-    )
-    pineconedb = PineconeDB(config=config)
-    vectorservice = VectorDbService(vector_db= pineconedb)
-    index = "sarique-test"
-    api_key = "pcsk_5WohRM_EncoaGWkcYDnHno1FymNXXiKwcKe9c9JRBHUDk2M7gAMRHcxuMYaX2Vuzx2mnML"
-    api_environment = "gcp-starter"
-    await vectorservice.ingest_to_vector_db('/Users/mohdsarique/Documents/Chabot/backend/data')
-
-if __name__ == '__main__':
-    asyncio.run(main())
+        logger.info(f"Ingestion job {summary['job']['job_id']} {summary['job']['status']}: "
+                    f"{summary['chunks']} chunks in namespace '{namespace}'")
+        return summary
+
+    async def retrieve(self, query: str, plan: Optional[str] = None,
+                       tenant: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """
+        Top-k chunks for `query` from `tenant`'s namespace. With a detected `plan` (and plan filtering on) the
+        search is restricted to that plan's chunks plus general ones; if that finds
+        nothing – e.g. an index ingested before chunks carried metadata – it falls
+        back to the unfiltered search.
+        """
+        namespace = self.namespace_for(tenant)
+        if plan and self.filter_by_plan:
+            docs = await self.vector_db.similarity_search_with_score(
+                query=query, filter=plan_filter(plan), namespace=namespace)
+            if docs:
+                return docs
+            logger.debug(f"No chunks tagged with plan '{plan}', retrying without the filter")
+        return await self.vector_db.similarity_search_with_score(query=query, namespace=namespace)
+
+    async def match_faq(self, query: str, tenant: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Closest known questions from `tenant`'s FAQ index; the answer and source are in the metadata."""
+        return await self.vector_db.similarity_search_with_score(query=query,
+                                                                 namespace=self.faq_namespace_for(tenant))
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+
+from pymongo import MongoClient
+
+from services.ai_processing_service import DMAIService
+from services.rag_service.base_vector_db import VectorDB
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupService:
+    """
+    Brings a freshly started worker to a warm state before it takes traffic:
+    Mongo pool connected, HTTP pools to Pinecone / Azure open (or the local index paged in) and, optionally,
+    one tiny embedding and LLM call to pay TLS and first-token costs up front.
+
+    `ready` flips to True only after every step succeeded; failed attempts are
+    retried with backoff.
+    """
+
+    MAX_BACKOFF_SECONDS = 30
+
+    def __init__(self, mongo_client: MongoClient, vector_db: VectorDB,
+                 ai_processing_service: DMAIService, enabled: bool = True, warmup_calls: bool = True):
+        self.mongo_client = mongo_client
+        self.vector_db = vector_db
+        self.ai_processing_service = ai_processing_service
+        self.enabled = enabled
+        self.warmup_calls = warmup_calls
+        self.ready = not enabled
+        self.report: dict = {}
+
+    async def warm_up(self) -> dict:
+        """Run every warm-up step once, concurrently; returns per-step timings in ms."""
+        async def timed(step):
+            started = time.perf_counter()
+            await step
+            return round((time.perf_counter() - started) * 1000, 1)
+
+        steps = {
+            "mongo_ms": asyncio.to_thread(self.mongo_client.admin.command, "ping"),
+            "vector_db_ms": self.vector_db.warm_up(embed=self.warmup_calls),
+        }
+        if self.warmup_calls:
+            steps["llm_ms"] = self.ai_processing_service.warm_up()
+        timings = await asyncio.gather(*(timed(step) for step in steps.values()))
+        return dict(zip(steps, timings))
+
+    async def run_until_ready(self) -> None:
+        if not self.enabled:
+            return
+        started, delay = time.perf_counter(), 1
+        while True:
+            try:
+                self.report = await self.warm_up()
+                break
+            except Exception as e:
+                logger.warning(f"Warm-up failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_BACKOFF_SECONDS)
+        self.report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.ready = True
+        logger.info(f"Worker warm and ready: {self.report}")